@@ -2,82 +2,79 @@
 # Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
 from __future__ import unicode_literals
 
-# pylint: disable=import-modules-only
-
-from pyoozie.client import OozieClient
-
-from pyoozie.exceptions import OozieException
-
-from pyoozie.model import ArtifactType
-from pyoozie.model import CoordinatorActionStatus
-from pyoozie.model import CoordinatorStatus
-from pyoozie.model import WorkflowActionStatus
-from pyoozie.model import WorkflowStatus
-from pyoozie.model import parse_coordinator_id
-from pyoozie.model import parse_workflow_id
-
-from pyoozie.tags import Action
-from pyoozie.tags import Configuration
-from pyoozie.tags import CoordinatorApp
-from pyoozie.tags import Credential
-from pyoozie.tags import Decision
-from pyoozie.tags import Email
-from pyoozie.tags import ExecutionOrder
-from pyoozie.tags import EXEC_FIFO
-from pyoozie.tags import EXEC_LAST_ONLY
-from pyoozie.tags import EXEC_LIFO
-from pyoozie.tags import EXEC_NONE
-from pyoozie.tags import GlobalConfiguration
-from pyoozie.tags import Kill
-from pyoozie.tags import Parallel
-from pyoozie.tags import Parameters
-from pyoozie.tags import Serial
-from pyoozie.tags import Shell
-from pyoozie.tags import SubWorkflow
-from pyoozie.tags import validate_xml_id
-from pyoozie.tags import validate_xml_name
-from pyoozie.tags import WorkflowApp
+import importlib
+import sys
 
+# Where each of the names exported below is defined. Each module is only imported when one of its names is first used,
+# so that e.g. using just the tags DSL doesn't import requests, and using just the client doesn't import yattag.
+_EXPORTS = {
+    'OozieClient': 'pyoozie.client',
+
+    'diff_apps': 'pyoozie.diff',
+
+    'OozieException': 'pyoozie.exceptions',
+
+    'generate_coordinators': 'pyoozie.fleet',
+
+    'JobHistory': 'pyoozie.history',
+
+    'ArtifactType': 'pyoozie.model',
+    'CoordinatorActionStatus': 'pyoozie.model',
+    'CoordinatorStatus': 'pyoozie.model',
+    'WorkflowActionStatus': 'pyoozie.model',
+    'WorkflowStatus': 'pyoozie.model',
+    'parse_coordinator_id': 'pyoozie.model',
+    'parse_workflow_id': 'pyoozie.model',
+
+    'parse_coordinator_app': 'pyoozie.reader',
+    'parse_workflow_app': 'pyoozie.reader',
+
+    'Action': 'pyoozie.tags',
+    'Configuration': 'pyoozie.tags',
+    'CoordinatorApp': 'pyoozie.tags',
+    'Credential': 'pyoozie.tags',
+    'Decision': 'pyoozie.tags',
+    'deterministic_names': 'pyoozie.tags',
+    'Email': 'pyoozie.tags',
+    'ExecutionOrder': 'pyoozie.tags',
+    'EXEC_FIFO': 'pyoozie.tags',
+    'EXEC_LAST_ONLY': 'pyoozie.tags',
+    'EXEC_LIFO': 'pyoozie.tags',
+    'EXEC_NONE': 'pyoozie.tags',
+    'GlobalConfiguration': 'pyoozie.tags',
+    'Kill': 'pyoozie.tags',
+    'Parallel': 'pyoozie.tags',
+    'Parameters': 'pyoozie.tags',
+    'Serial': 'pyoozie.tags',
+    'Shell': 'pyoozie.tags',
+    'SubWorkflow': 'pyoozie.tags',
+    'validate_xml_id': 'pyoozie.tags',
+    'validate_xml_name': 'pyoozie.tags',
+    'WorkflowApp': 'pyoozie.tags',
+    'XMLCache': 'pyoozie.tags',
+}
 
 __version__ = '0.0.9'
 
-__all__ = (
-
-    # client
-    'OozieClient',
-
-    # exceptions
-    'OozieException',
-
-    # model
-    'ArtifactType',
-    'CoordinatorActionStatus',
-    'CoordinatorStatus',
-    'WorkflowActionStatus',
-    'WorkflowStatus',
-    'parse_coordinator_id',
-    'parse_workflow_id',
-
-    # tags
-    'Action',
-    'Configuration',
-    'CoordinatorApp',
-    'Credential',
-    'Decision',
-    'Email',
-    'ExecutionOrder',
-    'EXEC_FIFO',
-    'EXEC_LAST_ONLY',
-    'EXEC_LIFO',
-    'EXEC_NONE',
-    'GlobalConfiguration',
-    'Kill',
-    'Parallel',
-    'Parameters',
-    'Serial',
-    'Shell',
-    'SubWorkflow',
-    'validate_xml_id',
-    'validate_xml_name',
-    'WorkflowApp'
-)
+# Everything exported, lazily or not
+__all__ = tuple(sorted(_EXPORTS)) + ('__version__',)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError("module 'pyoozie' has no attribute '{}'".format(name))
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+if sys.version_info < (3, 7):
+    # Modules can't define __getattr__ before Python 3.7, so everything is imported up front
+    for _name in _EXPORTS:
+        __getattr__(_name)
+    del _name
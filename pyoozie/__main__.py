@@ -0,0 +1,9 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+from __future__ import unicode_literals
+
+import sys
+
+from pyoozie import cli
+
+sys.exit(cli.main())
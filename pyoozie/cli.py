@@ -0,0 +1,307 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+"""The `pyoozie` command, for querying and managing Oozie jobs from the shell.
+
+Every command writes a JSON object per line to standard output: one per job listed, fetched, waited for, changed or
+submitted, as soon as it's ready. Commands given several jobs handle them concurrently. A job that can't be handled is
+written as an object with an "error" and the command exits with a status of 1 once the rest are done.
+"""
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import datetime
+import enum
+import json
+import logging
+import multiprocessing.pool
+import os
+import sys
+import time
+import typing  # pylint: disable=unused-import
+
+from pyoozie import client
+from pyoozie import exceptions
+from pyoozie import model
+
+DEFAULT_URL = 'http://localhost:11000/oozie'
+
+Record = typing.Dict[typing.Text, typing.Any]
+
+# The fields that hold a job's actions, by action number or name, which are written as a list in that order
+_ACTION_PARSERS = (model._parse_coordinator_actions, model._parse_workflow_actions)
+
+_JOB_TYPES = {
+    'workflows': model.ArtifactType.Workflow,
+    'coordinators': model.ArtifactType.Coordinator,
+}
+
+
+def _to_json(value):
+    # type: (typing.Any) -> typing.Any
+    if isinstance(value, datetime.datetime):
+        return value.isoformat() + 'Z'
+    elif isinstance(value, enum.Enum):
+        return str(value)
+    elif isinstance(value, model._OozieArtifact):
+        return job_record(value)
+    return value
+
+
+def job_record(job):
+    # type: (model._OozieArtifact) -> Record
+    """A job's fields, as JSON-serializable values, leaving out those that aren't set."""
+    record = {}
+    for key, func in list(job.REQUIRED_KEYS.items()) + list(job.SUPPORTED_KEYS.items()):
+        value = getattr(job, key, None)
+        if value is None:
+            continue
+        elif func in _ACTION_PARSERS:
+            record[key] = [job_record(value[name]) for name in sorted(value)]
+        else:
+            record[key] = _to_json(value)
+    return record
+
+
+def _job_id(job):
+    # type: (model._OozieArtifact) -> typing.Text
+    return job.coordJobId if isinstance(job, model.Coordinator) else job.id
+
+
+def _each(func, items, max_workers):
+    # type: (typing.Callable, typing.List, int) -> typing.Iterator
+    # Like OozieClient._map, but yielding each result, in order, as soon as it and those before it are ready
+    if max_workers <= 1 or len(items) <= 1:
+        for item in items:
+            yield func(item)
+        return
+    pool = multiprocessing.pool.ThreadPool(min(max_workers, len(items)))
+    try:
+        for result in pool.imap(func, items):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _catching(func):
+    # type: (typing.Callable[[typing.Text], Record]) -> typing.Callable[[typing.Text], Record]
+    # Report a job that can't be handled rather than abandoning the others
+    def wrapper(job_id):
+        try:
+            return func(job_id)
+        except (exceptions.OozieException, ValueError) as err:
+            return {'id': job_id, 'error': str(err) or type(err).__name__}
+    return wrapper
+
+
+class _Output(object):
+    """Writes records as lines of JSON, remembering whether any were errors."""
+
+    def __init__(self, stream):
+        # type: (typing.TextIO) -> None
+        self.stream = stream
+        self.errors = 0
+
+    def write(self, record):
+        # type: (Record) -> None
+        if 'error' in record:
+            self.errors += 1
+        self.stream.write(json.dumps(record, sort_keys=True, separators=(',', ':')) + '\n')
+        self.stream.flush()
+
+
+def _list(api, args, output):
+    # type: (client.OozieClient, argparse.Namespace, _Output) -> None
+    type_enum = _JOB_TYPES[args.type]
+    try:
+        statuses = [client.OozieClient.STATUS_TYPES[type_enum][status.upper()] for status in args.status or []]
+    except KeyError as err:
+        raise ValueError('Unknown status of {}: {}'.format(args.type, err.args[0]))
+    jobs = api._jobs_query(type_enum, user=args.owner, name=args.name, status=statuses or None, limit=args.limit,
+                           details=False)
+    for job in jobs:
+        output.write(job_record(job))
+
+
+def _fetch(api, job_id, limit=0):
+    # type: (client.OozieClient, typing.Text, int) -> model._OozieArtifact
+    coord_id, action = model.parse_coordinator_id(job_id)
+    if coord_id and not action:
+        return api.job_coordinator_info(coordinator_id=job_id, limit=limit)
+    return api.job_action_info(job_id)
+
+
+def _info(api, args, output):
+    # type: (client.OozieClient, argparse.Namespace, _Output) -> None
+    fetch = _catching(lambda job_id: job_record(_fetch(api, job_id, args.limit)))
+    for record in _each(fetch, args.job_ids, api._max_workers):
+        output.write(record)
+
+
+def _status(api, job_id):
+    # type: (client.OozieClient, typing.Text) -> model._OozieArtifact
+    # Fetch no more than it takes to know whether a job has finished
+    coord_id, action = model.parse_coordinator_id(job_id)
+    if coord_id:
+        if action:
+            return api.job_coordinator_action(coordinator_id=job_id)
+        return api.job_last_coordinator_info(coordinator_id=job_id)
+    return api.job_workflow_info(workflow_id=job_id)
+
+
+def _wait(api, args, output, clock=time.time, sleep=time.sleep):
+    # type: (client.OozieClient, argparse.Namespace, _Output, typing.Callable, typing.Callable) -> None
+    deadline = clock() + args.wait_timeout if args.wait_timeout else None
+    pending = list(args.job_ids)
+
+    def check(job_id):
+        try:
+            return job_id, _status(api, job_id)
+        except (exceptions.OozieException, ValueError) as err:
+            return job_id, err
+
+    while True:
+        still_pending = []
+        for job_id, job in _each(check, pending, api._max_workers):
+            if isinstance(job, Exception):
+                output.write({'id': job_id, 'error': str(job) or type(job).__name__})
+            elif job.status.is_active():
+                still_pending.append(job_id)
+            else:
+                record = {'id': job_id, 'status': str(job.status)}
+                if job.status.name not in ('SUCCEEDED', 'DONE', 'OK'):
+                    record['error'] = 'Finished with status {}'.format(job.status)
+                output.write(record)
+        pending = still_pending
+        if not pending:
+            return
+        if deadline is not None and clock() + args.interval > deadline:
+            for job_id in pending:
+                output.write({'id': job_id, 'error': 'Timed out waiting for job to finish'})
+            return
+        sleep(args.interval)
+
+
+_MANAGE = {
+    # command: (coordinator or coordinator action method, workflow method)
+    'kill': ('job_coordinator_kill', 'job_workflow_kill'),
+    'suspend': ('job_coordinator_suspend', 'job_workflow_suspend'),
+    'resume': ('job_coordinator_resume', 'job_workflow_resume'),
+    'rerun': ('job_coordinator_rerun', None),
+}
+
+
+def _manage(api, args, output):
+    # type: (client.OozieClient, argparse.Namespace, _Output) -> None
+    coordinator_method, workflow_method = _MANAGE[args.command]
+
+    def manage(job_id):
+        coord_id, _ = model.parse_coordinator_id(job_id)
+        if coord_id:
+            changed = getattr(api, coordinator_method)(coordinator_id=job_id)
+        elif workflow_method and model.parse_workflow_id(job_id)[0]:
+            changed = getattr(api, workflow_method)(workflow_id=job_id)
+        else:
+            raise ValueError("Can't {} job '{}'".format(args.command, job_id))
+        return {'id': job_id, 'changed': changed}
+
+    for record in _each(_catching(manage), args.job_ids, api._max_workers):
+        output.write(record)
+
+
+def _submit(api, args, output):
+    # type: (client.OozieClient, argparse.Namespace, _Output) -> None
+    configuration = dict(prop.split('=', 1) for prop in args.property or [])
+    submissions = [(path, None) for path in args.paths]
+    if args.type == 'workflow':
+        results = api.jobs_submit_workflows(submissions, configuration=configuration, start=args.start)
+    else:
+        results = api.jobs_submit_coordinators(submissions, configuration=configuration)
+    for path, (job, err) in zip(args.paths, results):
+        output.write({'path': path, 'id': _job_id(job)} if job else {'path': path, 'error': str(err)})
+
+
+def _property(value):
+    # type: (typing.Text) -> typing.Text
+    if '=' not in value:
+        raise argparse.ArgumentTypeError("expected NAME=VALUE, got '{}'".format(value))
+    return value
+
+
+def _parser():
+    # type: () -> argparse.ArgumentParser
+    parser = argparse.ArgumentParser(prog='pyoozie', description='Query and manage Oozie jobs.')
+    parser.add_argument('--url', default=os.environ.get('OOZIE_URL', DEFAULT_URL),
+                        help='Oozie server (default: $OOZIE_URL or {})'.format(DEFAULT_URL))
+    parser.add_argument('--user', help='user to submit jobs as (default: oozie)')
+    parser.add_argument('--timeout', type=float, default=30, help='seconds to wait for each reply (default: 30)')
+    parser.add_argument('-j', '--max-workers', type=int, default=client.DEFAULT_MAX_WORKERS,
+                        help='requests to make concurrently (default: {})'.format(client.DEFAULT_MAX_WORKERS))
+    parser.add_argument('--compression', action='store_true', help='ask for compressed replies')
+    parser.add_argument('--compress-submissions', action='store_true',
+                        help='gzip large submissions, if the server takes compressed requests')
+    parser.add_argument('--job-history', metavar='PATH',
+                        help='SQLite database of finished jobs, which are then only fetched once')
+    parser.add_argument('-v', '--verbose', action='store_true', help='log every request')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    list_parser = commands.add_parser('list', help='list workflows or coordinators, most recent first')
+    list_parser.add_argument('type', choices=sorted(_JOB_TYPES))
+    list_parser.add_argument('--name', help='only jobs with this name')
+    list_parser.add_argument('--owner', help='only jobs of this user')
+    list_parser.add_argument('--status', action='append', help='only jobs with this status; may be repeated')
+    list_parser.add_argument('--limit', type=int, default=0, help='list at most this many jobs')
+    list_parser.set_defaults(func=_list)
+
+    info_parser = commands.add_parser('info', help='describe jobs, with their actions')
+    info_parser.add_argument('job_ids', nargs='+', metavar='job_id')
+    info_parser.add_argument('--limit', type=int, default=0, help="only a coordinator's most recent actions")
+    info_parser.set_defaults(func=_info)
+
+    wait_parser = commands.add_parser('wait', help='wait for jobs to finish, writing each one as it does')
+    wait_parser.add_argument('job_ids', nargs='+', metavar='job_id')
+    wait_parser.add_argument('--interval', type=float, default=10, help='seconds between checks (default: 10)')
+    # Not `timeout`, which is the global option's and would be overwritten by this one's default
+    wait_parser.add_argument('--timeout', type=float, default=0, dest='wait_timeout',
+                             help='seconds to wait at most (default: forever)')
+    wait_parser.set_defaults(func=_wait)
+
+    for command in sorted(_MANAGE):
+        kinds = 'coordinator actions' if command == 'rerun' else 'coordinators, coordinator actions or workflows'
+        manage_parser = commands.add_parser(command, help='{} {}'.format(command, kinds))
+        manage_parser.add_argument('job_ids', nargs='+', metavar='job_id')
+        manage_parser.set_defaults(func=_manage)
+
+    submit_parser = commands.add_parser('submit', help='submit workflows or coordinators')
+    submit_parser.add_argument('type', choices=['coordinator', 'workflow'])
+    submit_parser.add_argument('paths', nargs='+', metavar='path', help='application path in HDFS')
+    submit_parser.add_argument('-D', dest='property', action='append', type=_property, metavar='NAME=VALUE',
+                               help='configuration property for all the jobs; may be repeated')
+    submit_parser.add_argument('--start', action='store_true', help='start submitted workflows')
+    submit_parser.set_defaults(func=_submit)
+    return parser
+
+
+def main(argv=None, stdout=None):
+    # type: (typing.Optional[typing.List[typing.Text]], typing.Optional[typing.TextIO]) -> int
+    args = _parser().parse_args(argv)
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    api = client.OozieClient(url=args.url, user=args.user, timeout=args.timeout, verbose=args.verbose,
+                             max_workers=args.max_workers, compression=args.compression,
+                             compress_submissions=args.compress_submissions, job_history=args.job_history)
+    output = _Output(stdout or sys.stdout)
+    try:
+        args.func(api, args, output)
+    except (exceptions.OozieException, ValueError) as err:
+        print('pyoozie: {}'.format(err), file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        return 130
+    return 1 if output.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
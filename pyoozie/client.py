@@ -2,12 +2,88 @@
 # Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
 from __future__ import unicode_literals
 
+import collections
 import logging
+import multiprocessing.pool
+import numbers
+import threading
+import time
+import zlib
+
 import requests
 
-from pyoozie import xml
+from pyoozie import decoder
 from pyoozie import exceptions
 from pyoozie import model
+from pyoozie import profiling
+
+
+DEFAULT_MAX_WORKERS = 8
+
+# Bytes read at a time from replies that are decoded as they are read
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Submissions at least this large are sent gzipped when `compress_submissions` is enabled
+COMPRESSION_THRESHOLD = 8 * 1024
+
+
+class _ExpiringCache(object):
+    # A thread-safe dict whose entries expire `ttl` seconds after they are set; a ttl of 0 disables caching
+
+    def __init__(self, ttl=0, clock=time.time):
+        self._ttl = ttl or 0
+        self._clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value, expires = self._entries.get(key, (None, 0))
+            if expires <= self._clock():
+                self._entries.pop(key, None)
+                return None
+            return value
+
+    def set(self, key, value):
+        if self._ttl > 0:
+            with self._lock:
+                self._entries[key] = (value, self._clock() + self._ttl)
+
+    def invalidate(self, predicate=None):
+        with self._lock:
+            for key, (value, _) in list(self._entries.items()):
+                if predicate is None or predicate(key, value):
+                    del self._entries[key]
+
+
+def _gzip(content):
+    # zlib rather than gzip.compress, which Python 2 lacks
+    if not isinstance(content, bytes):
+        content = content.encode('utf-8')
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(content) + compressor.flush()
+
+
+def _wire_bytes(response, decoded):
+    # The bytes of a reply as sent, before any Content-Encoding was undone, where the transport counts them
+    try:
+        wire = response.raw.tell()
+    except (AttributeError, IOError, ValueError):
+        wire = None
+    return wire if isinstance(wire, numbers.Integral) and wire > 0 else decoded
+
+
+def _call_site(endpoint):
+    # Requests for different jobs or pages are made from the same place
+    path = endpoint.split('?', 1)[0]
+    return 'job' if path.startswith('job/') else path
+
+
+def _action_number(action):
+    # The actions of streamed replies are built as they're read; others are as Oozie described them
+    if isinstance(action, model.CoordinatorAction):
+        return action.actionNumber
+    return action.get('actionNumber') or model.parse_coordinator_id(action.get('id'))[1]
 
 
 class OozieClient(object):
@@ -34,23 +110,29 @@ class OozieClient(object):
     class Stats(object):
 
         def __init__(self):
+            self._lock = threading.Lock()
             self.reset()
 
         def reset(self):
             self._requests = 0
             self._errors = 0
             self._bytes_received = 0
+            self._wire_bytes_received = 0
             self._elapsed = 0
 
-        def update(self, response):
-            self._requests += 1
-            if response is not None:
-                if not response:
+        def update(self, response, received=None):
+            # `received` is the number of bytes read, for replies that weren't read into `response.content`
+            with self._lock:
+                self._requests += 1
+                if response is not None:
+                    if not response:
+                        self._errors += 1
+                    decoded = len(response.content) if received is None else received
+                    self._bytes_received += decoded
+                    self._wire_bytes_received += _wire_bytes(response, decoded)
+                    self._elapsed += response.elapsed.microseconds
+                else:
                     self._errors += 1
-                self._bytes_received += len(response.text)
-                self._elapsed += response.elapsed.microseconds
-            else:
-                self._errors += 1
 
         @property
         def requests(self):
@@ -64,11 +146,18 @@ class OozieClient(object):
         def bytes_received(self):
             return self._bytes_received
 
+        @property
+        def wire_bytes_received(self):
+            # Less than bytes_received when replies were compressed
+            return self._wire_bytes_received
+
         @property
         def elapsed(self):
             return self._elapsed
 
-    def __init__(self, url=None, user=None, timeout=None, verbose=True, session=None, **_):
+    def __init__(self, url=None, user=None, timeout=None, verbose=True, session=None, max_workers=None,
+                 name_cache_ttl=0, sharelib_cache_ttl=0, json_decoder=None, stream_actions=False,
+                 compression=False, job_history=None, compress_submissions=False, **_):
         self.logger = logging.getLogger('pyoozie.OozieClient')
         oozie_url = (url or 'http://localhost').rstrip('/')
         if not oozie_url.endswith('/oozie'):
@@ -80,11 +169,31 @@ class OozieClient(object):
         self._stats = OozieClient.Stats()
         self._valid_server = False
         self._session = session or requests.Session()
+        self._max_workers = max_workers or DEFAULT_MAX_WORKERS
+        self._job_ids_by_name = _ExpiringCache(name_cache_ttl)
+        self._sharelib_cache = _ExpiringCache(sharelib_cache_ttl)
+        # Replies are decoded straight from their bytes; see pyoozie.decoder for the choices
+        self._decode_json = decoder.get_decoder(json_decoder)
+        # Build coordinator actions as their reply is read, rather than after reading all of it
+        self._stream_actions = stream_actions
+        # Ask for compressed replies. Stock Oozie servers don't take compressed requests, so large submissions are
+        # only gzipped if asked to, until the server rejects one
+        self._compression = compression
+        self._compress_requests = compress_submissions
+        # Finished coordinator actions and workflows are kept here, and only fetched from Oozie once; a path or a
+        # pyoozie.history.JobHistory
+        if job_history is not None:
+            # Only imported when there's a job history to keep, as it needs sqlite3
+            from pyoozie import history
+            if not isinstance(job_history, history.JobHistory):
+                job_history = history.JobHistory(job_history)
+        self._history = job_history
 
     def _test_connection(self):
         response = None
         try:
-            response = self._session.get('{}/versions'.format(self._url), timeout=self._timeout)
+            response = profiling.call(profiling.active(self), profiling.NETWORK, 'GET versions', self._session.get,
+                                      '{}/versions'.format(self._url), timeout=self._timeout)
             response.raise_for_status()
             self._stats.update(response)
         except requests.RequestException as err:
@@ -94,7 +203,7 @@ class OozieClient(object):
             message = "Unable to contact Oozie server at {}".format(self._url)
             raise exceptions.OozieException.communication_error(message, err)
         try:
-            versions = response.json()
+            versions = self._decode_json(response.content)
         except ValueError as err:
             message = "Invalid response from Oozie server at {} ".format(self._url)
             raise exceptions.OozieException.communication_error(message, err)
@@ -102,17 +211,24 @@ class OozieClient(object):
             message = "Oozie server at {} does not support API version 2 (supported: {})".format(self._url, versions)
             raise exceptions.OozieException.communication_error(message)
 
-    def _headers(self, content_type=None):
+    def _headers(self, content_type=None, content_encoding=None):
         headers = {}
         if content_type:
             headers['Content-Type'] = content_type
+        if content_encoding:
+            headers['Content-Encoding'] = content_encoding
+        if self._compression:
+            headers['Accept-Encoding'] = 'gzip, deflate'
         return headers
 
-    def _request(self, method, endpoint, content_type, content=None):
+    def _check_server(self):
         if not self._valid_server:
             self._test_connection()
             self._valid_server = True
 
+    def _send(self, method, endpoint, content_type, content=None, stream=False, compress=True):
+        self._check_server()
+
         response = None
         url = '{}/v2/{}'.format(self._url, endpoint)
 
@@ -122,32 +238,81 @@ class OozieClient(object):
             else:
                 self.logger.info("Request: %s %s", method, url)
 
+        content_encoding = None
+        data = content
+        if content and compress and self._compress_requests and len(content) >= COMPRESSION_THRESHOLD:
+            content_encoding = 'gzip'
+            data = _gzip(content)
+
+        profile = profiling.active(self)
+        site = '{} {}'.format(method, _call_site(endpoint)) if profile else None
         try:
-            response = self._session.request(method, url, data=content, timeout=self._timeout,
-                                             headers=self._headers(content_type))
+            response = profiling.call(profile, profiling.NETWORK, site, self._session.request, method, url,
+                                      data=data, timeout=self._timeout,
+                                      headers=self._headers(content_type, content_encoding), stream=stream)
             response.raise_for_status()
         except requests.RequestException as err:
             self._stats.update(response)
+            if content_encoding and response is not None and response.status_code in (400, 415):
+                # The server may not take compressed submissions; if this one goes through uncompressed, it doesn't,
+                # so neither are any others
+                sent = self._send(method, endpoint, content_type, content, stream, compress=False)
+                self._compress_requests = False
+                return sent
             if self._verbose and response is not None:
                 self.logger.error("Reply: status=%s reason=%s elapsed=%sms",
                                   response.status_code,
                                   response.reason,
                                   response.elapsed.microseconds / 1000.0)
             raise exceptions.OozieException.communication_error(caused_by=err)
+        return response, profile, site
 
-        self._stats.update(response)
+    def _log_reply(self, response, received):
         if self._verbose:
             self.logger.info("Reply: status=%s bytes=%s elapsed=%sms",
                              response.status_code,
-                             len(response.text),
+                             received,
                              response.elapsed.microseconds / 1000.0)
 
+    def _request(self, method, endpoint, content_type, content=None):
+        response, profile, site = self._send(method, endpoint, content_type, content)
+        self._stats.update(response)
+        self._log_reply(response, len(response.content))
+
         try:
-            return response.json() if len(response.content) else None
+            content = response.content
+            return profiling.call(profile, profiling.JSON, site, self._decode_json, content) if content else None
         except ValueError as err:
             message = "Invalid response from Oozie server at {} ".format(self._url)
             raise exceptions.OozieException.communication_error(message, caused_by=err)
 
+    def _get_streamed(self, endpoint, key, on_item):
+        # GET a JSON object, passing each element of its array `key` to `on_item` as soon as it's read; see
+        # decoder.stream_object. Only the latest chunks of the reply are held in memory rather than all of it.
+        response, profile, site = self._send('GET', endpoint, None, stream=True)
+        received = [0]
+
+        def chunks():
+            iterator = response.iter_content(STREAM_CHUNK_SIZE)
+            while True:
+                # Waiting for the rest of the reply is network time, rather than decoding
+                chunk = profiling.call(profile, profiling.NETWORK, site, next, iterator, None)
+                if chunk is None:
+                    return
+                received[0] += len(chunk)
+                yield chunk
+
+        try:
+            return profiling.call(profile, profiling.JSON, site, decoder.stream_object, chunks(), key,
+                                  self._decode_json, on_item)
+        except ValueError as err:
+            message = "Invalid response from Oozie server at {} ".format(self._url)
+            raise exceptions.OozieException.communication_error(message, caused_by=err)
+        finally:
+            response.close()
+            self._stats.update(response, received[0])
+            self._log_reply(response, received[0])
+
     def _get(self, endpoint, content_type=None):
         return self._request('GET', endpoint, content_type)
 
@@ -157,6 +322,22 @@ class OozieClient(object):
     def _post(self, endpoint, content, content_type='application/xml'):
         return self._request('POST', endpoint, content_type, content)
 
+    def _map(self, func, items, max_workers=None):
+        # Apply `func` to every item using a bounded pool of threads, preserving order
+        items = list(items)
+        max_workers = min(max_workers or self._max_workers, len(items))
+        if max_workers <= 1:
+            return [func(item) for item in items]
+
+        # Validate the server once up front rather than from every worker
+        self._check_server()
+        pool = multiprocessing.pool.ThreadPool(max_workers)
+        try:
+            return pool.map(func, items)
+        finally:
+            pool.close()
+            pool.join()
+
     @property
     def url(self):
         return self._url
@@ -165,15 +346,22 @@ class OozieClient(object):
         if not to_logger:
             to_logger = self.logger
         to_logger.info(
-            "OozieClient Stats: requests=%s errors=%s bytes=%s elapsed=%sms",
+            "OozieClient Stats: requests=%s errors=%s bytes=%s wire_bytes=%s elapsed=%sms",
             self._stats.requests,
             self._stats.errors,
             self._stats.bytes_received,
+            self._stats.wire_bytes_received,
             self._stats.elapsed / 1000)
 
     def reset_stats(self):
         self._stats.reset()
 
+    def profile(self):
+        # Break down the time spent within the block by phase (network, JSON decoding, model construction, parsing
+        # configuration and times) and call site; e.g. `with client.profile() as profile: ...` then
+        # `profile.report(logger)`. See pyoozie.profiling.Profile.
+        return profiling.recording(self)
+
     # ===========================================================================
     # Admin API
     # ===========================================================================
@@ -214,12 +402,15 @@ class OozieClient(object):
     def admin_list_sharelib(self):
         return [lib['name'] for lib in self._admin_query('list_sharelib')['sharelib']]
 
-    def admin_list_all_sharelib(self):
-        all_libs = dict()
-        for lib in self.admin_list_sharelib():
-            files = self._admin_query('list_sharelib?lib={}'.format(lib))['sharelib'][0]['files']
-            all_libs[lib] = files
-        return all_libs
+    def admin_list_all_sharelib(self, max_workers=None):
+        all_libs = self._sharelib_cache.get('all')
+        if all_libs is None:
+            libs = self.admin_list_sharelib()
+            files = self._map(lambda lib: self._admin_query('list_sharelib?lib={}'.format(lib))['sharelib'][0]['files'],
+                              libs, max_workers=max_workers)
+            all_libs = dict(zip(libs, files))
+            self._sharelib_cache.set('all', all_libs)
+        return dict(all_libs)
 
     # ===========================================================================
     # Jobs API - query coordinators and workflows
@@ -313,6 +504,24 @@ class OozieClient(object):
         coords = self._jobs_query(model.ArtifactType.Coordinator, user=user, details=False)
         return set([coord.coordJobName for coord in coords])
 
+    def _last_job_id(self, type_enum, name, user=None):
+        # Resolve a job name to its most recent ID without fetching any job details
+        key = (type_enum, name, user)
+        job_id = self._job_ids_by_name.get(key)
+        if not job_id:
+            jobs = self._jobs_query(type_enum, name=name, user=user, limit=1, details=False)
+            if not jobs:
+                return None
+            job = jobs[-1]
+            job_id = job.coordJobId if type_enum == model.ArtifactType.Coordinator else job.id
+            self._job_ids_by_name.set(key, job_id)
+        return job_id
+
+    def _forget_job_names(self, type_enum, job_id=None):
+        # Drop cached name lookups that may now be stale: those of `job_id`, or all of `type_enum` if unspecified
+        self._job_ids_by_name.invalidate(
+            lambda key, value: key[0] == type_enum and (job_id is None or value == job_id))
+
     # ===========================================================================
     # Job API - query coordinator details and actions
     # ===========================================================================
@@ -332,11 +541,28 @@ class OozieClient(object):
 
         def wrapped_get(uri):
             try:
-                return self._get(uri)
+                if self._stream_actions:
+                    finished = []
+                    if self._history:
+                        from pyoozie import history
+
+                    def on_action(details):
+                        if self._history and history.is_final(details):
+                            finished.append(details)
+                        return self.__coordinator_action(details)
+
+                    result = self._get_streamed(uri, 'actions', on_action)
+                    self._remember(finished)
+                else:
+                    result = self._get(uri)
+                    self._remember(result.get('actions'))
+                return result
             except exceptions.OozieException as err:
                 raise exceptions.OozieException.coordinator_not_found(job_id, err)
 
         filters = self._filter_string(model.ArtifactType.CoordinatorAction, status=status)
+        # Actions from `start` on that succeeded before, and so needn't be fetched again
+        known = []
         if start == 0 and limit:
             # Fetch the most recent `limit` actions
             length = limit
@@ -348,14 +574,37 @@ class OozieClient(object):
             result = wrapped_get('job/{}?offset={}&len={}{}'.format(coord_id, offset, length, filters))
         else:
             # Fetch all actions from `start` onward
-            # Ask for 1 first to get the total
             offset = start or 1
-            result = wrapped_get('job/{}?offset={}&len=1{}'.format(coord_id, offset, filters))
-            total = result['total']
-            if total > 0:
-                length = total - offset + 1
-                if length != 1:  # Don't re-ask if we have the answer!
+            if self._history and not status:
+                # Those from the action at `offset` on that are known to have succeeded, taking action N to be at
+                # position N, which it is unless earlier actions were purged
+                stored = self._history.coordinator_actions(coord_id, start=offset)
+                while offset + len(known) in stored:
+                    known.append(stored[offset + len(known)])
+            if known:
+                # Fetch the last of them along with the next action, and only skip them if it's where it was taken to
+                # be, which means that there are no gaps in the numbers of the actions before it
+                last = offset + len(known) - 1
+                result = wrapped_get('job/{}?offset={}&len=2{}'.format(coord_id, last, filters))
+                fetched = list(result.get('actions') or [])
+                if fetched and _action_number(fetched[0]) == last:
+                    fetched = fetched[1:]
+                    offset = last + 1 + len(fetched)
+                else:
+                    known, fetched = [], []
+                length = result['total'] - offset + 1
+                if length > 0:
                     result = wrapped_get('job/{}?offset={}&len={}{}'.format(coord_id, offset, length, filters))
+                    fetched += list(result.get('actions') or [])
+                result['actions'] = known + fetched
+            else:
+                # Ask for 1 first to get the total
+                result = wrapped_get('job/{}?offset={}&len=1{}'.format(coord_id, offset, filters))
+                total = result['total']
+                if total > 0:
+                    length = total - offset + 1
+                    if length > 1:  # Don't re-ask if we have the answer!
+                        result = wrapped_get('job/{}?offset={}&len={}{}'.format(coord_id, offset, length, filters))
 
         coord = self.JOB_TYPES[model.ArtifactType.Coordinator](self, result)
         if action and coord:
@@ -364,11 +613,25 @@ class OozieClient(object):
             coord.action(action)
         return coord
 
+    def __coordinator_action(self, details):
+        return self.JOB_TYPES[model.ArtifactType.CoordinatorAction](self, details)
+
+    def _remember(self, jobs):
+        # Keep any coordinator actions or workflows among `jobs` that succeeded in the job history, if there is one
+        if self._history and jobs:
+            self._history.put(jobs)
+
+    def _recall(self, job_id):
+        return self._history.get(job_id) if self._history else None
+
     def _coordinator_action_query(self, coordinator_id, action, coordinator=None):
-        try:
-            result = self._get('job/{}@{}'.format(coordinator_id, action))
-        except exceptions.OozieException as err:
-            raise exceptions.OozieException.coordinator_action_not_found(coordinator_id, action, err)
+        result = self._recall('{}@{}'.format(coordinator_id, action))
+        if result is None:
+            try:
+                result = self._get('job/{}@{}'.format(coordinator_id, action))
+            except exceptions.OozieException as err:
+                raise exceptions.OozieException.coordinator_action_not_found(coordinator_id, action, err)
+            self._remember([result])
         coord_action = self.JOB_TYPES[model.ArtifactType.CoordinatorAction](self, result, parent=coordinator)
         if coordinator:
             coordinator.actions[action] = coord_action
@@ -387,10 +650,8 @@ class OozieClient(object):
 
             result = coordinator_id
             if name:
-                coord = self.jobs_last_coordinator(name=name, user=user)
-                if coord:
-                    result = coord.coordJobId
-                else:
+                result = self._last_job_id(model.ArtifactType.Coordinator, name, user=user)
+                if not result:
                     raise exceptions.OozieException.coordinator_not_found(name)
             elif user:
                 raise ValueError("User parameter not supported with coordinator_id")
@@ -438,7 +699,10 @@ class OozieClient(object):
         if not wf_id:
             raise ValueError("Unrecognized job ID: '{}'".format(job_id))
         try:
-            result = self._get('job/' + wf_id)
+            result = self._recall(wf_id)
+            if result is None:
+                result = self._get('job/' + wf_id)
+                self._remember([result])
             workflow = self.JOB_TYPES[model.ArtifactType.Workflow](self, result)
             return workflow
         except exceptions.OozieException as err:
@@ -450,10 +714,8 @@ class OozieClient(object):
 
         result = workflow_id
         if name:
-            workflow = self.jobs_last_workflow(name=name, user=user)
-            if workflow:
-                result = workflow.id
-            else:
+            result = self._last_job_id(model.ArtifactType.Workflow, name, user=user)
+            if not result:
                 raise exceptions.OozieException.workflow_not_found(name)
         elif user:
             raise ValueError("User parameter not supported with workflow_id")
@@ -482,8 +744,10 @@ class OozieClient(object):
     def job_action_info(self, job_id):
         coord_id, action = model.parse_coordinator_id(job_id)
         if coord_id:
-            coord = self.job_coordinator_info(coordinator_id=job_id)
-            return coord.action(action) if coord and action else coord
+            if action:
+                # Fetch just the action; its coordinator is loaded lazily if ever asked for
+                return self._coordinator_action_query(coord_id, action)
+            return self.job_coordinator_info(coordinator_id=job_id)
 
         wf_id, action = model.parse_workflow_id(job_id)
         if wf_id:
@@ -492,6 +756,54 @@ class OozieClient(object):
 
         raise exceptions.OozieException.job_not_found(job_id)
 
+    def _fetch_job(self, job_id):
+        coord_id, action = model.parse_coordinator_id(job_id)
+        if coord_id:
+            if action:
+                return self._coordinator_action_query(coord_id, action)
+            return self._coordinator_query(coord_id)
+
+        wf_id, _ = model.parse_workflow_id(job_id)
+        if wf_id:
+            return self._workflow_query(wf_id)
+
+        raise exceptions.OozieException.job_not_found(job_id)
+
+    def expand_tree(self, root_ids, depth=None, max_workers=None):
+        # Walk coordinators -> actions -> workflows -> workflow actions -> sub-workflows one level at a time,
+        # fetching each level concurrently and every job at most once. A `depth` of N stops after N levels
+        # below the roots; None expands until no unfetched children remain.
+        root_ids = list(collections.OrderedDict.fromkeys(root_ids))
+        jobs = dict(zip(root_ids, self._map(self._fetch_job, root_ids, max_workers=max_workers)))
+
+        def children(job):
+            if job.is_coordinator():
+                actions = [job] if job.is_action() else job.actions.values()
+                return [action for action in actions if action.externalId and not action._workflow]
+            return [action for action in job.actions.values()
+                    if action.type == 'sub-workflow' and action.externalId and not action._subworkflow]
+
+        level = [jobs[job_id] for job_id in root_ids]
+        remaining = depth
+        while level and (remaining is None or remaining > 0):
+            parents = [action for job in level for action in children(job)]
+            wanted = [wf_id for wf_id in collections.OrderedDict.fromkeys(a.externalId for a in parents)
+                      if wf_id not in jobs]
+            jobs.update(zip(wanted, self._map(self._workflow_query, wanted, max_workers=max_workers)))
+
+            level = []
+            for action in parents:
+                workflow = jobs[action.externalId]
+                workflow._parent = action
+                if action.is_coordinator():
+                    action._workflow = workflow
+                else:
+                    action._subworkflow = workflow
+                level.append(workflow)
+            remaining = remaining - 1 if remaining is not None else None
+
+        return [jobs[job_id] for job_id in root_ids]
+
     # ===========================================================================
     # Job API - manage coordinator
     # ===========================================================================
@@ -529,6 +841,8 @@ class OozieClient(object):
         coord = self._fetch_coordinator_or_action(coordinator_id, name, user)
         if coord.status.is_active():
             self._coordinator_perform_simple_action(coord, 'kill')
+            if not coord.is_action():
+                self._forget_job_names(model.ArtifactType.Coordinator, coord.coordJobId)
             return True
         return False
 
@@ -540,10 +854,15 @@ class OozieClient(object):
         if action.coordinator().status.is_active() and not action.status.is_active():
             self.logger.info('Rerunning coordinator action %s', coordinator_id)
             self._coordinator_perform_simple_action(action, 'coord-rerun', refresh='true')
+            if self._history:
+                # It's running again
+                self._history.forget(action.id)
             return True
         return False
 
     def job_coordinator_update(self, coordinator_id, xml_path, configuration=None):
+        # pyoozie.xml, and the yattag it uses, are only imported once jobs are submitted
+        from pyoozie import xml
         user = self._user or 'oozie'
         coord = self._fetch_coordinator_or_action(coordinator_id)
         if coord.status.is_active():
@@ -591,6 +910,7 @@ class OozieClient(object):
         workflow = self.job_workflow_info(workflow_id, name, user)
         if workflow.status.is_active():
             self._put('job/{}?action=kill'.format(workflow.id))
+            self._forget_job_names(model.ArtifactType.Workflow, workflow.id)
             return True
         return False
 
@@ -598,29 +918,89 @@ class OozieClient(object):
     # Jobs API - submit and update jobs
     # ===========================================================================
 
-    def jobs_submit_coordinator(self, xml_path, configuration=None):
+    def _job_handle(self, job_id):
+        # A job object carrying only its ID; fill_in_details() fetches the rest when needed
+        coord_id, _ = model.parse_coordinator_id(job_id)
+        if coord_id:
+            return self.JOB_TYPES[model.ArtifactType.Coordinator](self, {'coordJobId': job_id})
+        return self.JOB_TYPES[model.ArtifactType.Workflow](self, {'id': job_id})
+
+    def jobs_submit_coordinator(self, xml_path, configuration=None, details=True):
+        from pyoozie import xml
         user = self._user or 'oozie'
         conf = xml._coordinator_submission_xml(user, xml_path, configuration=configuration)
         if self._verbose:
             self.logger.info('Preparing to submit coordinator %s:\n%s', xml_path, conf)
         reply = self._post('jobs', conf)
+        self._forget_job_names(model.ArtifactType.Coordinator)
         if reply and 'id' in reply:
             if self._verbose:
                 self.logger.info('New coordinator: %s', reply['id'])
+            if not details:
+                return self._job_handle(reply['id'])
             coord = self.job_coordinator_info(coordinator_id=reply['id'])
             return coord
         raise exceptions.OozieException.operation_failed('submit coordinator')
 
-    def jobs_submit_workflow(self, xml_path, configuration=None, start=False):
+    def jobs_submit_workflow(self, xml_path, configuration=None, start=False, details=True):
+        from pyoozie import xml
         user = self._user or 'oozie'
         conf = xml._workflow_submission_xml(user, xml_path, configuration=configuration)
         if self._verbose:
             self.logger.info('Preparing to submit workflow %s:\n%s', xml_path, conf)
         endpoint = 'jobs?action=start' if start else 'jobs'
         reply = self._post(endpoint, conf)
+        self._forget_job_names(model.ArtifactType.Workflow)
         if reply and 'id' in reply:
             if self._verbose:
                 self.logger.info('New workflow: %s', reply['id'])
+            if not details:
+                return self._job_handle(reply['id'])
             workflow = self.job_workflow_info(workflow_id=reply['id'])
             return workflow
         raise exceptions.OozieException.operation_failed('submit workflow')
+
+    def _submit_each(self, endpoint, confs, type_enums, operation, max_workers=None):
+        # POST each submission concurrently, collecting a (job, error) pair for each rather than failing the batch
+        def submit(conf):
+            try:
+                reply = self._post(endpoint, conf)
+            except exceptions.OozieException as err:
+                return None, err
+            if reply and 'id' in reply:
+                return self._job_handle(reply['id']), None
+            return None, exceptions.OozieException.operation_failed(operation)
+
+        try:
+            results = self._map(submit, confs, max_workers=max_workers)
+        finally:
+            for type_enum in type_enums:
+                self._forget_job_names(type_enum)
+        if self._verbose:
+            self.logger.info('Submitted %s jobs, %s failed', len(results), sum(1 for _, err in results if err))
+        return results
+
+    def jobs_submit_coordinators(self, submissions, configuration=None, max_workers=None):
+        # Submit a coordinator for each (xml_path, configuration) pair, on top of a base configuration shared by all.
+        # Returns a (job, error) pair for each submission, in order; only one of which is set.
+        from pyoozie import xml
+        user = self._user or 'oozie'
+        confs = xml._coordinator_submission_xmls(user, submissions, configuration=configuration)
+        return self._submit_each('jobs', confs, [model.ArtifactType.Coordinator], 'submit coordinator',
+                                 max_workers=max_workers)
+
+    def jobs_submit_workflows(self, submissions, configuration=None, start=False, max_workers=None):
+        # Submit a workflow for each (xml_path, configuration) pair; see jobs_submit_coordinators
+        from pyoozie import xml
+        user = self._user or 'oozie'
+        confs = xml._workflow_submission_xmls(user, submissions, configuration=configuration)
+        endpoint = 'jobs?action=start' if start else 'jobs'
+        return self._submit_each(endpoint, confs, [model.ArtifactType.Workflow], 'submit workflow',
+                                 max_workers=max_workers)
+
+    def jobs_submit_many(self, submissions, start=False, max_workers=None):
+        # POST already-built submission XML documents concurrently; returns a (job, error) pair for each, in order,
+        # as jobs_submit_coordinators does. `start` only applies to workflow submissions.
+        endpoint = 'jobs?action=start' if start else 'jobs'
+        return self._submit_each(endpoint, submissions, [model.ArtifactType.Coordinator, model.ArtifactType.Workflow],
+                                 'submit job', max_workers=max_workers)
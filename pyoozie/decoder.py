@@ -0,0 +1,176 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+"""Decoders of the JSON replies of Oozie, which take the undecoded UTF-8 bytes of a reply."""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import json
+import re
+import typing  # pylint: disable=unused-import
+
+import six
+
+Decoder = typing.Callable[[bytes], typing.Any]
+
+_WHITESPACE = re.compile(br'[ \t\n\r]*')
+# A complete string, an incomplete one, or a bracket
+_TOKEN = re.compile(br'"[^"\\]*(?:\\.[^"\\]*)*"|["{}\[\]]', re.DOTALL)
+_SCALAR = re.compile(br'[^,}\]\s]+')
+# An object with no objects or arrays nested in it, which most array elements in Oozie's replies are
+_FLAT_OBJECT = re.compile(br'\{[^{}\[\]"]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^{}\[\]"]*)*\}', re.DOTALL)
+# Consecutive elements of an array that are all flat objects. Strings are matched whole, so a bracket in a string is
+# never taken for the end of an object
+_FLAT_OBJECTS = re.compile(br'{object}(?:[ \t\n\r]*,[ \t\n\r]*{object})*'.replace(b'{object}', _FLAT_OBJECT.pattern),
+                           re.DOTALL)
+
+
+def _json_loads(content):
+    # type: (bytes) -> typing.Any
+    return json.loads(content.decode('utf-8'))
+
+
+DECODERS = {'json': _json_loads}  # type: typing.Dict[typing.Text, Decoder]
+
+try:
+    import orjson  # pylint: disable=import-error
+    DECODERS['orjson'] = orjson.loads
+except ImportError:
+    pass
+
+try:
+    import ujson  # pylint: disable=import-error
+    DECODERS['ujson'] = ujson.loads
+except ImportError:
+    pass
+
+# The fastest decoder installed
+DEFAULT_DECODER = next(name for name in ('orjson', 'ujson', 'json') if name in DECODERS)
+
+
+def get_decoder(decoder=None):
+    # type: (typing.Optional[typing.Union[typing.Text, Decoder]]) -> Decoder
+    """Get a decoder given its name in `DECODERS` or a function that decodes bytes, or the fastest installed one."""
+    decoder = decoder or DEFAULT_DECODER
+    return DECODERS[decoder] if isinstance(decoder, six.string_types) else decoder
+
+
+def _value_end(data, position):
+    # type: (bytes, int) -> typing.Optional[int]
+    # Where the JSON value starting at `position` ends, or None if `data` ends before it does
+    if data[position:position + 1] not in (b'"', b'{', b'['):
+        match = _SCALAR.match(data, position)
+        return match.end() if match and match.end() < len(data) else None
+    depth = 0
+    for token in _TOKEN.finditer(data, position):
+        text = token.group()
+        if text == b'"':
+            return None
+        elif text[:1] != b'"':
+            depth += 1 if text in (b'{', b'[') else -1
+        if depth == 0:
+            return token.end()
+    return None
+
+
+class _Buffer(object):
+    """The part of a document read from an iterable of chunks that hasn't been consumed yet."""
+
+    def __init__(self, chunks):
+        # type: (typing.Iterable[bytes]) -> None
+        self.__chunks = iter(chunks)
+        self.__data = b''
+        self.__position = 0
+
+    def __read(self):
+        # type: () -> None
+        chunk = next(self.__chunks, None)
+        if chunk is None:
+            raise ValueError('Unexpected end of JSON document')
+        # Drop what has been consumed, so that only the value being read is held on to
+        self.__data = self.__data[self.__position:] + chunk
+        self.__position = 0
+
+    def peek(self):
+        # type: () -> bytes
+        """The next character other than whitespace."""
+        while True:
+            self.__position = _WHITESPACE.match(self.__data, self.__position).end()
+            if self.__position < len(self.__data):
+                return self.__data[self.__position:self.__position + 1]
+            self.__read()
+
+    def consume(self, character):
+        # type: (bytes) -> None
+        if self.peek() != character:
+            raise ValueError('Expected {!r} in JSON document, got {!r}'.format(character, self.peek()))
+        self.__position += 1
+
+    def elements(self, decode):
+        # type: (Decoder) -> typing.List
+        """Decode as many of the next elements of an array as have been read, and at least one."""
+        self.peek()
+        # Oozie separates objects with a bare comma, and quotes in strings are escaped, so the elements read so far
+        # most likely end at the last '},{"'. If that's in a string after all, what precedes it isn't valid JSON
+        end = self.__data.rfind(b'},{"', self.__position) + 1
+        if end:
+            try:
+                items = decode(b'[' + self.__data[self.__position:end] + b']')
+            except ValueError:
+                pass
+            else:
+                self.__position = end
+                return items
+        # Otherwise decode every whole flat object that has been read in one go; anything else, such as an element
+        # that hasn't been read to its end or has objects nested in it, is decoded on its own once it has been
+        match = _FLAT_OBJECTS.match(self.__data, self.__position)
+        if match:
+            self.__position = match.end()
+            return decode(b'[' + match.group() + b']')
+        return [decode(self.value(_FLAT_OBJECT))]
+
+    def value(self, pattern=None):
+        # type: (typing.Optional[typing.Pattern]) -> bytes
+        """The next JSON value, which is tried against `pattern` before being scanned for where it ends."""
+        self.peek()
+        while True:
+            match = pattern.match(self.__data, self.__position) if pattern else None
+            end = match.end() if match else _value_end(self.__data, self.__position)
+            if end is not None:
+                value = self.__data[self.__position:end]
+                self.__position = end
+                return value
+            self.__read()
+
+
+def stream_object(chunks, key, decode, on_item):
+    # type: (typing.Iterable[bytes], typing.Text, Decoder, typing.Callable[[typing.Any], typing.Any]) -> typing.Dict
+    """Decode a JSON object from an iterable of byte chunks, without holding on to all of its array `key`.
+
+    Each element of the array is decoded with `decode` and passed to `on_item` as soon as the chunk it ends in has been
+    read, and the array is replaced by what `on_item` returned for its elements. Everything else is decoded as a whole.
+    `decode` must raise `ValueError` for invalid JSON.
+    """
+    buffer = _Buffer(chunks)
+    result = {}
+    buffer.consume(b'{')
+    while buffer.peek() != b'}':
+        name = decode(buffer.value())
+        buffer.consume(b':')
+        if name == key and buffer.peek() == b'[':
+            buffer.consume(b'[')
+            items = []
+            while buffer.peek() != b']':
+                items.extend(on_item(item) for item in buffer.elements(decode))
+                _separator(buffer, b']')
+            buffer.consume(b']')
+            result[name] = items
+        else:
+            result[name] = decode(buffer.value())
+        _separator(buffer, b'}')
+    return result
+
+
+def _separator(buffer, closing):
+    # type: (_Buffer, bytes) -> None
+    if buffer.peek() != closing:
+        buffer.consume(b',')
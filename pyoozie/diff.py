@@ -0,0 +1,210 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+from __future__ import unicode_literals
+
+import collections
+import contextlib
+import typing  # pylint: disable=unused-import
+
+from pyoozie import tags
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+# What a change applies to
+ATTRIBUTE = 'attribute'
+CONTROL = 'control'
+NODE = 'node'
+PROPERTY = 'property'
+TRANSITION = 'transition'
+
+Change = collections.namedtuple('Change', ['change', 'category', 'path', 'old', 'new'])
+
+# Elements of workflow nodes that are compared separately from the node itself
+_TRANSITIONS = frozenset(['ok', 'error', 'switch', 'path'])
+
+
+class _Element(object):
+
+    __slots__ = ('name', 'attributes', 'children', 'text')
+
+    def __init__(self, name, attributes):
+        # type: (typing.Text, typing.Dict[typing.Text, typing.Any]) -> None
+        self.name = name
+        self.attributes = attributes
+        self.children = []  # type: typing.List[_Element]
+        self.text = ''
+
+    def key(self):
+        # type: () -> typing.Tuple
+        """A comparable summary of this element and its descendants."""
+        return (self.name, tuple(sorted(self.attributes.items())), self.text,
+                tuple(child.key() for child in self.children))
+
+
+class _TreeBuilder(object):
+    """Collects what an object serializes as a tree of elements, without producing any text.
+
+    Implements the subset of the `yattag.Doc` interface used by `pyoozie.tags`.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        self.root = _Element('', {})
+        self.__stack = [self.root]
+
+    def tagtext(self):
+        # type: () -> typing.Tuple[_TreeBuilder, typing.Callable, typing.Callable]
+        return self, self.tag, self.text
+
+    @contextlib.contextmanager
+    def tag(self, tag_name, **attributes):
+        # type: (typing.Text, **typing.Any) -> typing.Generator[None, None, None]
+        element = _Element(tag_name, {name: '{}'.format(value) for name, value in attributes.items()})
+        self.__stack[-1].children.append(element)
+        self.__stack.append(element)
+        yield
+        self.__stack.pop()
+
+    def stag(self, tag_name, **attributes):
+        # type: (typing.Text, **typing.Any) -> None
+        self.__stack[-1].children.append(
+            _Element(tag_name, {name: '{}'.format(value) for name, value in attributes.items()}))
+
+    def text(self, *strings):
+        # type: (*typing.Any) -> None
+        self.__stack[-1].text += ''.join('{}'.format(string) for string in strings)
+
+    def asis(self, *strings):
+        # type: (*typing.Text) -> None
+        pass  # Only used for the XML declaration
+
+
+def _text_attributes(attributes):
+    # type: (typing.Dict[typing.Text, typing.Text]) -> typing.Tuple
+    return tuple(sorted(attributes.items()))
+
+
+def _properties(path, element, entries):
+    # type: (typing.Text, _Element, typing.Dict) -> None
+    for prop in element.children:
+        fields = {field.name: field.text for field in prop.children}
+        entries[(PROPERTY, '{path}/{name}'.format(path=path, name=fields.get('name')))] = fields.get('value')
+
+
+def _workflow_node(element, entries):
+    # type: (_Element, typing.Dict) -> None
+    identifier = element.attributes.get('name')
+    body = []
+    for child in element.children:
+        if child.name in ('ok', 'error'):
+            entries[(TRANSITION, '{id}/{name}'.format(id=identifier, name=child.name))] = child.attributes.get('to')
+        elif child.name == 'switch':
+            for case in child.children:
+                path = '{id}/case/{case}'.format(id=identifier, case=case.text) if case.name == 'case' else \
+                    '{id}/default'.format(id=identifier)
+                entries[(TRANSITION, path)] = case.attributes.get('to')
+        elif child.name == 'path':
+            start = child.attributes.get('start')
+            entries[(TRANSITION, '{id}/path/{start}'.format(id=identifier, start=start))] = start
+        elif child.name in ('shell', 'sub-workflow'):
+            # Configuration properties are compared one by one
+            body.append(_Element(child.name, child.attributes))
+            for field in child.children:
+                if field.name == 'configuration':
+                    _properties('{id}/{name}/configuration'.format(id=identifier, name=child.name), field, entries)
+                else:
+                    body[-1].children.append(field)
+        else:
+            body.append(child)
+    if element.name == 'join':
+        entries[(TRANSITION, '{id}/to'.format(id=identifier))] = element.attributes.get('to')
+    attributes = {name: value for name, value in element.attributes.items() if name not in ('name', 'to')}
+    entries[(NODE, identifier)] = (element.name, _text_attributes(attributes), tuple(child.key() for child in body))
+
+
+def _workflow_entries(root, entries):
+    # type: (_Element, typing.Dict) -> None
+    for element in root.children:
+        if element.name == 'parameters':
+            _properties('parameters', element, entries)
+        elif element.name == 'global':
+            job_xml_files = []
+            for child in element.children:
+                if child.name == 'configuration':
+                    _properties('global/configuration', child, entries)
+                elif child.name == 'job-xml':
+                    job_xml_files.append(child.text)
+                else:
+                    entries[(ATTRIBUTE, 'global/' + child.name)] = child.text
+            if job_xml_files:
+                entries[(ATTRIBUTE, 'global/job-xml')] = tuple(job_xml_files)
+        elif element.name == 'credentials':
+            for credential in element.children:
+                path = 'credentials/' + credential.attributes.get('name')
+                entries[(ATTRIBUTE, path + '/@type')] = credential.attributes.get('type')
+                _properties(path, credential, entries)
+        elif element.name == 'start':
+            entries[(TRANSITION, 'start')] = element.attributes.get('to')
+        elif element.name != 'end':
+            _workflow_node(element, entries)
+
+
+def _coordinator_entries(root, entries):
+    # type: (_Element, typing.Dict) -> None
+    for element in root.children:
+        if element.name == 'parameters':
+            _properties('parameters', element, entries)
+        elif element.name == 'controls':
+            for control in element.children:
+                entries[(CONTROL, 'controls/' + control.name)] = control.text
+        elif element.name == 'action':
+            for workflow in element.children:
+                for child in workflow.children:
+                    if child.name == 'configuration':
+                        _properties('action/workflow/configuration', child, entries)
+                    else:
+                        entries[(ATTRIBUTE, 'action/workflow/' + child.name)] = child.text
+        else:
+            entries[(ATTRIBUTE, element.name)] = element.key()
+
+
+def _entries(app):
+    # type: (tags.XMLSerializable) -> typing.Dict[typing.Tuple[typing.Text, typing.Text], typing.Any]
+    builder = _TreeBuilder()
+    app._xml(*builder.tagtext())
+    root = builder.root.children[0]
+    entries = {
+        (ATTRIBUTE, '@' + name): value for name, value in root.attributes.items() if name != 'xmlns'
+    }  # type: typing.Dict[typing.Tuple[typing.Text, typing.Text], typing.Any]
+    if isinstance(app, tags.WorkflowApp):
+        _workflow_entries(root, entries)
+    else:
+        _coordinator_entries(root, entries)
+    return entries
+
+
+def diff_apps(old, new):
+    # type: (tags.XMLSerializable, tags.XMLSerializable) -> typing.List[Change]
+    """Compare two `WorkflowApp`s or two `CoordinatorApp`s, and list what was added, removed or changed.
+
+    Each node, transition, configuration property and control is compared on its own, and ordering that doesn't
+    change the app (such as the order of fork paths) is ignored. Runs in time linear in the size of the apps plus
+    sorting the changes. Unnamed entities are named randomly, so build apps within `tags.deterministic_names` for their
+    nodes to be matched up.
+    """
+    assert type(old) is type(new) and isinstance(old, (tags.WorkflowApp, tags.CoordinatorApp)), \
+        'Can only compare two workflow apps or two coordinator apps'
+    old_entries, new_entries = _entries(old), _entries(new)
+
+    changes = []
+    for key, value in old_entries.items():
+        if key not in new_entries:
+            changes.append(Change(REMOVED, key[0], key[1], value, None))
+        elif new_entries[key] != value:
+            changes.append(Change(CHANGED, key[0], key[1], value, new_entries[key]))
+    for key, value in new_entries.items():
+        if key not in old_entries:
+            changes.append(Change(ADDED, key[0], key[1], None, value))
+    return sorted(changes, key=lambda change: (change.path, change.category))
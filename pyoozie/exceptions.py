@@ -2,8 +2,7 @@
 # Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
 from __future__ import unicode_literals
 
-
-import requests
+import sys
 
 
 class OozieException(Exception):
@@ -54,7 +53,9 @@ class OozieException(Exception):
     @classmethod
     def communication_error(cls, message=None, caused_by=None):
         if not message:
-            if caused_by and isinstance(caused_by, requests.RequestException):
+            # Only the client imports requests, and nothing else raises its exceptions
+            requests = sys.modules.get('requests')
+            if caused_by and requests and isinstance(caused_by, requests.RequestException):
                 if caused_by.response is not None:
                     message = caused_by.response.headers.get('oozie-error-message', caused_by.response.reason)
         return OozieCommunicationException(message, caused_by)
@@ -0,0 +1,117 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+from __future__ import unicode_literals
+
+import copy
+import itertools
+import multiprocessing
+import typing  # pylint: disable=unused-import
+import uuid
+
+import six
+import yattag.simpledoc
+
+from pyoozie import tags
+from pyoozie import xml
+
+ParameterMatrix = typing.Dict[typing.Text, typing.Iterable[typing.Any]]
+Combination = typing.Dict[typing.Text, typing.Any]
+
+# The template a worker process renders with, set once per process rather than sent along with every combination
+_worker_template = None  # type: typing.Optional[CoordinatorTemplate]
+
+
+class CoordinatorTemplate(object):
+    """A `CoordinatorApp` rendered once, with slots for the parts that vary between the coordinators of a fleet.
+
+    Each coordinator gets the base app's name and workflow app path formatted with its combination of values (e.g.
+    `'orders-{shard}-{region}'`), and has the combination added to its parameters so that the workflow configuration
+    can refer to them as EL variables (e.g. `'${shard}'`). Everything else is copied from the base app's XML.
+    """
+
+    def __init__(self, base):
+        # type: (tags.CoordinatorApp) -> None
+        self.__name = base.name
+        self.__workflow_app_path = base.workflow_app_path
+        self.__parameters = {
+            key: xml._property_xml(key, value).encode('utf-8') for key, value in base.parameters.items()
+        }  # type: typing.Dict[typing.Text, bytes]
+
+        # Render the base app with placeholders that can be found and cut out again
+        token = uuid.uuid4().hex
+        name_token, path_token, parameter_token = ('{}-{}'.format(part, token) for part in ('name', 'path', 'param'))
+        prototype = copy.copy(base)
+        prototype.name = name_token
+        prototype.workflow_app_path = path_token
+        prototype.parameters = tags.Parameters({parameter_token: ''})
+        document = prototype.xml().decode('utf-8')
+
+        parameters = '<parameters>{}</parameters>'.format(xml._property_xml(parameter_token, ''))
+        head, tail = document.split(parameters)
+        self.__head = [part.encode('utf-8') for part in head.split(name_token)]
+        self.__tail = [part.encode('utf-8') for part in tail.split(path_token)]
+
+    def render(self, combination):
+        # type: (Combination) -> bytes
+        """Generate the XML document of the coordinator for a combination of values."""
+        values = {key: '{}'.format(value) for key, value in combination.items()}
+        name = tags.validate_xml_name(self.__name.format(**values))
+        workflow_app_path = self.__workflow_app_path.format(**values)
+
+        parameters = dict(self.__parameters)
+        parameters.update((key, xml._property_xml(key, value).encode('utf-8')) for key, value in values.items())
+        pieces = [self.__head[0], yattag.simpledoc.attr_escape(name).encode('utf-8'), self.__head[1]]
+        if parameters:
+            pieces.append(b'<parameters>')
+            pieces.extend(parameters[key] for key in sorted(parameters))
+            pieces.append(b'</parameters>')
+        pieces.append(self.__tail[0])
+        pieces.append(yattag.simpledoc.html_escape(workflow_app_path).encode('utf-8'))
+        pieces.append(self.__tail[1])
+        return b''.join(pieces)
+
+
+def _combinations(matrix):
+    # type: (ParameterMatrix) -> typing.List[Combination]
+    keys = sorted(matrix)
+    return [dict(zip(keys, values)) for values in itertools.product(*(matrix[key] for key in keys))]
+
+
+def _initialize_worker(template):
+    # type: (CoordinatorTemplate) -> None
+    global _worker_template  # pylint: disable=global-statement
+    _worker_template = template
+
+
+def _render_in_worker(combination):
+    # type: (Combination) -> bytes
+    return _worker_template.render(combination)
+
+
+def generate_coordinators(
+        base,            # type: tags.CoordinatorApp
+        matrix,          # type: ParameterMatrix
+        processes=None,  # type: typing.Optional[int]
+        chunksize=256    # type: int
+):
+    # type: (...) -> typing.Iterator[typing.Tuple[Combination, bytes]]
+    """Generate a coordinator for every combination of the values in `matrix`, e.g. `{'shard': range(8), ...}`.
+
+    Yields (combination, XML document) pairs in a stable order; see `CoordinatorTemplate` for how each combination is
+    applied to `base`. Rendering is spread over a pool of `processes` worker processes if given.
+    """
+    template = CoordinatorTemplate(base)
+    combinations = _combinations(matrix)
+    if not processes or processes <= 1:
+        for combination in combinations:
+            yield combination, template.render(combination)
+        return
+
+    pool = multiprocessing.Pool(processes, initializer=_initialize_worker, initargs=(template,))
+    try:
+        documents = pool.imap(_render_in_worker, combinations, chunksize)
+        for combination, document in six.moves.zip(combinations, documents):
+            yield combination, document
+    finally:
+        pool.terminate()
+        pool.join()
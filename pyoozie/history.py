@@ -0,0 +1,94 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+"""A persistent store of the jobs Oozie has run successfully, which are unlikely to change, so aren't fetched again."""
+from __future__ import unicode_literals
+
+import json
+import sqlite3
+import threading
+import typing  # pylint: disable=unused-import
+
+from pyoozie import model
+
+Details = typing.Dict[typing.Text, typing.Any]
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, coordinator TEXT, number INTEGER, details TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS jobs_by_coordinator ON jobs (coordinator, number)',
+)
+
+
+def is_final(details):
+    # type: (Details) -> bool
+    """Whether a coordinator action or a workflow, as Oozie describes it, has succeeded.
+
+    Jobs that failed or were killed are often rerun, by anyone, so may well change again.
+    """
+    job_id = details.get('id') or ''
+    coord_id, coord_action = model.parse_coordinator_id(job_id)
+    wf_id, wf_action = model.parse_workflow_id(job_id)
+    if coord_id and coord_action:
+        status_type = model.CoordinatorActionStatus
+    elif wf_id and not wf_action:
+        status_type = model.WorkflowStatus
+    else:
+        return False
+    return status_type.parse(details.get('status') or '') == status_type.SUCCEEDED
+
+
+class JobHistory(object):
+    """A SQLite database of the coordinator actions and workflows, with their actions, that have succeeded.
+
+    Jobs are kept as Oozie described them, keyed by ID; anything passed to `put` that isn't final is ignored. The
+    database may be shared by any number of clients and threads. A job that's rerun is running again, so must be
+    forgotten; `OozieClient` does so for the coordinator actions it reruns.
+    """
+
+    def __init__(self, path):
+        # type: (typing.Text) -> None
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            for statement in _SCHEMA:
+                self._connection.execute(statement)
+
+    def get(self, job_id):
+        # type: (typing.Text) -> typing.Optional[Details]
+        """The coordinator action or workflow `job_id`, if it's been stored."""
+        with self._lock:
+            row = self._connection.execute('SELECT details FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def coordinator_actions(self, coordinator_id, start=1):
+        # type: (typing.Text, int) -> typing.Dict[int, Details]
+        """The actions of `coordinator_id` that have been stored, by action number, from `start` on."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT number, details FROM jobs WHERE coordinator = ? AND number >= ? ORDER BY number',
+                (coordinator_id, start)).fetchall()
+        return {number: json.loads(details) for number, details in rows}
+
+    def put(self, jobs):
+        # type: (typing.Iterable[Details]) -> int
+        """Store those of `jobs` that are final, replacing any already stored; returns how many were stored."""
+        rows = []
+        for details in jobs:
+            if is_final(details):
+                coord_id, action = model.parse_coordinator_id(details['id'])
+                rows.append((details['id'], coord_id, action, json.dumps(details)))
+        if rows:
+            with self._lock, self._connection:
+                self._connection.executemany(
+                    'INSERT OR REPLACE INTO jobs (id, coordinator, number, details) VALUES (?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def forget(self, job_id):
+        # type: (typing.Text) -> None
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+
+    def close(self):
+        # type: () -> None
+        with self._lock:
+            self._connection.close()
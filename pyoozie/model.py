@@ -9,9 +9,9 @@ import sys
 
 import enum
 import typing  # pylint: disable=unused-import
-import untangle
 
 from pyoozie import exceptions
+from pyoozie import profiling
 
 
 _COORD_ID_RE = re.compile('^(?P<id>.*-C)(?:@(?P<action>[1-9][0-9]*))?$')
@@ -94,6 +94,7 @@ def _parse_configuration(_, conf_string):
     if conf_string is None:
         return None
     elif conf_string:
+        import untangle  # Slow to import, and only needed once there's configuration to parse
         xml = conf_string if sys.version_info >= (3, 0) else conf_string.encode('utf-8')
         conf = untangle.parse(xml).configuration
         return {prop.name.cdata: prop.value.cdata for prop in conf.property}
@@ -101,6 +102,13 @@ def _parse_configuration(_, conf_string):
         return {}
 
 
+# Parsers whose time is profiled separately from the rest of model construction
+_PROFILED_PARSERS = {
+    _parse_time: profiling.TIME,
+    _parse_configuration: profiling.CONF,
+}
+
+
 def _parse_workflow_actions(artifact, actions_list):
     actions_list = actions_list or []
     actions = [WorkflowAction(artifact._client, action, parent=artifact) for action in actions_list]
@@ -108,9 +116,15 @@ def _parse_workflow_actions(artifact, actions_list):
 
 
 def _parse_coordinator_actions(artifact, actions_list):
-    actions_list = actions_list or []
-    actions = [CoordinatorAction(artifact._client, action, parent=artifact) for action in actions_list]
-    return {action.actionNumber: action for action in actions}
+    actions = {}
+    for action in actions_list or []:
+        if isinstance(action, CoordinatorAction):
+            # Already constructed while the reply was being read
+            action._parent = artifact
+        else:
+            action = CoordinatorAction(artifact._client, action, parent=artifact)
+        actions[action.actionNumber] = action
+    return actions
 
 
 def _parse_coordinator_status(_, status_string):
@@ -257,6 +271,13 @@ class _OozieArtifact(object):
     def __init__(self, oozie_client, details, parent=None):
         self._client = oozie_client
         self._parent = parent
+        profile = profiling.active(oozie_client)
+        if profile:
+            profile.call(profiling.MODEL, type(self).__name__, self.__parse, details, profile)
+        else:
+            self.__parse(details)
+
+    def __parse(self, details, profile=None):
         details = dict(details)
         for key, func in self.REQUIRED_KEYS.items():
             value = details.pop(key, None)
@@ -270,14 +291,27 @@ class _OozieArtifact(object):
                 setattr(self, key, parsed_value)
         for key, func in self.SUPPORTED_KEYS.items():
             value = details.pop(key, None)
-            value = func(self, value) if func else value
+            if func:
+                value = func(self, value) if profile is None else self.__profile_value(key, func, value, profile)
             setattr(self, key, value)
         self._details = details
         self._validate_degenerate_fields()
 
+    def __profile_value(self, key, func, value, profile):
+        phase = _PROFILED_PARSERS.get(func)
+        if phase:
+            return profile.call(phase, '{}.{}'.format(type(self).__name__, key), func, self, value)
+        return func(self, value)
+
     def __str__(self):
         return self.toString
 
+    def __getstate__(self):
+        # Clients hold sessions and locks, so aren't pickled; give an unpickled job one with pyoozie.snapshot.rehydrate
+        state = dict(self.__dict__)
+        state['_client'] = None
+        return state
+
     def fill_in_details(self):
         # Fetch any missing data not supplied
         return self
@@ -441,7 +475,8 @@ class CoordinatorAction(_OozieArtifact):
 
     def coordinator(self):
         if not self._parent:
-            self._parent = self._client.job_coordinator_info(coordinator_id=self.coordJobId)
+            # Only the coordinator's own details are wanted; its other actions are fetched if ever asked for
+            self._parent = self._client.job_last_coordinator_info(coordinator_id=self.coordJobId)
         return self._parent
 
     def coordinator_action(self):
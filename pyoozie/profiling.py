@@ -0,0 +1,131 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+from __future__ import unicode_literals
+
+import collections
+import contextlib
+import threading
+import timeit
+import typing  # pylint: disable=unused-import
+
+# Phases of a client session
+NETWORK = 'network'  # Waiting for Oozie to reply
+JSON = 'json'  # Decoding replies
+MODEL = 'model'  # Constructing model objects, other than parsing their configuration and times
+CONF = 'conf'  # Parsing configuration XML
+TIME = 'time'  # Parsing times
+OTHER = 'other'  # Anything else, e.g. the caller's own code
+PHASES = (NETWORK, JSON, MODEL, CONF, TIME)
+
+# Profiles being recorded, by the id() of the client they profile
+_active = {}  # type: typing.Dict[int, Profile]
+
+
+class Profile(object):
+    """Where the time of a client session went, by phase and by call site within pyoozie.
+
+    Call sites are requests by method and endpoint (e.g. 'GET jobs') for the network and JSON phases, model classes
+    (e.g. 'CoordinatorAction') for model construction and fields (e.g. 'CoordinatorAction.nominalTime') for parsing.
+    Time is only counted towards the innermost phase, so that phases don't overlap. When requests are made
+    concurrently the phases can add up to more than the wall time.
+    """
+
+    def __init__(self, clock=timeit.default_timer):
+        # type: (typing.Callable[[], float]) -> None
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._totals = collections.defaultdict(lambda: [0, 0.0])  # type: typing.Dict[typing.Tuple, typing.List]
+        self._start = clock()
+        self._wall = None  # type: typing.Optional[float]
+
+    def call(self, phase, site, func, *args, **kwargs):
+        # type: (typing.Text, typing.Text, typing.Callable, *typing.Any, **typing.Any) -> typing.Any
+        """Call `func`, counting the time it takes towards `phase` at `site`, less that of any phases within it."""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+        start = self._clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = self._clock() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self._lock:
+                total = self._totals[(phase, site)]
+                total[0] += 1
+                total[1] += elapsed - nested
+
+    def stop(self):
+        # type: () -> None
+        self._wall = self._clock() - self._start
+
+    @property
+    def wall(self):
+        # type: () -> float
+        return self._wall if self._wall is not None else self._clock() - self._start
+
+    def totals(self):
+        # type: () -> typing.Dict[typing.Tuple[typing.Text, typing.Text], typing.Tuple[int, float]]
+        """The number of calls and seconds spent for each (phase, call site)."""
+        with self._lock:
+            return {key: (count, seconds) for key, (count, seconds) in self._totals.items()}
+
+    def phases(self):
+        # type: () -> typing.Dict[typing.Text, float]
+        """The seconds spent in each phase, including the time that went to none of them."""
+        phases = collections.OrderedDict((phase, 0.0) for phase in PHASES)
+        for (phase, _), (_, seconds) in self.totals().items():
+            phases[phase] += seconds
+        phases[OTHER] = max(self.wall - sum(phases.values()), 0.0)
+        return phases
+
+    def report(self, to_logger):
+        # type: (typing.Any) -> None
+        to_logger.info(
+            "OozieClient Profile: wall=%.1fms %s", self.wall * 1000,
+            ' '.join('{}={:.1f}ms'.format(phase, seconds * 1000) for phase, seconds in self.phases().items()))
+        totals = sorted(self.totals().items(), key=lambda item: (-item[1][1], item[0]))
+        for (phase, site), (count, seconds) in totals:
+            to_logger.info("  %s %s: calls=%s total=%.1fms", phase, site, count, seconds * 1000)
+
+
+def active(client):
+    # type: (typing.Any) -> typing.Optional[Profile]
+    """The profile being recorded for `client`, if any."""
+    return _active.get(id(client)) if _active else None
+
+
+def call(
+        profile,  # type: typing.Optional[Profile]
+        phase,    # type: typing.Text
+        site,     # type: typing.Text
+        func,     # type: typing.Callable
+        *args,    # type: typing.Any
+        **kwargs  # type: typing.Any
+):
+    # type: (...) -> typing.Any
+    """Call `func`, as `Profile.call` if `profile` is set."""
+    if profile is None:
+        return func(*args, **kwargs)
+    return profile.call(phase, site, func, *args, **kwargs)
+
+
+@contextlib.contextmanager
+def recording(client):
+    # type: (typing.Any) -> typing.Generator[Profile, None, None]
+    """Record a new profile of `client` within the block, in place of any already being recorded."""
+    profile = Profile()
+    previous = _active.get(id(client))
+    _active[id(client)] = profile
+    try:
+        yield profile
+    finally:
+        profile.stop()
+        if previous is None:
+            del _active[id(client)]
+        else:
+            _active[id(client)] = previous
@@ -0,0 +1,562 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import collections
+import datetime
+import io
+import typing  # pylint: disable=unused-import
+import xml.etree.ElementTree as et
+
+import six
+
+from pyoozie import exceptions
+from pyoozie import tags
+
+_DATETIME_FORMAT = '%Y-%m-%dT%H:%MZ'
+
+XMLSource = typing.Union[typing.Text, bytes, typing.BinaryIO]
+
+
+def _local_name(element):
+    # type: (et.Element) -> typing.Text
+    return six.text_type(element.tag).rsplit('}', 1)[-1]
+
+
+def _text(element):
+    # type: (et.Element) -> typing.Text
+    return six.text_type(element.text or '')
+
+
+def _open(source):
+    # type: (XMLSource) -> typing.Union[typing.Text, typing.BinaryIO, typing.TextIO]
+    # XML documents, as bytes or text, can be passed in directly; anything else is a filename or a binary file object
+    if isinstance(source, bytes) and source.lstrip().startswith(b'<'):
+        return io.BytesIO(source)
+    if isinstance(source, six.text_type) and source.lstrip().startswith('<'):
+        return io.StringIO(source)
+    return source
+
+
+class _Node(object):
+    """A workflow graph node, reduced to what's needed to rebuild the entity it was generated from."""
+
+    __slots__ = ('tag', 'identifier', 'attributes', 'content', 'ok', 'error', 'cases', 'default', 'paths')
+
+    def __init__(self, tag, identifier):
+        # type: (typing.Text, typing.Text) -> None
+        self.tag = tag
+        self.identifier = identifier
+        self.attributes = {}  # type: typing.Dict[typing.Text, typing.Text]
+        self.content = None  # type: typing.Any
+        self.ok = None  # type: typing.Optional[typing.Text]
+        self.error = None  # type: typing.Optional[typing.Text]
+        self.cases = []  # type: typing.List[typing.Tuple[typing.Text, typing.Text]]
+        self.default = None  # type: typing.Optional[typing.Text]
+        self.paths = []  # type: typing.List[typing.Text]
+
+
+class _Structure(object):
+    """Nodes grouped the way they're chained by their 'ok' transitions, before error handlers are attached."""
+
+    __slots__ = ('kind', 'node', 'members', 'on_next', 'error_targets')
+
+    def __init__(
+            self,
+            kind,          # type: typing.Text
+            node=None,     # type: typing.Optional[_Node]
+            members=None,  # type: typing.Optional[typing.List[_Structure]]
+            on_next=None   # type: typing.Optional[typing.Text]
+    ):
+        # type: (...) -> None
+        self.kind = kind
+        self.node = node
+        self.members = members or []  # type: typing.List[typing.Any]
+        self.on_next = on_next
+        self.error_targets = collections.Counter()  # type: typing.Counter[typing.Text]
+
+
+class _Reader(object):
+
+    def __init__(self, source):
+        # type: (XMLSource) -> None
+        self._source = _open(source)
+        self._unsupported = []  # type: typing.List[typing.Text]
+
+    def _iterparse(self, root_tag):
+        # type: (typing.Text) -> typing.Generator[typing.Tuple[et.Element, et.Element], None, None]
+        # Yield each child of the root as soon as it's complete, then discard it so that memory use doesn't grow with
+        # the size of the document
+        depth = 0
+        root = None
+        for event, element in et.iterparse(self._source, events=(str('start'), str('end'))):
+            if event == 'start':
+                depth += 1
+                if depth == 1:
+                    root = element
+                    if _local_name(root) != root_tag:
+                        raise exceptions.OozieException.parse_error(
+                            "Expected a '{expected}' document, got '{actual}'".format(
+                                expected=root_tag, actual=_local_name(root)))
+                    yield root, root
+            else:
+                depth -= 1
+                if depth == 1:
+                    yield root, element
+                    root.clear()
+
+    def _report(self, parent, element):
+        # type: (typing.Text, et.Element) -> None
+        self._unsupported.append('{parent}/{tag}'.format(parent=parent, tag=_local_name(element)))
+
+    def _check_supported(self):
+        # type: () -> None
+        if self._unsupported:
+            raise exceptions.OozieException.parse_error(
+                'Unsupported element(s): {}'.format(', '.join(self._unsupported)))
+
+    def _properties(self, parent, element):
+        # type: (typing.Text, et.Element) -> typing.Dict[typing.Text, typing.Text]
+        values = {}
+        for child in element:
+            if _local_name(child) != 'property':
+                self._report(parent, child)
+                continue
+            name = value = None
+            for field in child:
+                if _local_name(field) == 'name':
+                    name = _text(field)
+                elif _local_name(field) == 'value':
+                    value = _text(field)
+                elif _local_name(field) != 'description':
+                    self._report(parent + '/property', field)
+            if name:
+                values[name] = value or ''
+        return values
+
+
+class _WorkflowReader(_Reader):
+
+    def __init__(self, source):
+        # type: (XMLSource) -> None
+        super(_WorkflowReader, self).__init__(source)
+        self.__arguments = {'credentials': []}  # type: typing.Dict[typing.Text, typing.Any]
+        self.__nodes = {}  # type: typing.Dict[typing.Text, _Node]
+        self.__start = None  # type: typing.Optional[typing.Text]
+        self.__end = 'end'
+        self.__joins = {}  # type: typing.Dict[typing.Text, typing.Optional[typing.Text]]
+        self.__merges = {}  # type: typing.Dict[typing.Text, typing.Optional[typing.Text]]
+        self.__used = set()  # type: typing.Set[typing.Text]
+
+    def read(self):
+        # type: () -> tags.WorkflowApp
+        for root, element in self._iterparse('workflow-app'):
+            if element is root:
+                self.__arguments['name'] = root.get('name')
+            else:
+                self.__read_element(element)
+        self._check_supported()
+        if self.__start is None:
+            raise exceptions.OozieException.parse_error("Workflow has no 'start' node")
+
+        entities = self.__entity(self.__chain(self.__start, self.__end), self.__end)
+        unreachable = set(self.__nodes) - self.__used
+        if unreachable:
+            raise exceptions.OozieException.parse_error(
+                'Unreachable node(s): {}'.format(', '.join(sorted(unreachable))))
+        return tags.WorkflowApp(entities=entities, **self.__arguments)
+
+    def __read_element(self, element):
+        # type: (et.Element) -> None
+        tag = _local_name(element)
+        if tag == 'parameters':
+            self.__arguments['parameters'] = self._properties(tag, element)
+        elif tag == 'global':
+            for child in element:
+                child_tag = _local_name(child)
+                if child_tag in ('job-tracker', 'name-node'):
+                    self.__arguments[child_tag.replace('-', '_')] = _text(child)
+                elif child_tag == 'job-xml':
+                    self.__arguments.setdefault('job_xml_files', []).append(_text(child))
+                elif child_tag == 'configuration':
+                    self.__arguments['configuration'] = self._properties('global/configuration', child)
+                else:
+                    self._report(tag, child)
+        elif tag == 'credentials':
+            for child in element:
+                if _local_name(child) == 'credential':
+                    self.__arguments['credentials'].append(tags.Credential(
+                        self._properties('credentials/credential', child),
+                        credential_name=child.get('name'), credential_type=child.get('type')))
+                else:
+                    self._report(tag, child)
+        elif tag == 'start':
+            self.__start = element.get('to')
+        elif tag == 'end':
+            self.__end = element.get('name')
+        elif tag in self.__node_readers:
+            node = _Node(tag, element.get('name'))
+            node.attributes = dict(element.attrib)
+            self.__node_readers[tag](self, node, element)
+            self.__nodes[node.identifier] = node
+        else:
+            self._report('workflow-app', element)
+
+    def __read_action(self, node, element):
+        # type: (_Node, et.Element) -> None
+        for child in element:
+            tag = _local_name(child)
+            if tag == 'ok':
+                node.ok = child.get('to')
+            elif tag == 'error':
+                node.error = child.get('to')
+            elif tag in self.__action_readers and node.content is None:
+                node.content = self.__action_readers[tag](self, node.identifier, child)
+            else:
+                self._report(node.identifier, child)
+
+    def __read_shell(self, parent, element):
+        # type: (typing.Text, et.Element) -> tags.Shell
+        arguments = {'arguments': [], 'env_vars': {}, 'files': [], 'archives': [],
+                     'job_xml_files': []}  # type: typing.Dict[typing.Text, typing.Any]
+        for child in element:
+            tag = _local_name(child)
+            if tag in ('job-tracker', 'name-node'):
+                arguments[tag.replace('-', '_')] = _text(child)
+            elif tag == 'exec':
+                arguments['exec_command'] = _text(child)
+            elif tag == 'job-xml':
+                arguments['job_xml_files'].append(_text(child))
+            elif tag == 'configuration':
+                arguments['configuration'] = self._properties(parent + '/shell/configuration', child)
+            elif tag in ('argument', 'file', 'archive'):
+                arguments[tag + 's'].append(_text(child))
+            elif tag == 'env-var':
+                key, _, value = _text(child).partition('=')
+                arguments['env_vars'][key] = value
+            elif tag == 'capture-output':
+                arguments['capture_output'] = True
+            else:
+                self._report(parent + '/shell', child)
+        return tags.Shell(**arguments)
+
+    def __read_sub_workflow(self, parent, element):
+        # type: (typing.Text, et.Element) -> tags.SubWorkflow
+        arguments = {'propagate_configuration': False}  # type: typing.Dict[typing.Text, typing.Any]
+        for child in element:
+            tag = _local_name(child)
+            if tag == 'app-path':
+                arguments['app_path'] = _text(child)
+            elif tag == 'propagate-configuration':
+                arguments['propagate_configuration'] = True
+            elif tag == 'configuration':
+                arguments['configuration'] = self._properties(parent + '/sub-workflow/configuration', child)
+            else:
+                self._report(parent + '/sub-workflow', child)
+        return tags.SubWorkflow(**arguments)
+
+    def __read_email(self, parent, element):
+        # type: (typing.Text, et.Element) -> tags.Email
+        arguments = {}  # type: typing.Dict[typing.Text, typing.Any]
+        for child in element:
+            tag = _local_name(child)
+            if tag in ('to', 'cc', 'bcc'):
+                arguments[tag] = _text(child).split(',')
+            elif tag in ('subject', 'body', 'content_type'):
+                arguments[tag] = _text(child)
+            elif tag == 'attachment':
+                arguments['attachments'] = _text(child)
+            else:
+                self._report(parent + '/email', child)
+        return tags.Email(**arguments)
+
+    def __read_decision(self, node, element):
+        # type: (_Node, et.Element) -> None
+        for child in element:
+            if _local_name(child) != 'switch':
+                self._report(node.identifier, child)
+                continue
+            for case in child:
+                if _local_name(case) == 'case':
+                    node.cases.append((_text(case), case.get('to')))
+                elif _local_name(case) == 'default':
+                    node.default = case.get('to')
+                else:
+                    self._report(node.identifier + '/switch', case)
+
+    def __read_fork(self, node, element):
+        # type: (_Node, et.Element) -> None
+        for child in element:
+            if _local_name(child) == 'path':
+                node.paths.append(child.get('start'))
+            else:
+                self._report(node.identifier, child)
+
+    def __read_join(self, node, element):
+        # type: (_Node, et.Element) -> None
+        node.ok = element.get('to')
+
+    def __read_kill(self, node, element):
+        # type: (_Node, et.Element) -> None
+        for child in element:
+            if _local_name(child) == 'message':
+                node.content = _text(child)
+            else:
+                self._report(node.identifier, child)
+
+    __action_readers = {
+        'email': __read_email,
+        'shell': __read_shell,
+        'sub-workflow': __read_sub_workflow,
+    }  # type: typing.Dict[typing.Text, typing.Callable[..., typing.Any]]
+
+    __node_readers = {
+        'action': __read_action,
+        'decision': __read_decision,
+        'fork': __read_fork,
+        'join': __read_join,
+        'kill': __read_kill,
+    }  # type: typing.Dict[typing.Text, typing.Callable[..., None]]
+
+    def __node(self, identifier):
+        # type: (typing.Text) -> _Node
+        if identifier not in self.__nodes:
+            raise exceptions.OozieException.parse_error("Transition to unknown node '{}'".format(identifier))
+        return self.__nodes[identifier]
+
+    def __next(self, identifier):
+        # type: (typing.Text) -> typing.Optional[typing.Text]
+        # The node that follows once the entity starting at `identifier` completes successfully
+        node = self.__node(identifier)
+        if node.tag == 'action':
+            return node.ok
+        elif node.tag == 'fork':
+            join = self.__join(node)
+            return self.__node(join).ok if join else None
+        elif node.tag == 'decision':
+            return self.__merge(node)
+        return None
+
+    def __path(self, identifier):
+        # type: (typing.Optional[typing.Text]) -> typing.List[typing.Text]
+        # The nodes visited by following successful transitions from `identifier` until a join, the end or a kill
+        path = []
+        while identifier is not None:
+            path.append(identifier)
+            if identifier == self.__end or self.__node(identifier).tag == 'join':
+                break
+            identifier = self.__next(identifier)
+        return path
+
+    def __join(self, fork):
+        # type: (_Node) -> typing.Optional[typing.Text]
+        if fork.identifier not in self.__joins:
+            self.__joins[fork.identifier] = None
+            for path in fork.paths:
+                last = self.__path(path)[-1]
+                if last != self.__end and self.__node(last).tag == 'join':
+                    self.__joins[fork.identifier] = last
+                    break
+        return self.__joins[fork.identifier]
+
+    def __merge(self, decision):
+        # type: (_Node) -> typing.Optional[typing.Text]
+        # All branches of a decision continue to the same node, unless they end in a kill node
+        if decision.identifier not in self.__merges:
+            self.__merges[decision.identifier] = None
+            paths = [self.__path(to) for to in [decision.default] + [to for _, to in decision.cases]]
+            paths = [path for path in paths if path[-1] == self.__end or self.__node(path[-1]).tag != 'kill']
+            if paths:
+                others = [set(path) for path in paths[1:]]
+                self.__merges[decision.identifier] = next(
+                    (identifier for identifier in paths[0] if all(identifier in other for other in others)), None)
+        return self.__merges[decision.identifier]
+
+    def __chain(self, identifier, stop):
+        # type: (typing.Optional[typing.Text], typing.Optional[typing.Text]) -> _Structure
+        chain = _Structure('serial', on_next=stop)
+        while identifier is not None and identifier != stop:
+            if identifier == self.__end or identifier in self.__used:
+                raise exceptions.OozieException.parse_error(
+                    "Transition to '{}' can't be represented".format(identifier))
+            node = self.__node(identifier)
+            self.__used.add(identifier)
+            if node.tag == 'action':
+                member = _Structure('action', node=node)
+                member.error_targets[node.error] += 1
+                identifier = node.ok
+            elif node.tag == 'kill':
+                member = _Structure('kill', node=node)
+                identifier = None
+            elif node.tag == 'fork':
+                join = self.__join(node)
+                if join is None:
+                    raise exceptions.OozieException.parse_error("Fork '{}' has no join".format(identifier))
+                self.__used.add(join)
+                member = _Structure('fork', node=node, members=[self.__chain(path, join) for path in node.paths])
+                identifier = self.__node(join).ok
+            elif node.tag == 'decision':
+                merge = self.__merge(node)
+                member = _Structure('decision', node=node, members=[self.__chain(node.default, merge)] + [
+                    self.__chain(to, merge) for _, to in node.cases])
+                identifier = merge
+            else:
+                raise exceptions.OozieException.parse_error(
+                    "Transition to '{}' can't be represented".format(identifier))
+            for child in member.members:
+                member.error_targets.update(child.error_targets)
+            chain.members.append(member)
+            chain.error_targets.update(member.error_targets)
+
+        # Let each member know where it continues to
+        for member, on_next in zip(chain.members, [m.node.identifier for m in chain.members[1:]] + [stop]):
+            member.on_next = on_next
+        return chain
+
+    @staticmethod
+    def __name(node):
+        # type: (_Node) -> typing.Text
+        # Entities prefix their name with their tag to form their identifier
+        prefix = node.tag + '-'
+        return node.identifier[len(prefix):] if node.identifier.startswith(prefix) else node.identifier
+
+    def __entity(self, structure, on_error):
+        # type: (_Structure, typing.Text) -> typing.Optional[tags._AbstractWorkflowEntity]
+        # An error handler belongs to the innermost entity that contains every action transitioning to it
+        handler = None
+        targets = [target for target, count in structure.error_targets.items() if target != on_error and not any(
+            member.error_targets[target] == count for member in structure.members)]
+        if len(targets) == 1:
+            target = targets[0]
+            if target == self.__end:
+                raise exceptions.OozieException.parse_error(
+                    "Error transition to '{}' can't be represented".format(target))
+            handler = self.__entity(self.__chain(target, structure.on_next), on_error)
+            on_error = target
+        elif targets:
+            raise exceptions.OozieException.parse_error(
+                "Error transitions to '{}' can't be represented".format("', '".join(sorted(targets))))
+
+        node = structure.node
+        if structure.kind == 'action':
+            if node.error != on_error:
+                raise exceptions.OozieException.parse_error(
+                    "Error transition from '{}' can't be represented".format(node.identifier))
+            if node.content is None:
+                raise exceptions.OozieException.parse_error("Action '{}' has no action".format(node.identifier))
+            return tags.Action(node.content, name=self.__name(node), credential=node.attributes.get('cred'),
+                               retry_max=self.__int(node.attributes.get('retry-max')),
+                               retry_interval=self.__int(node.attributes.get('retry-interval')), on_error=handler)
+        elif structure.kind == 'kill':
+            return tags.Kill(node.content or '', name=self.__name(node))
+        elif structure.kind == 'fork':
+            return tags.Parallel(*[self.__entity(member, on_error) for member in structure.members],
+                                 name=self.__name(node), on_error=handler)
+        elif structure.kind == 'decision':
+            if not all(member.members for member in structure.members):
+                raise exceptions.OozieException.parse_error(
+                    "Decision '{}' has a case that skips to its continuation".format(node.identifier))
+            default = self.__entity(structure.members[0], on_error)
+            choices = {case: self.__entity(member, on_error)
+                       for (case, _), member in zip(node.cases, structure.members[1:])}
+            return tags.Decision(default=default, choices=choices, name=self.__name(node), on_error=handler)
+
+        members = [self.__entity(member, on_error) for member in structure.members]
+        if len(members) == 1 and handler is None:
+            return members[0]
+        return tags.Serial(*members, on_error=handler)
+
+    @staticmethod
+    def __int(value):
+        # type: (typing.Optional[typing.Text]) -> typing.Optional[int]
+        return int(value) if value is not None else None
+
+
+class _CoordinatorReader(_Reader):
+
+    def read(self):
+        # type: () -> tags.CoordinatorApp
+        arguments = {}  # type: typing.Dict[typing.Text, typing.Any]
+        for root, element in self._iterparse('coordinator-app'):
+            if element is root:
+                arguments.update(
+                    name=root.get('name'),
+                    frequency=self.__number(root.get('frequency')),
+                    start=self.__datetime(root.get('start')),
+                    end=self.__datetime(root.get('end')),
+                    timezone=root.get('timezone'),
+                )
+                continue
+            tag = _local_name(element)
+            if tag == 'parameters':
+                arguments['parameters'] = self._properties(tag, element)
+            elif tag == 'controls':
+                for child in element:
+                    child_tag = _local_name(child)
+                    if child_tag in ('timeout', 'concurrency', 'throttle'):
+                        arguments[child_tag] = self.__number(_text(child))
+                    elif child_tag == 'execution':
+                        arguments['execution_order'] = tags.ExecutionOrder(_text(child))
+                    else:
+                        self._report(tag, child)
+            elif tag == 'action':
+                self.__read_action(element, arguments)
+            else:
+                self._report('coordinator-app', element)
+        self._check_supported()
+
+        if not isinstance(arguments.get('frequency'), six.integer_types):
+            raise exceptions.OozieException.parse_error(
+                "Frequency '{}' is not a number of minutes".format(arguments.get('frequency')))
+        if 'workflow_app_path' not in arguments:
+            raise exceptions.OozieException.parse_error('Coordinator has no workflow action')
+        return tags.CoordinatorApp(**arguments)
+
+    def __read_action(self, element, arguments):
+        # type: (et.Element, typing.Dict[typing.Text, typing.Any]) -> None
+        for child in element:
+            if _local_name(child) != 'workflow':
+                self._report('action', child)
+                continue
+            for field in child:
+                if _local_name(field) == 'app-path':
+                    arguments['workflow_app_path'] = _text(field)
+                elif _local_name(field) == 'configuration':
+                    arguments['workflow_configuration'] = self._properties('action/workflow/configuration', field)
+                else:
+                    self._report('action/workflow', field)
+
+    @staticmethod
+    def __number(value):
+        # type: (typing.Optional[typing.Text]) -> typing.Any
+        # Controls may be EL expressions rather than numbers
+        try:
+            return int(value) if value is not None else None
+        except ValueError:
+            return value
+
+    @staticmethod
+    def __datetime(value):
+        # type: (typing.Optional[typing.Text]) -> typing.Optional[datetime.datetime]
+        try:
+            return datetime.datetime.strptime(value, _DATETIME_FORMAT) if value else None
+        except ValueError as error:
+            raise exceptions.OozieException.parse_error("Unsupported date '{}'".format(value), caused_by=error)
+
+
+def parse_workflow_app(source):
+    # type: (XMLSource) -> tags.WorkflowApp
+    """Read a `workflow-app` XML document from a filename, a binary file-like object or the document (bytes or text).
+
+    The document is read incrementally. Nodes are rebuilt into the entities (`Serial`, `Parallel`, `Decision`, ...)
+    that generate the same graph, although not necessarily in the same order. Unsupported elements and graphs that
+    can't be represented are reported by raising an `OozieParsingException`.
+    """
+    return _WorkflowReader(source).read()
+
+
+def parse_coordinator_app(source):
+    # type: (XMLSource) -> tags.CoordinatorApp
+    """Read a `coordinator-app` XML document; see `parse_workflow_app`."""
+    return _CoordinatorReader(source).read()
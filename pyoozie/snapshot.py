@@ -0,0 +1,229 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+"""Snapshots of jobs, with their actions and any workflows loaded for them, that can be loaded without Oozie.
+
+A snapshot is a header followed by a zlib-compressed JSON document for each job. Fields are stored as parsed, e.g. times
+as seconds since the epoch and configuration as a dict, so loading a job doesn't parse them again; and jobs are only
+decoded when they're first accessed. Loaded jobs have no client, so can't fetch anything that wasn't in the snapshot
+until they're given one with `rehydrate` or `Snapshot.rehydrate`.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import datetime
+import json
+import struct
+import typing  # pylint: disable=unused-import
+import zlib
+
+from pyoozie import decoder
+from pyoozie import model
+
+MAGIC = b'PYOOZIE\x00'
+VERSION = 1
+
+# Version and length of the index that follows the magic bytes
+_HEADER = struct.Struct(str('>HI'))
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+_TYPES = {cls.__name__: cls for cls in (model.Coordinator, model.CoordinatorAction, model.Workflow,
+                                        model.WorkflowAction)}
+
+_STATUS_TYPES = {
+    model._parse_coordinator_status: model.CoordinatorStatus,
+    model._parse_coordinator_action_status: model.CoordinatorActionStatus,
+    model._parse_workflow_status: model.WorkflowStatus,
+    model._parse_workflow_action_status: model.WorkflowActionStatus,
+}
+
+_ACTION_PARSERS = (model._parse_coordinator_actions, model._parse_workflow_actions)
+
+# Where each type keeps the workflow loaded for it, if any
+_LINKS = {
+    model.Coordinator: '_workflow',
+    model.CoordinatorAction: '_workflow',
+    model.Workflow: '_workflow',
+    model.WorkflowAction: '_subworkflow',
+}
+
+Record = typing.Dict[typing.Text, typing.Any]
+Fields = typing.List[typing.Tuple[typing.Text, typing.Any]]
+
+
+def _keys(cls):
+    # type: (typing.Type[model._OozieArtifact]) -> Fields
+    return list(cls.REQUIRED_KEYS.items()) + list(cls.SUPPORTED_KEYS.items())
+
+
+def _is_converted(func):
+    # type: (typing.Any) -> bool
+    return func is model._parse_time or func in _STATUS_TYPES or func in _ACTION_PARSERS
+
+
+def _fields(cls):
+    # type: (typing.Type[model._OozieArtifact]) -> typing.Tuple[Record, Fields]
+    # All the fields of a type, none of them set, and those that aren't stored as they are
+    keys = _keys(cls)
+    return dict.fromkeys(key for key, _ in keys), [(key, func) for key, func in keys if _is_converted(func)]
+
+
+_FIELDS = {name: _fields(cls) for name, cls in _TYPES.items()}
+
+
+def _encode(artifact):
+    # type: (model._OozieArtifact) -> Record
+    fields = {}
+    for key, func in _keys(type(artifact)):
+        value = getattr(artifact, key, None)
+        if value is None:
+            continue
+        if func is model._parse_time:
+            value = int((value - _EPOCH).total_seconds())
+        elif func in _STATUS_TYPES:
+            value = value.name
+        elif func in _ACTION_PARSERS:
+            value = [_encode(action) for action in value.values()]
+        fields[key] = value
+    record = {'type': type(artifact).__name__, 'fields': fields, 'details': artifact._details}
+    link = getattr(artifact, _LINKS[type(artifact)], None)
+    if link:
+        record['link'] = _encode(link)
+    return record
+
+
+def _decode(record, client, parent=None):
+    # type: (Record, typing.Any, typing.Optional[model._OozieArtifact]) -> model._OozieArtifact
+    cls = _TYPES[record['type']]
+    # Everything the constructor would set, without parsing it all again
+    artifact = cls.__new__(cls)
+    artifact._client = client
+    artifact._parent = parent
+    keys, converted = _FIELDS[record['type']]
+    fields = dict(keys)
+    fields.update(record['fields'])
+    for key, func in converted:
+        value = fields[key]
+        if value is not None:
+            if func is model._parse_time:
+                value = _EPOCH + datetime.timedelta(seconds=value)
+            elif func in _STATUS_TYPES:
+                value = _STATUS_TYPES[func][value]
+            else:
+                actions = [_decode(action, client, artifact) for action in value]
+                key_of = 'actionNumber' if func is model._parse_coordinator_actions else 'name'
+                value = {getattr(action, key_of): action for action in actions}
+            fields[key] = value
+    vars(artifact).update(fields)
+    artifact._details = record['details']
+    link = record.get('link')
+    setattr(artifact, _LINKS[cls], _decode(link, client, artifact) if link else None)
+    return artifact
+
+
+def _job_id(job):
+    # type: (model._OozieArtifact) -> typing.Text
+    return job.coordJobId if isinstance(job, model.Coordinator) else job.id
+
+
+def dumps(jobs):
+    # type: (typing.Union[model._OozieArtifact, typing.Iterable[model._OozieArtifact]]) -> bytes
+    """A snapshot of a job or jobs, including whichever of their actions and workflows have been loaded."""
+    if isinstance(jobs, model._OozieArtifact):
+        jobs = [jobs]
+    index = []
+    frames = []
+    for job in jobs:
+        frame = zlib.compress(json.dumps(_encode(job), separators=(',', ':')).encode('utf-8'))
+        index.append([type(job).__name__, _job_id(job), len(frame)])
+        frames.append(frame)
+    index_bytes = zlib.compress(json.dumps(index, separators=(',', ':')).encode('utf-8'))
+    return b''.join([MAGIC, _HEADER.pack(VERSION, len(index_bytes)), index_bytes] + frames)
+
+
+def dump(jobs, stream):
+    # type: (typing.Union[model._OozieArtifact, typing.Iterable[model._OozieArtifact]], typing.BinaryIO) -> None
+    stream.write(dumps(jobs))
+
+
+def loads(data, client=None):
+    # type: (bytes, typing.Any) -> Snapshot
+    """Load a snapshot made by `dumps`, whose jobs are decoded when first accessed and use `client`, if given."""
+    return Snapshot(data, client=client)
+
+
+def load(stream, client=None):
+    # type: (typing.BinaryIO, typing.Any) -> Snapshot
+    return loads(stream.read(), client=client)
+
+
+def rehydrate(job, client):
+    # type: (model._OozieArtifact, typing.Any) -> model._OozieArtifact
+    """Have `job`, and all the actions and workflows loaded under it, use `client` to fetch anything else."""
+    pending = [job]
+    while pending:
+        artifact = pending.pop()
+        artifact._client = client
+        if getattr(artifact, 'actions', None):
+            pending.extend(artifact.actions.values())
+        link = getattr(artifact, _LINKS[type(artifact)], None)
+        if link:
+            pending.append(link)
+    return job
+
+
+class Snapshot(object):
+    """The jobs of a snapshot, in the order they were saved, which are each decoded when first accessed."""
+
+    def __init__(self, data, client=None):
+        # type: (bytes, typing.Any) -> None
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError('Not a pyoozie snapshot')
+        version, index_length = _HEADER.unpack_from(data, len(MAGIC))
+        if version != VERSION:
+            raise ValueError('Unsupported pyoozie snapshot version {}'.format(version))
+        start = len(MAGIC) + _HEADER.size
+        index = json.loads(zlib.decompress(data[start:start + index_length]).decode('utf-8'))
+        self._data = data
+        self._client = client
+        self._decode_json = decoder.get_decoder()
+        self._frames = []  # type: typing.List[typing.Tuple[int, int]]
+        offset = start + index_length
+        for _, _, length in index:
+            self._frames.append((offset, length))
+            offset += length
+        self.types = [job_type for job_type, _, _ in index]
+        self.ids = [job_id for _, job_id, _ in index]
+        self._jobs = [None] * len(index)  # type: typing.List[typing.Optional[model._OozieArtifact]]
+
+    def __len__(self):
+        # type: () -> int
+        return len(self._jobs)
+
+    def __getitem__(self, position):
+        # type: (int) -> model._OozieArtifact
+        job = self._jobs[position]
+        if job is None:
+            offset, length = self._frames[position]
+            record = self._decode_json(zlib.decompress(self._data[offset:offset + length]))
+            job = self._jobs[position] = _decode(record, self._client)
+        return job
+
+    def __iter__(self):
+        # type: () -> typing.Iterator[model._OozieArtifact]
+        for position in range(len(self)):
+            yield self[position]
+
+    def get(self, job_id):
+        # type: (typing.Text) -> typing.Optional[model._OozieArtifact]
+        """The job `job_id`, if it's in the snapshot."""
+        return self[self.ids.index(job_id)] if job_id in self.ids else None
+
+    def rehydrate(self, client):
+        # type: (typing.Any) -> Snapshot
+        """Have the jobs decoded so far, and any decoded later, use `client`."""
+        self._client = client
+        for job in self._jobs:
+            if job is not None:
+                rehydrate(job, client)
+        return self
@@ -4,17 +4,25 @@ from __future__ import unicode_literals
 
 import abc
 import collections
+import contextlib
 import copy
 import datetime
 import enum
+import hashlib
+import io
 import itertools
+import json
+import os
 import re
 import string  # pylint: disable=deprecated-module
+import threading
 import typing  # pylint: disable=unused-import
 import uuid
 
 import six
-import yattag
+import yattag  # pylint: disable=unused-import
+
+from pyoozie import writer
 
 MAX_NAME_LENGTH = 255
 MAX_IDENTIFIER_LENGTH = 50
@@ -26,6 +34,16 @@ ONE_HUNDRED_YEARS = 100 * 365.24
 PropertyValuesType = typing.Dict[typing.Text, typing.Any]
 JobXmlFilesType = typing.Iterable[typing.Text]
 
+# The version of the XML that objects serialize to, which is part of `XMLCache` keys; bump it whenever the XML generated
+# for the same object changes, so that documents cached on disk by an earlier version aren't reused
+XML_FORMAT_VERSION = 2
+
+# Bookkeeping attributes that don't describe what an object serializes to
+_UNHASHED_ATTRIBUTES = frozenset(['_frozen', '_structural_hash'])
+
+# How many times each content-derived name was handed out in the current `deterministic_names` context
+_naming = threading.local()
+
 
 class ExecutionOrder(enum.Enum):
     """Execution order used for coordinator jobs."""
@@ -77,6 +95,45 @@ def validate_xml_id(identifier):
     return identifier
 
 
+def _canonical(value):
+    # type: (typing.Any) -> typing.Any
+    """Convert a value into a JSON-serializable structure that doesn't depend on ordering or object identity."""
+    if isinstance(value, (XMLSerializable, _AbstractWorkflowEntity)):
+        return ['hash', value.structural_hash()]
+    elif value is None or isinstance(value, (bool, float) + six.integer_types):
+        return value
+    elif isinstance(value, six.string_types):
+        return six.text_type(value)
+    elif isinstance(value, enum.Enum):
+        return ['enum', type(value).__name__, _canonical(value.value)]
+    elif isinstance(value, (datetime.datetime, datetime.date)):
+        return ['datetime', value.isoformat()]
+    elif isinstance(value, dict):
+        return ['dict', sorted(([_canonical(key), _canonical(item)] for key, item in value.items()), key=_dumps)]
+    elif isinstance(value, (set, frozenset)):
+        return ['set', sorted((_canonical(item) for item in value), key=_dumps)]
+    elif isinstance(value, (list, tuple)):
+        return ['list', [_canonical(item) for item in value]]
+    return ['object', type(value).__name__, '{}'.format(value)]
+
+
+def _dumps(structure):
+    # type: (typing.Any) -> typing.Text
+    return json.dumps(structure, separators=(',', ':'))
+
+
+def _structural_hash(obj):
+    # type: (typing.Any) -> typing.Text
+    unhashed = _UNHASHED_ATTRIBUTES | getattr(obj, '_unserialized_attributes', frozenset())
+    attributes = sorted(
+        ((name, value) for name, value in vars(obj).items() if name not in unhashed),
+        key=lambda attribute: attribute[0])
+    structure = [type(obj).__name__, [[name, _canonical(value)] for name, value in attributes]]
+    if isinstance(obj, dict):
+        structure.append(_canonical(dict(obj)))
+    return hashlib.sha256(_dumps(structure).encode('utf-8')).hexdigest()
+
+
 class XMLSerializable(object):
     """An abstract object that can be serialized to XML."""
 
@@ -86,14 +143,33 @@ class XMLSerializable(object):
         # type: (typing.Text) -> None
         self.xml_tag = xml_tag
 
-    def xml(self, indent=False):
-        # type: (bool) -> str
-        doc, tag, text = yattag.Doc().tagtext()
+    def xml(self, indent=False, backend=None):
+        # type: (bool, typing.Optional[typing.Union[typing.Text, typing.Callable]]) -> bytes
+        stream = io.BytesIO()
+        self.write_xml(stream, indent=indent, backend=backend)
+        return stream.getvalue()
+
+    def write_xml(self, stream, indent=False, backend=None):
+        # type: (typing.BinaryIO, bool, typing.Optional[typing.Union[typing.Text, typing.Callable]]) -> None
+        """Write this object as a UTF-8 encoded XML document to a binary file-like object.
+
+        The `backend` names one of `pyoozie.writer.BACKENDS` (or is a writer class); all backends produce identical
+        output.
+        """
+        document = writer.create_writer(stream, indent=indent, backend=backend)
+        doc, tag, text = document.tagtext()
         doc.asis("<?xml version='1.0' encoding='UTF-8'?>")
-        xml = self._xml(doc, tag, text).getvalue()
-        if indent:
-            xml = yattag.indent(xml, indentation=' ' * 4, newline='\r\n')
-        return xml.encode('utf-8')
+        self._xml(doc, tag, text)
+        document.close()
+
+    def structural_hash(self):
+        # type: () -> typing.Text
+        """A hex digest of everything this object serializes, stable across processes and Python versions.
+
+        Two objects with the same hash produce the same XML. Entities that were given no name are named randomly
+        unless they are built within `deterministic_names`, so they otherwise hash differently each time they are built.
+        """
+        return _structural_hash(self)
 
     @abc.abstractmethod
     def _xml(self, doc, tag, text):
@@ -101,6 +177,52 @@ class XMLSerializable(object):
         raise NotImplementedError()
 
 
+class XMLCache(object):
+    """Serialized XML documents, keyed by the structural hash of the object they were generated from.
+
+    Documents are kept in memory and, if a `directory` is given, stored there so that they outlive the process. An
+    object whose hash is already cached is not serialized again, unless it was cached for another `XML_FORMAT_VERSION`.
+    """
+
+    def __init__(self, directory=None):
+        # type: (typing.Optional[typing.Text]) -> None
+        self.__directory = directory
+        self.__documents = {}  # type: typing.Dict[typing.Text, bytes]
+
+    def xml(self, serializable, indent=False):
+        # type: (XMLSerializable, bool) -> bytes
+        key = '{hash}-v{version}{suffix}'.format(hash=serializable.structural_hash(), version=XML_FORMAT_VERSION,
+                                                 suffix='-indented' if indent else '')
+        document = self.__documents.get(key)
+        if document is None:
+            document = self.__load(key)
+        if document is None:
+            document = serializable.xml(indent=indent)
+            self.__store(key, document)
+        self.__documents[key] = document
+        return document
+
+    def __path(self, key):
+        # type: (typing.Text) -> typing.Text
+        return os.path.join(self.__directory, key + '.xml')
+
+    def __load(self, key):
+        # type: (typing.Text) -> typing.Optional[bytes]
+        if self.__directory and os.path.exists(self.__path(key)):
+            with io.open(self.__path(key), 'rb') as stream:
+                return stream.read()
+        return None
+
+    def __store(self, key, document):
+        # type: (typing.Text, bytes) -> None
+        if self.__directory:
+            # Write to a temporary file first so that a concurrent reader never sees a partial document
+            temporary_path = '{path}.{pid}.tmp'.format(path=self.__path(key), pid=os.getpid())
+            with io.open(temporary_path, 'wb') as stream:
+                stream.write(document)
+            os.rename(temporary_path, self.__path(key))
+
+
 class _PropertyList(XMLSerializable, dict):
     """
     Object used to represent Oozie workflow/coordinator property-value sets.
@@ -496,8 +618,35 @@ class CoordinatorApp(XMLSerializable):
         return doc
 
 
+def _compose(entity):
+    # type: (typing.Optional[_AbstractWorkflowEntity]) -> typing.Optional[_AbstractWorkflowEntity]
+    """Freeze an entity that is being composed into another entity, so that it can be shared rather than copied."""
+    if entity is not None:
+        entity._freeze()
+    return entity
+
+
+@contextlib.contextmanager
+def deterministic_names():
+    # type: () -> typing.Generator[None, None, None]
+    """Name entities that are created without a name after their content, instead of randomly.
+
+    Entities built the same way within this context always get the same names, so rebuilding an unchanged workflow
+    produces identical XML. Entities with identical content are told apart by the order in which they are created.
+    """
+    previous = getattr(_naming, 'occurrences', None)
+    _naming.occurrences = collections.Counter()
+    try:
+        yield
+    finally:
+        _naming.occurrences = previous
+
+
 class _AbstractWorkflowEntity(collections.Iterable):
-    """An abstract object representing an Oozie workflow action that can be serialized to XML."""
+    """An abstract object representing an Oozie workflow action that can be serialized to XML.
+
+    Subclasses set their own attributes before calling `__init__`, so that a name can be derived from their content.
+    """
     # pylint: disable=abstract-method
 
     __metaclass__ = abc.ABCMeta
@@ -510,10 +659,44 @@ class _AbstractWorkflowEntity(collections.Iterable):
     ):
         # type: (...) -> None
         self.__xml_tag = xml_tag or 'unknown'
-        self.__name = name if name else uuid.uuid4().hex[:8]
-        self.__on_error = copy.deepcopy(on_error)
+        self.__on_error = _compose(on_error)
+        self.__name = name if name else self.__generate_name()
         self.__identifier = self.create_identifier(self.__xml_tag)
 
+    def __generate_name(self):
+        # type: () -> typing.Text
+        occurrences = getattr(_naming, 'occurrences', None)
+        if occurrences is None:
+            return uuid.uuid4().hex[:8]
+        name = _structural_hash(self)[:8]
+        occurrences[name] += 1
+        return name if occurrences[name] == 1 else '{name}-{count}'.format(name=name, count=occurrences[name])
+
+    def __setattr__(self, name, value):
+        # type: (str, typing.Any) -> None
+        if self.__dict__.get(str('_frozen')):
+            raise AttributeError('{_class} has been composed into another entity and can no longer be modified'.format(
+                _class=type(self).__name__))
+        super(_AbstractWorkflowEntity, self).__setattr__(name, value)
+
+    def _freeze(self):
+        # type: () -> None
+        """Make this entity immutable so that composite entities can share it instead of copying it."""
+        self.__dict__[str('_frozen')] = True
+
+    def structural_hash(self):
+        # type: () -> typing.Text
+        """A hex digest of everything this entity serializes; see `XMLSerializable.structural_hash`.
+
+        Entities can't change once composed, so the hash of a composed entity is only computed once.
+        """
+        cached = self.__dict__.get(str('_structural_hash'))
+        if cached is None:
+            cached = _structural_hash(self)
+            if self.__dict__.get(str('_frozen')):
+                self.__dict__[str('_structural_hash')] = cached
+        return cached
+
     def xml_tag(self):
         # type: () -> typing.Text
         return self.__xml_tag
@@ -551,6 +734,16 @@ class _AbstractWorkflowEntity(collections.Iterable):
     ):
         raise NotImplementedError()
 
+    def _node_identifiers(self):
+        # type: () -> typing.Tuple[typing.Text, ...]
+        """The names of the workflow nodes this entity itself serializes to (excluding nested entities)."""
+        return (self.__identifier,)
+
+    def _children(self):
+        # type: () -> typing.List[_AbstractWorkflowEntity]
+        """The entities directly nested in this one."""
+        return [self.__on_error] if self.__on_error is not None else []
+
     def __iter__(self):
         # type: () -> typing.Generator[_AbstractWorkflowEntity, None, None]
         yield self
@@ -559,7 +752,7 @@ class _AbstractWorkflowEntity(collections.Iterable):
                 yield action
 
     def __bool__(self):  # type: () -> bool
-        return bool(list(self))
+        return True  # Every entity other than an empty `Serial` results in at least one node
 
     def __nonzero__(self):  # type: () -> bool
         return self.__bool__()
@@ -573,8 +766,8 @@ class Kill(_AbstractWorkflowEntity):
 
     def __init__(self, message, name=None):
         # type: (typing.Text, typing.Optional[typing.Text]) -> None
-        super(Kill, self).__init__(xml_tag='kill', name=name)
         self.message = message
+        super(Kill, self).__init__(xml_tag='kill', name=name)
 
     def _xml(
             self,
@@ -606,14 +799,14 @@ class Action(_AbstractWorkflowEntity):
             on_error=None         # type: typing.Optional[_AbstractWorkflowEntity]
     ):
         # type: (...) -> None
-        super(Action, self).__init__(xml_tag='action', name=name, on_error=on_error)
-
         # XML-document-related values
         self.__action = action
         self.__credential = credential
         self.__retry_max = retry_max
         self.__retry_interval = retry_interval
 
+        super(Action, self).__init__(xml_tag='action', name=name, on_error=on_error)
+
     def credential(self):
         # type: () -> typing.Optional[typing.Text]
         return self.__credential
@@ -656,11 +849,11 @@ class Decision(_AbstractWorkflowEntity):
             on_error=None,  # type: typing.Optional[_AbstractWorkflowEntity]
     ):
         # type: (...) -> None
-        super(Decision, self).__init__(xml_tag='decision', name=name, on_error=on_error)
         assert default, 'A default must be supplied'
         assert choices, 'At least one choice required'
-        self.__default = copy.deepcopy(default)
-        self.__choices = copy.deepcopy(choices)
+        self.__default = _compose(default)
+        self.__choices = {case: _compose(dest) for case, dest in choices.items()}
+        super(Decision, self).__init__(xml_tag='decision', name=name, on_error=on_error)
 
     def _xml(
             self,
@@ -687,6 +880,10 @@ class Decision(_AbstractWorkflowEntity):
 
         return doc
 
+    def _children(self):
+        # type: () -> typing.List[_AbstractWorkflowEntity]
+        return list(self.__choices.values()) + [self.__default] + super(Decision, self)._children()
+
     def __iter__(self):
         # type: () -> typing.Generator[_AbstractWorkflowEntity, None, None]
         for action in self.__choices.values():
@@ -699,10 +896,14 @@ class Decision(_AbstractWorkflowEntity):
 class Serial(_AbstractWorkflowEntity):
     """Sequence of entities to execute (implemented by chaining entities and 'OK' transitions)"""
 
+    # This collection doesn't result in a node, so its (random) name doesn't show up in the XML
+    _unserialized_attributes = frozenset(['_AbstractWorkflowEntity__name', '_AbstractWorkflowEntity__identifier'])
+
     def __init__(self, *entities, **kwargs):
         # type: (*_AbstractWorkflowEntity, **_AbstractWorkflowEntity) -> None
+        self.__entities = tuple(  # type: typing.Tuple[_AbstractWorkflowEntity, ...]
+            _compose(entity) for entity in entities)
         super(Serial, self).__init__(xml_tag='unknown', on_error=kwargs.get(str('on_error')))
-        self.__entities = tuple(copy.deepcopy(entities))  # type: typing.Tuple[_AbstractWorkflowEntity, ...]
 
     def identifier(self):  # type: () -> typing.Text
         return self.__entities[0].identifier()
@@ -724,6 +925,14 @@ class Serial(_AbstractWorkflowEntity):
             entity._xml(doc, tag, text, on_next=next_identifier, on_error=_on_error)
         return doc
 
+    def _node_identifiers(self):
+        # type: () -> typing.Tuple[typing.Text, ...]
+        return ()  # This collection doesn't result in a node
+
+    def _children(self):
+        # type: () -> typing.List[_AbstractWorkflowEntity]
+        return list(self.__entities) + super(Serial, self)._children()
+
     def __iter__(self):
         # type: () -> typing.Generator[_AbstractWorkflowEntity, None, None]
         for entity in self.__entities:
@@ -732,6 +941,9 @@ class Serial(_AbstractWorkflowEntity):
             if entity is not self:  # Don't return self because this collection doesn't result in a node
                 yield entity
 
+    def __bool__(self):  # type: () -> bool
+        return bool(self.__entities) or any(super(Serial, self)._children())
+
 
 class Parallel(_AbstractWorkflowEntity):
     """Set of entities to execute in parallel (implemented as fork/join tag pair)"""
@@ -742,13 +954,14 @@ class Parallel(_AbstractWorkflowEntity):
         name = name if isinstance(name, six.string_types) else None
         on_error = kwargs.get(str('on_error'))
         on_error = on_error if isinstance(on_error, _AbstractWorkflowEntity) else None
+        assert entities, 'At least 1 entity required'
+        self.__entities = frozenset(  # type: typing.FrozenSet[_AbstractWorkflowEntity]
+            _compose(entity) for entity in entities)
         super(Parallel, self).__init__(
             xml_tag='fork',
             name=name,
             on_error=on_error
         )
-        assert entities, 'At least 1 entity required'
-        self.__entities = frozenset(copy.deepcopy(entities))  # type: typing.FrozenSet[_AbstractWorkflowEntity]
 
     def _xml(
             self,
@@ -759,14 +972,24 @@ class Parallel(_AbstractWorkflowEntity):
             on_error    # type: typing.Optional[typing.Text]
     ):
         _on_error = self._xml_and_get_on_error(doc, tag, text, on_next, on_error)
+        # Order the paths so that the same entities always serialize the same way
+        entities = sorted(self.__entities, key=lambda entity: entity.identifier())
         with tag(self.xml_tag(), name=self.identifier()):
-            for entity in self.__entities:
+            for entity in entities:
                 doc.stag('path', start=entity.identifier())
-        for entity in self.__entities:
+        for entity in entities:
             entity._xml(doc, tag, text, on_next=self.create_identifier('join'), on_error=_on_error)
         doc.stag('join', name=self.create_identifier('join'), to=on_next)
         return doc
 
+    def _node_identifiers(self):
+        # type: () -> typing.Tuple[typing.Text, ...]
+        return self.identifier(), self.create_identifier('join')
+
+    def _children(self):
+        # type: () -> typing.List[_AbstractWorkflowEntity]
+        return list(self.__entities) + super(Parallel, self)._children()
+
     def __iter__(self):
         # type: () -> typing.Generator[_AbstractWorkflowEntity, None, None]
         for entity in self.__entities:
@@ -801,36 +1024,37 @@ class WorkflowApp(XMLSerializable):
             configuration=configuration
         )
         self.__credentials = copy.deepcopy(credentials) or []
-        self.__entities = copy.deepcopy(entities) or Serial()
+        self.__entities = _compose(entities) or Serial()
         self.__validate()
 
     def __validate(self):  # type () -> None
-        entity_identifiers = []
-        credentials_needed = set()
-
-        def _parse_entity(entity):
-            # Each entity's identifier should be unique
-            entity_identifiers.append(entity.identifier())
+        entity_identifiers = set()  # type: typing.Set[typing.Text]
+        duplicate_identifiers = set()  # type: typing.Set[typing.Text]
+        credentials_needed = set()  # type: typing.Set[typing.Text]
+
+        # Visit every nested entity once, without recursion, so deep and wide workflows validate in linear time
+        pending = [self.__entities]
+        while pending:
+            entity = pending.pop()
+            # Each node's identifier should be unique
+            for identifier in entity._node_identifiers():
+                if identifier in entity_identifiers:
+                    duplicate_identifiers.add(identifier)
+                entity_identifiers.add(identifier)
             # If the entity refers to a credential by name, it should be defined upon instantiation
             if hasattr(entity, 'credential'):
                 credential = entity.credential()
                 if credential:
                     credentials_needed.add(credential)
-
-        # Parse entitys for attributes
-        if self.__entities:
-            for entity in set(self.__entities):
-                _parse_entity(entity)
+            pending.extend(entity._children())
 
         # Verify that all needed credentials are defined
         credentials_provided = frozenset([cred.name for cred in self.__credentials])
         assert credentials_needed <= credentials_provided, (
-            'Missing credentials: %s' % ', '.join(credentials_needed - credentials_provided)
+            'Missing credentials: %s' % ', '.join(sorted(credentials_needed - credentials_provided))
         )
 
         # Verify that no duplicate identifiers are used
-        duplicate_identifiers = tuple(
-            item for item, count in collections.Counter(entity_identifiers).items() if count > 1)
         assert not duplicate_identifiers, 'Name(s) reused: %s' % ', '.join(sorted(duplicate_identifiers))
 
     def _xml(self, doc, tag, text):
@@ -0,0 +1,210 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+from __future__ import unicode_literals
+
+import typing  # pylint: disable=unused-import
+
+import six
+import yattag
+import yattag.simpledoc
+
+INDENTATION = ' ' * 4
+NEWLINE = '\r\n'
+
+# Number of text fragments to collect before encoding and handing them to the output stream
+_FLUSH_THRESHOLD = 4096
+
+
+class YattagWriter(object):
+    """Serialization backend that builds the document with a `yattag.Doc` and optionally re-indents it.
+
+    The document is only written to the stream once complete.
+    """
+
+    def __init__(self, stream, indent=False):
+        # type: (typing.BinaryIO, bool) -> None
+        self._stream = stream
+        self._indent = indent
+        self._doc = yattag.Doc()
+
+    def tagtext(self):
+        # type: () -> typing.Tuple[yattag.doc.Doc, yattag.doc.Doc.tag, yattag.doc.Doc.text]
+        return self._doc.tagtext()
+
+    def close(self):
+        # type: () -> None
+        xml = self._doc.getvalue()
+        if self._indent:
+            xml = yattag.indent(xml, indentation=INDENTATION, newline=NEWLINE)
+        self._stream.write(xml.encode('utf-8'))
+
+
+class _Element(object):
+
+    __slots__ = ('name', 'start_tag', 'opened', 'inline')
+
+    def __init__(self, name, start_tag):
+        # type: (typing.Text, typing.Text) -> None
+        self.name = name
+        self.start_tag = start_tag
+        self.opened = False
+        self.inline = False
+
+
+class StreamingWriter(object):
+    """Serialization backend that writes UTF-8 XML directly to the stream as the document is produced.
+
+    Implements the subset of the `yattag.Doc` interface used by `pyoozie.tags` and produces output byte-identical to
+    `YattagWriter`. Indentation happens in the same pass: an element's start tag is held back until its first child
+    arrives, which tells whether it holds text (kept on one line) or elements (one per line). Elements generated by
+    `pyoozie.tags` never mix text and child elements.
+    """
+
+    def __init__(self, stream, indent=False):
+        # type: (typing.BinaryIO, bool) -> None
+        self._stream = stream
+        self._indent = indent
+        self._pieces = []  # type: typing.List[typing.Text]
+        self._stack = []  # type: typing.List[typing.Any]
+        self._inline_depth = 0
+        self._started = False
+
+    def tagtext(self):
+        # type: () -> typing.Tuple[StreamingWriter, typing.Callable, typing.Callable]
+        return self, self.tag, self.text
+
+    def close(self):
+        # type: () -> None
+        assert not self._stack, 'Unclosed tag(s) remain'
+        self._flush()
+
+    def _flush(self):
+        # type: () -> None
+        if self._pieces:
+            self._stream.write(''.join(self._pieces).encode('utf-8'))
+            del self._pieces[:]
+
+    def _newline(self, level):
+        # type: (int) -> None
+        if self._indent and not self._inline_depth:
+            if self._started:
+                self._pieces.append(NEWLINE)
+            self._pieces.append(INDENTATION * level)
+        self._started = True
+
+    def _open_parent(self, inline):
+        # type: (bool) -> None
+        # Write the start tag of the innermost element, now that its first child tells us how to lay it out
+        if self._stack and not self._stack[-1].opened:
+            element = self._stack[-1]
+            self._newline(len(self._stack) - 1)
+            self._pieces.append(element.start_tag)
+            element.opened = True
+            if inline:
+                element.inline = True
+                self._inline_depth += 1
+
+    @staticmethod
+    def _attributes(attributes):
+        # type: (typing.Dict[typing.Text, typing.Any]) -> typing.Text
+        # Rebuild the dict the way yattag does so that attributes come out in the same order
+        return yattag.simpledoc.dict_to_attrs(dict(attributes.items()))
+
+    def tag(self, tag_name, **attributes):
+        # type: (typing.Text, **typing.Any) -> StreamingWriter._Tag
+        return StreamingWriter._Tag(self, tag_name, attributes)
+
+    def text(self, *strings):
+        # type: (*typing.Any) -> None
+        for string in strings:
+            escaped = yattag.simpledoc.html_escape(string)
+            if self._indent:
+                if not escaped.strip():
+                    continue  # Blank text is dropped when indenting
+                if self._stack and not self._stack[-1].opened:
+                    self._open_parent(inline=True)
+                elif not self._inline_depth:
+                    self._newline(len(self._stack))
+            self._pieces.append(escaped)
+
+    def stag(self, tag_name, **attributes):
+        # type: (typing.Text, **typing.Any) -> None
+        if self._indent:
+            self._open_parent(inline=False)
+            self._newline(len(self._stack))
+        if attributes:
+            self._pieces.append('<%s %s />' % (tag_name, self._attributes(attributes)))
+        else:
+            self._pieces.append('<%s />' % tag_name)
+
+    def asis(self, *strings):
+        # type: (*typing.Text) -> None
+        for string in strings:
+            if string is None:
+                raise TypeError("Expected a string, got None instead.")
+            if self._indent:
+                self._open_parent(inline=False)
+                self._newline(len(self._stack))
+            self._pieces.append(string)
+
+    def _start(self, tag_name, attributes):
+        # type: (typing.Text, typing.Dict[typing.Text, typing.Any]) -> None
+        start_tag = '<%s %s>' % (tag_name, self._attributes(attributes)) if attributes else '<%s>' % tag_name
+        if self._indent:
+            # Hold the start tag back until its first child shows how to lay it out
+            self._open_parent(inline=False)
+            self._stack.append(_Element(tag_name, start_tag))
+        else:
+            self._pieces.append(start_tag)
+            self._stack.append(tag_name)
+
+    def _end(self):
+        # type: () -> None
+        if self._indent:
+            element = self._stack[-1]
+            if not element.opened:
+                # Empty element: start and end tags share a line
+                self._open_parent(inline=True)
+            elif not element.inline:
+                self._newline(len(self._stack) - 1)
+            if element.inline:
+                self._inline_depth -= 1
+            self._stack.pop()
+            self._pieces.append('</%s>' % element.name)
+        else:
+            self._pieces.append('</%s>' % self._stack.pop())
+        if len(self._pieces) >= _FLUSH_THRESHOLD:
+            self._flush()
+
+    class _Tag(object):
+
+        def __init__(self, writer, tag_name, attributes):
+            # type: (StreamingWriter, typing.Text, typing.Dict[typing.Text, typing.Any]) -> None
+            self._writer = writer
+            self._tag_name = tag_name
+            self._attributes = attributes
+
+        def __enter__(self):
+            # type: () -> None
+            self._writer._start(self._tag_name, self._attributes)
+
+        def __exit__(self, exc_type, exc_value, traceback):
+            # type: (typing.Any, typing.Any, typing.Any) -> None
+            if exc_value is None:
+                self._writer._end()
+
+
+BACKENDS = {
+    'yattag': YattagWriter,
+    'streaming': StreamingWriter,
+}  # type: typing.Dict[typing.Text, typing.Callable[..., typing.Any]]
+
+DEFAULT_BACKEND = 'streaming'
+
+
+def create_writer(stream, indent=False, backend=None):
+    # type: (typing.BinaryIO, bool, typing.Optional[typing.Union[typing.Text, typing.Callable]]) -> typing.Any
+    """Create a document writer for `stream`, given a backend name from `BACKENDS` or a writer class."""
+    backend = backend or DEFAULT_BACKEND
+    factory = BACKENDS[backend] if isinstance(backend, six.string_types) else backend
+    return factory(stream, indent=indent)
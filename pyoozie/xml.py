@@ -2,24 +2,105 @@
 # Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
 from __future__ import unicode_literals
 
+import bisect
+
+import yattag.simpledoc
+
 from pyoozie import tags
 
+WORKFLOW_PATH_PROPERTY = 'oozie.wf.application.path'
+COORDINATOR_PATH_PROPERTY = 'oozie.coord.application.path'
+
+_XML_DECLARATION = "<?xml version='1.0' encoding='UTF-8'?>"
+
+
+def _property_xml(name, value):
+    """Generate a single configuration property, exactly as `tags.Configuration` serializes it."""
+    return '<property><name>{name}</name><value>{value}</value></property>'.format(
+        name=yattag.simpledoc.html_escape('{}'.format(name)),
+        value=yattag.simpledoc.html_escape('{}'.format(value)) if value is not None else '',
+    )
+
+
+class SubmissionTemplate(object):
+    """An XML submission message with the properties shared by many jobs rendered ahead of time.
+
+    `render` splices a job's application path and own properties in between the pre-rendered, UTF-8 encoded ones. The
+    result is identical to the message generated for a single submission of the shared configuration updated with the
+    job's configuration. The user name can't be overridden per job.
+    """
+
+    def __init__(self, username, path_property, configuration=None):
+        constant = dict(configuration or {})
+        constant['user.name'] = username
+        self.__path_property = path_property
+        self.__names = sorted(constant)
+        fragments = [_property_xml(name, constant[name]).encode('utf-8') for name in self.__names]
+        # Where each property starts in the rendered properties, so that runs of them can be copied with one slice
+        self.__offsets = [0]
+        for fragment in fragments:
+            self.__offsets.append(self.__offsets[-1] + len(fragment))
+        self.__properties = b''.join(fragments)
+        self.__head = (_XML_DECLARATION + '<configuration>').encode('utf-8')
+        self.__tail = '</configuration>'.encode('utf-8')
+
+    @classmethod
+    def workflow(cls, username, configuration=None):
+        return cls(username, WORKFLOW_PATH_PROPERTY, configuration=configuration)
+
+    @classmethod
+    def coordinator(cls, username, configuration=None):
+        return cls(username, COORDINATOR_PATH_PROPERTY, configuration=configuration)
+
+    def render(self, xml_path, configuration=None):
+        """Generate the submission message for the application at `xml_path`."""
+        own = dict(configuration) if configuration else {}
+        own.pop('user.name', None)
+        own[self.__path_property] = xml_path
+
+        pieces = [self.__head]
+        position = 0
+        for name in sorted(own):
+            index = bisect.bisect_left(self.__names, name, position)
+            pieces.append(self.__properties[self.__offsets[position]:self.__offsets[index]])
+            pieces.append(_property_xml(name, own[name]).encode('utf-8'))
+            # A job's own property replaces the shared one of the same name
+            position = index + 1 if index < len(self.__names) and self.__names[index] == name else index
+        pieces.append(self.__properties[self.__offsets[position]:])
+        pieces.append(self.__tail)
+        return b''.join(pieces)
+
+
+def _submission_xml(username, path_property, xml_path, configuration=None, indent=False):
+    if indent:
+        submission = tags.Configuration(configuration)
+        submission.update({
+            'user.name': username,
+            path_property: xml_path,
+        })
+        return submission.xml(indent)
+    return SubmissionTemplate(username, path_property).render(xml_path, configuration)
+
 
 def _workflow_submission_xml(username, workflow_xml_path, configuration=None, indent=False):
     """Generate a Workflow XML submission message to POST to Oozie."""
-    submission = tags.Configuration(configuration)
-    submission.update({
-        'user.name': username,
-        'oozie.wf.application.path': workflow_xml_path,
-    })
-    return submission.xml(indent)
+    return _submission_xml(username, WORKFLOW_PATH_PROPERTY, workflow_xml_path, configuration=configuration,
+                           indent=indent)
 
 
 def _coordinator_submission_xml(username, coord_xml_path, configuration=None, indent=False):
     """Generate a Coordinator XML submission message to POST to Oozie."""
-    submission = tags.Configuration(configuration)
-    submission.update({
-        'user.name': username,
-        'oozie.coord.application.path': coord_xml_path,
-    })
-    return submission.xml(indent)
+    return _submission_xml(username, COORDINATOR_PATH_PROPERTY, coord_xml_path, configuration=configuration,
+                           indent=indent)
+
+
+def _workflow_submission_xmls(username, submissions, configuration=None):
+    """Generate Workflow XML submission messages for many (workflow XML path, configuration) pairs."""
+    template = SubmissionTemplate.workflow(username, configuration=configuration)
+    return (template.render(xml_path, own_configuration) for xml_path, own_configuration in submissions)
+
+
+def _coordinator_submission_xmls(username, submissions, configuration=None):
+    """Generate Coordinator XML submission messages for many (coordinator XML path, configuration) pairs."""
+    template = SubmissionTemplate.coordinator(username, configuration=configuration)
+    return (template.render(xml_path, own_configuration) for xml_path, own_configuration in submissions)
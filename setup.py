@@ -27,6 +27,11 @@ setuplib.setup(
     author_email='data-acceleration@shopify.com',
     url='https://github.com/Shopify/pyoozie',
     packages=['pyoozie'],
+    entry_points={
+        'console_scripts': [
+            'pyoozie = pyoozie.cli:main',
+        ],
+    },
     install_requires=[
         'enum34>=0.9.23 ; python_version<"3.4"',
         'requests>=2.12.3',
@@ -60,6 +65,10 @@ setuplib.setup(
         'test: python_version >= "3.5"': [
             'mypy',
         ],
+        'json': [  # Faster decoding of replies
+            'orjson ; python_version >= "3.6"',
+            'ujson ; python_version < "3.6"',
+        ],
         'docs': [
             'sphinx >= 1.6',
             'sphinx_rtd_theme',
@@ -0,0 +1,191 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+"""Benchmarks of the client, model and XML generation hot paths.
+
+Run with `python -m tests.benchmark`, which writes the results as JSON. Pass `--compare` a previous run's results to
+fail if any scenario got slower than allowed.
+"""
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import collections
+import contextlib
+import json
+import platform
+import sys
+import time
+import timeit
+import typing  # pylint: disable=unused-import
+
+from pyoozie import client
+from pyoozie import model
+from pyoozie import tags
+from tests import fake_oozie
+
+Result = typing.Dict[typing.Text, typing.Any]
+
+# name -> (setup, sizes); a setup is a context manager that takes a size and yields the function to time
+_SCENARIOS = collections.OrderedDict()  # type: typing.Dict[typing.Text, typing.Tuple[typing.Callable, typing.List]]
+
+
+def _scenario(name, sizes):
+    # type: (typing.Text, typing.List[int]) -> typing.Callable
+    def register(setup):
+        _SCENARIOS[name] = (contextlib.contextmanager(setup), sizes)
+        return setup
+    return register
+
+
+def _client(server):
+    # type: (fake_oozie.FakeOozieServer) -> client.OozieClient
+    return client.OozieClient(url=server.url, verbose=False)
+
+
+@_scenario('jobs_query.workflows', [10000, 50000])
+def _jobs_query_workflows(size):
+    with fake_oozie.FakeOozieServer(workflows=size) as server:
+        api = _client(server)
+        yield lambda: api._jobs_query(model.ArtifactType.Workflow, details=False)
+
+
+@_scenario('jobs_query.coordinators_with_details', [100, 500])
+def _jobs_query_coordinators(size):
+    with fake_oozie.FakeOozieServer(coordinators=size, coordinator_actions=10) as server:
+        api = _client(server)
+        yield lambda: api._jobs_query(model.ArtifactType.Coordinator, details=True)
+
+
+@_scenario('model.coordinator', [10000, 100000])
+def _model_coordinator(size):
+    with fake_oozie.FakeOozieServer(coordinators=1, coordinator_actions=size) as server:
+        _, reply = server.handle('GET', '/oozie/v2/job/{}?offset=1&len={}'.format(server.coordinator_id(0), size))
+    # What the client would have decoded
+    details = json.loads(json.dumps(reply))
+    yield lambda: model.Coordinator(None, details)
+
+
+@_scenario('model.workflow', [1000, 10000])
+def _model_workflow(size):
+    with fake_oozie.FakeOozieServer(workflows=1, workflow_actions=size) as server:
+        _, reply = server.handle('GET', '/oozie/v2/job/{}'.format(server.workflow_id(0)))
+    details = json.loads(json.dumps(reply))
+    yield lambda: model.Workflow(None, details)
+
+
+def _action(number):
+    # type: (int) -> tags.Action
+    return tags.Action(name='action-{}'.format(number),
+                       action=tags.Shell(exec_command='echo', arguments=['{}'.format(number)]))
+
+
+def _workflow_app(entities):
+    # type: (tags._AbstractWorkflowEntity) -> tags.WorkflowApp
+    return tags.WorkflowApp(name='benchmark', job_tracker='job-tracker', name_node='name-node', entities=entities)
+
+
+@_scenario('xml.deep', [1000, 5000])
+def _xml_deep(size):
+    app = _workflow_app(tags.Serial(*[_action(number) for number in range(size)],
+                                    on_error=tags.Kill('Failed', name='failed')))
+    yield app.xml
+
+
+@_scenario('xml.wide', [1000, 5000])
+def _xml_wide(size):
+    app = _workflow_app(tags.Parallel(*[_action(number) for number in range(size)], name='fan-out'))
+    yield app.xml
+
+
+@_scenario('xml.nested', [100, 500])
+def _xml_nested(size):
+    # `size` stages in sequence, each fanning out to 10 actions and back
+    stages = [tags.Parallel(*[_action(stage * 10 + number) for number in range(10)], name='stage-{}'.format(stage))
+              for stage in range(size)]
+    app = _workflow_app(tags.Serial(*stages))
+    yield app.xml
+
+
+def run(names=None, scale=1.0, repeat=5):
+    # type: (typing.Optional[typing.Iterable[typing.Text]], float, int) -> typing.List[Result]
+    """Time the scenarios called `names` (all by default) `repeat` times at each of their sizes times `scale`."""
+    results = []
+    for name in names or _SCENARIOS:
+        setup, sizes = _SCENARIOS[name]
+        for size in sizes:
+            size = max(int(size * scale), 1)
+            with setup(size) as func:
+                timings = []
+                for _ in range(repeat):
+                    start = timeit.default_timer()
+                    func()
+                    timings.append(timeit.default_timer() - start)
+            timings.sort()
+            results.append({
+                'name': name,
+                'size': size,
+                'repeat': repeat,
+                'min': timings[0],
+                'median': timings[len(timings) // 2],
+                'mean': sum(timings) / len(timings),
+            })
+    return results
+
+
+def compare(results, baseline, threshold=0.25):
+    # type: (typing.List[Result], typing.List[Result], float) -> typing.List[typing.Text]
+    """Describe each scenario whose median time is more than `threshold` (a fraction) slower than in `baseline`."""
+    before = {(result['name'], result['size']): result['median'] for result in baseline}
+    regressions = []
+    for result in results:
+        key = (result['name'], result['size'])
+        if key in before and result['median'] > before[key] * (1 + threshold):
+            regressions.append('{name}[{size}]: {old:.4f}s -> {new:.4f}s'.format(
+                name=result['name'], size=result['size'], old=before[key], new=result['median']))
+    return regressions
+
+
+def main(argv=None):
+    # type: (typing.Optional[typing.List[typing.Text]]) -> int
+    parser = argparse.ArgumentParser(description='Benchmark pyoozie hot paths.')
+    parser.add_argument('scenarios', nargs='*', metavar='scenario',
+                        help='scenarios to run (default: all of {})'.format(', '.join(_SCENARIOS)))
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply the size of every scenario by this')
+    parser.add_argument('--repeat', type=int, default=5, help='times to run each scenario')
+    parser.add_argument('--output', help='file to write the JSON results to (default: standard output)')
+    parser.add_argument('--compare', help='JSON results of a previous run to check for regressions against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='fraction by which a scenario may be slower than in --compare (default: 0.25)')
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.scenarios if name not in _SCENARIOS]
+    if unknown:
+        parser.error('unknown scenario(s): {}'.format(', '.join(unknown)))
+
+    results = run(args.scenarios, scale=args.scale, repeat=args.repeat)
+    for result in results:
+        print('{name:<40} {size:>8} {median:>10.4f}s'.format(**result), file=sys.stderr)
+    document = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'timestamp': int(time.time()),
+        'results': results,
+    }
+    output = json.dumps(document, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as stream:
+            stream.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as stream:
+            regressions = compare(results, json.load(stream)['results'], threshold=args.threshold)
+        for regression in regressions:
+            print('Regression: ' + regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,528 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+from __future__ import unicode_literals
+
+import collections
+import email.utils
+import json
+import random
+import re
+import threading
+import time
+import typing  # pylint: disable=unused-import
+import xml.etree.ElementTree as et
+import zlib
+
+import six
+from six.moves import BaseHTTPServer  # pylint: disable=import-error
+from six.moves import socketserver  # pylint: disable=import-error
+from six.moves.urllib import parse  # pylint: disable=import-error
+
+_JOB_ID_RE = re.compile(r'^(?P<index>\d{7})-(?P<run>\d{15})-oozie-oozi-(?P<type>[CW])(?:@(?P<action>.+))?$')
+
+# All synthetic jobs are scheduled hourly from here
+_EPOCH = 1514764800  # 2018-01-01T00:00:00Z
+
+_COORDINATOR_STATUSES = ['RUNNING'] * 6 + ['SUCCEEDED', 'SUSPENDED', 'KILLED', 'DONEWITHERROR']
+_COORDINATOR_ACTION_STATUSES = ['SUCCEEDED'] * 8 + ['FAILED', 'KILLED']
+_WORKFLOW_STATUSES = ['SUCCEEDED'] * 6 + ['RUNNING', 'FAILED', 'KILLED', 'SUSPENDED']
+
+# The workflow each final coordinator action status implies
+_WORKFLOW_STATUS_OF_ACTION = {
+    'SUCCEEDED': 'SUCCEEDED',
+    'FAILED': 'FAILED',
+    'KILLED': 'KILLED',
+    'RUNNING': 'RUNNING',
+    'SUSPENDED': 'SUSPENDED',
+}
+
+_STATUS_AFTER = {
+    'kill': 'KILLED',
+    'suspend': 'SUSPENDED',
+    'resume': 'RUNNING',
+    'start': 'RUNNING',
+    'coord-rerun': 'RUNNING',
+}
+
+_ADMIN_RESPONSES = {
+    'status': {'systemMode': 'NORMAL'},
+    'os-env': {'JAVA_HOME': '/usr/lib/jvm/default'},
+    'java-sys-properties': {'java.version': '1.8.0'},
+    'configuration': {'oozie.service.JPAService.jdbc.url': 'jdbc:fake'},
+    'instrumentation': {'counters': [], 'samplers': [], 'timers': [], 'variables': []},
+    'metrics': {'counters': {}, 'gauges': {}, 'histograms': {}, 'timers': {}},
+    'build-version': {'buildVersion': '4.1.0'},
+    'available-timezones': {'available-timezones': [{'timezoneDisplayName': 'UTC', 'timezoneId': 'UTC'}]},
+    'queue-dump': {'queueDump': [], 'uniqueDump': []},
+    'available-oozie-servers': {'localhost': 'http://localhost:11000/oozie'},
+}
+
+_SHARELIBS = {
+    'distcp': ['oozie-sharelib-distcp.jar'],
+    'hive': ['hive-exec.jar', 'hive-metastore.jar', 'oozie-sharelib-hive.jar'],
+    'oozie': ['oozie-sharelib-oozie.jar'],
+    'pig': ['pig.jar', 'oozie-sharelib-pig.jar'],
+}
+
+
+def _time(seconds):
+    # type: (float) -> typing.Text
+    return email.utils.formatdate(seconds, usegmt=True)
+
+
+def _configuration(properties):
+    # type: (typing.Dict[typing.Text, typing.Text]) -> typing.Text
+    return '<configuration>{}</configuration>'.format(''.join(
+        '<property><name>{}</name><value>{}</value></property>'.format(name, value)
+        for name, value in sorted(properties.items())))
+
+
+def _filters(query):
+    # type: (typing.Dict[typing.Text, typing.List[typing.Text]]) -> typing.Dict[typing.Text, typing.Set[typing.Text]]
+    filters = collections.defaultdict(set)  # type: typing.Dict[typing.Text, typing.Set[typing.Text]]
+    for clause in ';'.join(query.get('filter', [])).split(';'):
+        if '=' in clause:
+            key, value = clause.split('=', 1)
+            filters[key].add(value)
+    return filters
+
+
+class _Error(Exception):
+
+    def __init__(self, status, message):
+        super(_Error, self).__init__(message)
+        self.status = status
+
+
+class FakeOozieServer(object):
+    """A stand-in for the Oozie REST API, serving synthetic jobs over HTTP from a background thread.
+
+    Serves the `versions`, `v2/admin/*`, `v2/jobs` and `v2/job/<id>` endpoints `OozieClient` uses. The server has
+    `coordinators` coordinators of `coordinator_actions` actions each, every one of which ran a workflow of
+    `workflow_actions` actions, and `workflows` further workflows that belong to no coordinator. Jobs are generated
+    on request from their IDs rather than stored, so the scale only costs what is actually fetched; the same `seed`
+    always produces the same jobs. Submitting jobs and changing their status (kill, suspend, etc.) are remembered.
+
+    Every response other than `versions` is delayed by `latency` seconds, and fails with an HTTP 500 with probability
+    `error_rate`. Requests served are counted by method and endpoint in `requests`.
+
+    With `compression`, replies of at least a kilobyte are gzipped for clients that accept it, and gzipped request
+    bodies are taken; otherwise they're refused with an HTTP 400, as a stock Oozie server can't parse them.
+    """
+
+    def __init__(self, coordinators=10, coordinator_actions=100, workflows=100, workflow_actions=5, user='oozie',
+                 latency=0.0, error_rate=0.0, seed=0, host='127.0.0.1', port=0, compression=False):
+        # type: (int, int, int, int, typing.Text, float, float, int, typing.Text, int, bool) -> None
+        self.coordinator_actions = coordinator_actions
+        self.workflow_actions = workflow_actions
+        self.user = user
+        self.latency = latency
+        self.error_rate = error_rate
+        self.compression = compression
+        self.requests = collections.Counter()  # type: typing.Counter[typing.Tuple[typing.Text, typing.Text]]
+        self.__seed = seed
+        self.__counts = {'C': coordinators, 'W': workflows}
+        self.__submitted = {}  # type: typing.Dict[typing.Text, typing.Text]
+        self.__statuses = {}  # type: typing.Dict[typing.Text, typing.Text]
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+        self.__httpd = _HTTPServer((host, port), _Handler)
+        self.__httpd.fake = self
+        self.__thread = None  # type: typing.Optional[threading.Thread]
+
+    @property
+    def url(self):
+        # type: () -> typing.Text
+        host, port = self.__httpd.server_address[:2]
+        return 'http://{}:{}/oozie'.format(host, port)
+
+    def start(self):
+        # type: () -> FakeOozieServer
+        self.__thread = threading.Thread(target=self.__httpd.serve_forever, name='fake-oozie')
+        self.__thread.daemon = True
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        # type: () -> None
+        self.__httpd.shutdown()
+        self.__httpd.server_close()
+        if self.__thread:
+            self.__thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *_):
+        self.stop()
+
+    # ===========================================================================
+    # Synthetic jobs
+    # ===========================================================================
+
+    def __pick(self, options, *key):
+        # type: (typing.List[typing.Text], *typing.Any) -> typing.Text
+        # A stable choice for `key`, which doesn't depend on what else has been generated
+        digest = zlib.crc32(':'.join('{}'.format(part) for part in (self.__seed,) + key).encode('utf-8')) & 0xffffffff
+        return options[digest % len(options)]
+
+    def __status(self, job_id, default):
+        # type: (typing.Text, typing.Text) -> typing.Text
+        with self.__lock:
+            return self.__statuses.get(job_id, default)
+
+    def __exists(self, index, run, job_type):
+        # type: (int, int, typing.Text) -> bool
+        if run == 0:
+            return index < self.__counts[job_type]
+        return job_type == 'W' and index < self.__counts['C'] and run <= self.coordinator_actions
+
+    def coordinator_id(self, index):
+        # type: (int) -> typing.Text
+        return '{:07d}-{:015d}-oozie-oozi-C'.format(index, 0)
+
+    def workflow_id(self, index, run=0):
+        # type: (int, int) -> typing.Text
+        """The ID of a workflow that belongs to no coordinator, or that ran for action `run` of coordinator `index`."""
+        return '{:07d}-{:015d}-oozie-oozi-W'.format(index, run)
+
+    def __coordinator(self, index, details=False, numbers=None, total=0):
+        # type: (int, bool, typing.Optional[typing.Iterable[int]], int) -> typing.Dict[typing.Text, typing.Any]
+        job_id = self.coordinator_id(index)
+        name = self.__submitted.get(job_id) or 'coordinator-{}'.format(index)
+        status = self.__status(job_id, self.__pick(_COORDINATOR_STATUSES, 'C', index))
+        coordinator = {
+            'coordJobId': job_id,
+            'coordJobName': name,
+            'coordJobPath': 'hdfs://namenode/user/{}/{}'.format(self.user, name),
+            'user': self.user,
+            'group': None,
+            'status': status,
+            'frequency': '60',
+            'timeUnit': 'MINUTE',
+            'timeZone': 'UTC',
+            'concurrency': 1,
+            'executionPolicy': 'FIFO',
+            'startTime': _time(_EPOCH),
+            'endTime': _time(_EPOCH + 3600 * 24 * 365 * 10),
+            'lastAction': _time(_EPOCH + 3600 * self.coordinator_actions),
+            'nextMaterializedTime': _time(_EPOCH + 3600 * self.coordinator_actions),
+            'consoleUrl': '{}?job={}'.format(self.url, job_id),
+            'toString': 'Coordinator application id[{}] status[{}]'.format(job_id, status),
+            'total': total,
+            'actions': [self.__coordinator_action(index, number) for number in numbers or []],
+        }
+        if details:
+            coordinator['conf'] = _configuration({'user.name': self.user, 'oozie.coord.application.path':
+                                                  coordinator['coordJobPath']})
+        return coordinator
+
+    def __coordinator_action_status(self, index, number):
+        # type: (int, int) -> typing.Text
+        default = 'RUNNING' if number == self.coordinator_actions else \
+            self.__pick(_COORDINATOR_ACTION_STATUSES, 'C', index, number)
+        return self.__status('{}@{}'.format(self.coordinator_id(index), number), default)
+
+    def __coordinator_action(self, index, number):
+        # type: (int, int) -> typing.Dict[typing.Text, typing.Any]
+        coordinator_id = self.coordinator_id(index)
+        action_id = '{}@{}'.format(coordinator_id, number)
+        status = self.__coordinator_action_status(index, number)
+        nominal_time = _EPOCH + 3600 * (number - 1)
+        return {
+            'id': action_id,
+            'actionNumber': number,
+            'coordJobId': coordinator_id,
+            'externalId': self.workflow_id(index, number),
+            'externalStatus': None,
+            'status': status,
+            'type': None,
+            'createdConf': None,
+            'runConf': None,
+            'createdTime': _time(nominal_time),
+            'nominalTime': _time(nominal_time),
+            'lastModifiedTime': _time(nominal_time + 600),
+            'missingDependencies': '',
+            'pushMissingDependencies': None,
+            'errorCode': None,
+            'errorMessage': None,
+            'trackerUri': None,
+            'consoleUrl': None,
+            'toString': 'CoordinatorAction name[{}] status[{}]'.format(action_id, status),
+        }
+
+    def __workflow(self, index, run, details=False):
+        # type: (int, int, bool) -> typing.Dict[typing.Text, typing.Any]
+        job_id = self.workflow_id(index, run)
+        if run:
+            name = 'coordinator-{}-workflow'.format(index)
+            default = _WORKFLOW_STATUS_OF_ACTION.get(self.__coordinator_action_status(index, run), 'RUNNING')
+            started = _EPOCH + 3600 * (run - 1)
+        else:
+            name = self.__submitted.get(job_id) or 'workflow-{}'.format(index)
+            default = self.__pick(_WORKFLOW_STATUSES, 'W', index)
+            started = _EPOCH + 60 * index
+        status = self.__status(job_id, default)
+        workflow = {
+            'id': job_id,
+            'appName': name,
+            'appPath': 'hdfs://namenode/user/{}/{}'.format(self.user, name),
+            'user': self.user,
+            'group': None,
+            'status': status,
+            'parentId': '{}@{}'.format(self.coordinator_id(index), run) if run else None,
+            'run': 0,
+            'createdTime': _time(started),
+            'startTime': _time(started),
+            'lastModTime': _time(started + 600),
+            'endTime': None if status in ('RUNNING', 'SUSPENDED', 'PREP') else _time(started + 600),
+            'externalId': None,
+            'acl': None,
+            'consoleUrl': '{}?job={}'.format(self.url, job_id),
+            'toString': 'Workflow id[{}] status[{}]'.format(job_id, status),
+            'actions': [],
+        }
+        if details:
+            workflow['conf'] = _configuration({'user.name': self.user, 'oozie.wf.application.path':
+                                               workflow['appPath']})
+            workflow['actions'] = [self.__workflow_action(job_id, status, number)
+                                   for number in range(self.workflow_actions)]
+        return workflow
+
+    def __workflow_action(self, workflow_id, workflow_status, number):
+        # type: (typing.Text, typing.Text, int) -> typing.Dict[typing.Text, typing.Any]
+        name = 'action-{}'.format(number)
+        last = number == self.workflow_actions - 1
+        status = {'RUNNING': 'RUNNING', 'FAILED': 'ERROR', 'KILLED': 'KILLED'}.get(workflow_status, 'OK') \
+            if last else 'OK'
+        return {
+            'id': '{}@{}'.format(workflow_id, name),
+            'name': name,
+            'type': 'shell',
+            'status': status,
+            'transition': 'end' if last else 'action-{}'.format(number + 1),
+            'conf': '<shell><exec>echo</exec><argument>{}</argument></shell>'.format(name),
+            'startTime': _time(_EPOCH),
+            'endTime': None if status == 'RUNNING' else _time(_EPOCH + 60),
+            'externalId': 'job_{:013d}_{:04d}'.format(_EPOCH, number),
+            'externalStatus': 'SUCCEEDED' if status == 'OK' else status,
+            'externalChildIDs': None,
+            'errorCode': None,
+            'errorMessage': None,
+            'retries': 0,
+            'userRetryCount': 0,
+            'userRetryInterval': 10,
+            'userRetryMax': 0,
+            'cred': 'null',
+            'data': None,
+            'stats': None,
+            'trackerUri': 'localhost:8032',
+            'consoleUrl': 'http://localhost:8088/proxy/application_{}_{}/'.format(_EPOCH, number),
+            'toString': 'Action name[{}] status[{}]'.format(name, status),
+        }
+
+    # ===========================================================================
+    # Endpoints
+    # ===========================================================================
+
+    def handle(self, method, path, body=b''):
+        # type: (typing.Text, typing.Text, bytes) -> typing.Tuple[int, typing.Any]
+        """Respond to a request for `path` (e.g. '/oozie/v2/jobs?jobtype=wf') with a status and a JSON-able reply."""
+        url = parse.urlsplit(path)
+        query = parse.parse_qs(url.query)
+        route = url.path[len('/oozie/'):] if url.path.startswith('/oozie/') else url.path
+        if route == 'versions':
+            endpoint = route
+        else:
+            endpoint = '/'.join(route.split('/')[:2])
+            if self.latency:
+                time.sleep(self.latency)
+        with self.__lock:
+            self.requests[(method, endpoint)] += 1
+            fail = endpoint != 'versions' and self.error_rate and self.__random.random() < self.error_rate
+        if fail:
+            return 500, None
+
+        try:
+            if method == 'GET' and route == 'versions':
+                return 200, [0, 1, 2]
+            elif method == 'GET' and endpoint == 'v2/admin':
+                return 200, self.__admin(route[len('v2/admin/'):], query)
+            elif method == 'GET' and route == 'v2/jobs':
+                return 200, self.__jobs(query)
+            elif method == 'POST' and route == 'v2/jobs':
+                return 201, self.__submit(body, start=query.get('action') == ['start'])
+            elif method == 'GET' and endpoint == 'v2/job':
+                return 200, self.__job(route[len('v2/job/'):], query)
+            elif method == 'PUT' and endpoint == 'v2/job':
+                return 200, self.__job_action(route[len('v2/job/'):], query)
+            raise _Error(404, 'Not found: {} {}'.format(method, path))
+        except _Error as err:
+            return err.status, None
+
+    def __admin(self, name, query):
+        # type: (typing.Text, typing.Dict[typing.Text, typing.List[typing.Text]]) -> typing.Any
+        if name == 'list_sharelib':
+            libs = query.get('lib') or sorted(_SHARELIBS)
+            if 'lib' in query:
+                return {'sharelib': [{'name': lib, 'files': _SHARELIBS.get(lib, [])} for lib in libs]}
+            return {'sharelib': [{'name': lib} for lib in libs]}
+        if name not in _ADMIN_RESPONSES:
+            raise _Error(400, 'Unknown admin endpoint: {}'.format(name))
+        return _ADMIN_RESPONSES[name]
+
+    def __jobs(self, query):
+        # type: (typing.Dict[typing.Text, typing.List[typing.Text]]) -> typing.Dict[typing.Text, typing.Any]
+        job_type = (query.get('jobtype') or ['wf'])[0]
+        offset = int((query.get('offset') or ['1'])[0])
+        length = int((query.get('len') or ['50'])[0])
+        filters = _filters(query)
+        if job_type.startswith('coord'):
+            key, result_type, build = 'C', 'coordinatorjobs', lambda index: self.__coordinator(index)
+        else:
+            key, result_type, build = 'W', 'workflows', lambda index: self.__workflow(index, 0)
+        with self.__lock:
+            count = self.__counts[key]
+
+        # Newest first, as Oozie lists them
+        if not filters:
+            positions = six.moves.range(offset - 1, min(offset - 1 + length, count))
+            return {'offset': offset, 'len': length, 'total': count,
+                    result_type: [build(count - 1 - position) for position in positions]}
+        jobs = [job for job in (build(index) for index in six.moves.range(count - 1, -1, -1))
+                if all(self.__matches(job, name, values) for name, values in filters.items())]
+        return {'offset': offset, 'len': length, 'total': len(jobs), result_type: jobs[offset - 1:offset - 1 + length]}
+
+    @staticmethod
+    def __matches(job, name, values):
+        # type: (typing.Dict[typing.Text, typing.Any], typing.Text, typing.Set[typing.Text]) -> bool
+        field = {'name': job.get('coordJobName') or job.get('appName')}.get(name, job.get(name))
+        return field in values
+
+    def __parse_id(self, job_id):
+        # type: (typing.Text) -> typing.Tuple[int, int, typing.Text, typing.Optional[typing.Text]]
+        parts = _JOB_ID_RE.match(job_id)
+        if not parts:
+            raise _Error(400, 'Invalid job ID: {}'.format(job_id))
+        index, run, job_type = int(parts.group('index')), int(parts.group('run')), parts.group('type')
+        with self.__lock:
+            exists = self.__exists(index, run, job_type)
+        if not exists:
+            raise _Error(404, 'No such job: {}'.format(job_id))
+        return index, run, job_type, parts.group('action')
+
+    def __job(self, job_id, query):
+        # type: (typing.Text, typing.Dict[typing.Text, typing.List[typing.Text]]) -> typing.Dict
+        index, run, job_type, action = self.__parse_id(job_id)
+        if job_type == 'W':
+            workflow = self.__workflow(index, run, details=True)
+            if action:
+                matches = [candidate for candidate in workflow['actions'] if candidate['name'] == action]
+                if not matches:
+                    raise _Error(404, 'No such action: {}'.format(job_id))
+                return matches[0]
+            return workflow
+
+        if action:
+            number = int(action)
+            if not 1 <= number <= self.coordinator_actions:
+                raise _Error(404, 'No such action: {}'.format(job_id))
+            return self.__coordinator_action(index, number)
+
+        statuses = _filters(query).get('status')
+        numbers = list(six.moves.range(1, self.coordinator_actions + 1))
+        if statuses:
+            numbers = [number for number in numbers if self.__coordinator_action_status(index, number) in statuses]
+        if (query.get('order') or [''])[0] == 'desc':
+            numbers = numbers[::-1]
+        offset = int((query.get('offset') or ['1'])[0])
+        length = int((query.get('len') or ['1000'])[0])
+        return self.__coordinator(index, details=True, numbers=numbers[offset - 1:offset - 1 + length],
+                                  total=len(numbers))
+
+    def __job_action(self, job_id, query):
+        # type: (typing.Text, typing.Dict[typing.Text, typing.List[typing.Text]]) -> typing.Optional[typing.Dict]
+        self.__parse_id(job_id)
+        action = (query.get('action') or [''])[0]
+        if action == 'update':
+            return {'update': {'diff': ''}}
+        if action not in _STATUS_AFTER:
+            raise _Error(400, 'Unsupported action: {}'.format(action))
+
+        targets = [job_id]
+        if (query.get('type') or [''])[0] == 'action':
+            targets = ['{}@{}'.format(job_id, number) for number in (query.get('scope') or [''])[0].split(',')]
+        with self.__lock:
+            for target in targets:
+                self.__statuses[target] = _STATUS_AFTER[action]
+        return None
+
+    def __submit(self, body, start=False):
+        # type: (bytes, bool) -> typing.Dict[typing.Text, typing.Text]
+        try:
+            properties = {prop.findtext('name'): prop.findtext('value') for prop in et.fromstring(body)}
+        except et.ParseError:
+            raise _Error(400, 'Invalid submission')
+        if 'oozie.coord.application.path' in properties:
+            key, path = 'C', properties['oozie.coord.application.path']
+        elif 'oozie.wf.application.path' in properties:
+            key, path = 'W', properties['oozie.wf.application.path']
+        else:
+            raise _Error(400, 'Missing application path')
+
+        with self.__lock:
+            index = self.__counts[key]
+            self.__counts[key] += 1
+            job_id = self.coordinator_id(index) if key == 'C' else self.workflow_id(index)
+            self.__submitted[job_id] = path.rstrip('/').rsplit('/', 1)[-1]
+            self.__statuses[job_id] = 'RUNNING' if key == 'C' or start else 'PREP'
+        return {'id': job_id}
+
+
+class _HTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+    fake = None  # type: FakeOozieServer
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    # Keep connections alive, as a pooled `requests.Session` expects, without delaying small replies
+    protocol_version = str('HTTP/1.1')
+    disable_nagle_algorithm = True
+
+    def __respond(self, method):
+        # type: (typing.Text) -> None
+        fake = self.server.fake
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        headers = {}
+        if self.headers.get('Content-Encoding') == 'gzip' and not fake.compression:
+            status, reply = 400, None
+        else:
+            if self.headers.get('Content-Encoding') == 'gzip':
+                body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+            status, reply = fake.handle(method, self.path, body)
+        content = json.dumps(reply).encode('utf-8') if reply is not None else b''
+        if fake.compression and len(content) >= 1024 and 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            content = compressor.compress(content) + compressor.flush()
+            headers['Content-Encoding'] = 'gzip'
+        self.send_response(status)
+        self.send_header(str('Content-Type'), str('application/json;charset=UTF-8'))
+        for name, value in headers.items():
+            self.send_header(str(name), str(value))
+        self.send_header(str('Content-Length'), str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.__respond('GET')
+
+    def do_PUT(self):  # pylint: disable=invalid-name
+        self.__respond('PUT')
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self.__respond('POST')
+
+    def log_message(self, *_):  # pylint: disable=arguments-differ
+        pass
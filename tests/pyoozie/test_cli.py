@@ -0,0 +1,154 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+from __future__ import unicode_literals
+
+import argparse
+import io
+import json
+
+import mock
+import pytest
+
+from pyoozie import cli
+from pyoozie import client
+from tests import fake_oozie
+
+
+@pytest.fixture
+def server():
+    with fake_oozie.FakeOozieServer(coordinators=3, coordinator_actions=10, workflows=20, workflow_actions=2) as fake:
+        yield fake
+
+
+def _run(server, *argv):
+    stdout = io.StringIO()
+    status = cli.main(['--url', server.url, '-j', '4'] + list(argv), stdout=stdout)
+    return status, [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+
+def test_list(server):
+    status, records = _run(server, 'list', 'workflows', '--limit', '5')
+    assert status == 0
+    assert [record['id'] for record in records] == [server.workflow_id(index) for index in range(19, 14, -1)]
+    assert records[0]['status'] in ('SUCCEEDED', 'RUNNING', 'FAILED', 'KILLED', 'SUSPENDED')
+
+    status, records = _run(server, 'list', 'coordinators', '--name', 'coordinator-1')
+    assert status == 0
+    assert [record['coordJobId'] for record in records] == [server.coordinator_id(1)]
+    assert records[0]['startTime'].endswith('Z')
+
+    status, records = _run(server, 'list', 'workflows', '--status', 'running', '--status', 'SUSPENDED')
+    assert status == 0
+    assert {record['status'] for record in records} <= {'RUNNING', 'SUSPENDED'}
+
+    with pytest.raises(ValueError):
+        cli._list(None, argparse.Namespace(type='workflows', status=['NONSENSE']), None)
+    assert _run(server, 'list', 'workflows', '--status', 'NONSENSE') == (2, [])
+
+    # Actions are always a list, even when there are none
+    status, records = _run(server, 'list', 'coordinators')
+    assert status == 0
+    assert [record['actions'] for record in records] == [[], [], []]
+
+
+def test_info(server):
+    action_id = '{}@3'.format(server.coordinator_id(0))
+    unknown = '0000999-000000000000000-oozie-oozi-W'
+    status, records = _run(server, 'info', server.coordinator_id(0), action_id, server.workflow_id(1), unknown,
+                           '--limit', '4')
+    assert status == 1
+    assert records[0]['coordJobId'] == server.coordinator_id(0)
+    assert [action['actionNumber'] for action in records[0]['actions']] == [7, 8, 9, 10]
+    assert records[1]['id'] == action_id
+    assert records[2]['id'] == server.workflow_id(1)
+    assert sorted(action['name'] for action in records[2]['actions']) == ['action-0', 'action-1']
+    assert records[3]['id'] == unknown
+    assert 'not found' in records[3]['error']
+
+
+def test_manage(server):
+    api = client.OozieClient(url=server.url, verbose=False)
+    workflow = api.jobs_submit_workflow('/user/oozie/workflows/submitted', start=True)
+    action_id = '{}@10'.format(server.coordinator_id(0))
+
+    status, records = _run(server, 'suspend', workflow.id, action_id)
+    assert status == 0
+    assert records == [{'id': workflow.id, 'changed': True}, {'id': action_id, 'changed': True}]
+    status, records = _run(server, 'suspend', workflow.id)
+    assert records == [{'id': workflow.id, 'changed': False}]
+
+    status, records = _run(server, 'resume', workflow.id, action_id)
+    assert [record['changed'] for record in records] == [True, True]
+
+    status, records = _run(server, 'kill', workflow.id, 'nonsense')
+    assert status == 1
+    assert records[0] == {'id': workflow.id, 'changed': True}
+    assert "Can't kill job 'nonsense'" in records[1]['error']
+
+    status, records = _run(server, 'rerun', workflow.id)
+    assert status == 1
+    assert "Can't rerun job" in records[0]['error']
+    assert server.requests[('PUT', 'v2/job')] == 5
+
+
+def test_submit(server):
+    paths = ['/user/oozie/workflows/first', '/user/oozie/workflows/second']
+    status, records = _run(server, 'submit', 'workflow', '-D', 'queue=backfill', '--start', *paths)
+    assert status == 0
+    assert [record['path'] for record in records] == paths
+    api = client.OozieClient(url=server.url, verbose=False)
+    workflow = api.job_workflow_info(workflow_id=records[1]['id'])
+    assert workflow.appName == 'second'
+
+    status, records = _run(server, 'submit', 'coordinator', '/user/oozie/coordinators/new')
+    assert status == 0
+    assert records[0]['id'].endswith('-C')
+
+    with pytest.raises(SystemExit):
+        _run(server, 'submit', 'workflow', '-D', 'queue', paths[0])
+
+
+def test_wait(server):
+    api = client.OozieClient(url=server.url, verbose=False)
+    workflow = api.jobs_submit_workflow('/user/oozie/workflows/submitted', start=True)
+    killed = api.jobs_submit_workflow('/user/oozie/workflows/killed', start=True)
+    api.job_workflow_kill(workflow_id=killed.id)
+    output = cli._Output(io.StringIO())
+    args = argparse.Namespace(job_ids=[workflow.id, killed.id], interval=5, wait_timeout=0)
+
+    def sleep(seconds):
+        assert seconds == 5
+        # The workflow finishes while waiting for it
+        server.handle('PUT', '/oozie/v2/job/{}?action=kill'.format(workflow.id))
+
+    cli._wait(api, args, output, sleep=sleep)
+    records = [json.loads(line) for line in output.stream.getvalue().splitlines()]
+    assert records == [
+        {'id': killed.id, 'status': 'KILLED', 'error': 'Finished with status KILLED'},
+        {'id': workflow.id, 'status': 'KILLED', 'error': 'Finished with status KILLED'},
+    ]
+    assert output.errors == 2
+
+
+def test_wait_timeout(server):
+    api = client.OozieClient(url=server.url, verbose=False)
+    workflow = api.jobs_submit_workflow('/user/oozie/workflows/submitted', start=True)
+    output = cli._Output(io.StringIO())
+    args = argparse.Namespace(job_ids=[workflow.id], interval=5, wait_timeout=12)
+    clock = mock.Mock(side_effect=[100, 101, 106, 111])
+    sleep = mock.Mock()
+    cli._wait(api, args, output, clock=clock, sleep=sleep)
+    assert sleep.call_count == 2
+    assert json.loads(output.stream.getvalue()) == {'id': workflow.id, 'error': 'Timed out waiting for job to finish'}
+
+
+def test_wait_timeout_options():
+    # The global --timeout is for each reply, and wait's for all the jobs
+    args = cli._parser().parse_args(['--timeout', '5', 'wait', 'job'])
+    assert (args.timeout, args.wait_timeout) == (5, 0)
+
+    args = cli._parser().parse_args(['wait', '--timeout', '3600', 'job'])
+    assert (args.timeout, args.wait_timeout) == (30, 3600)
+
+    args = cli._parser().parse_args(['--timeout', '5', 'wait', '--timeout', '3600', 'job'])
+    assert (args.timeout, args.wait_timeout) == (5, 3600)
@@ -1,17 +1,23 @@
+# -*- coding: utf-8 -*-
 # Copyright (c) 2017 "Shopify inc." All rights reserved.
 # Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
 from __future__ import unicode_literals
 
 import copy
+import json
+import zlib
+
 import mock
 import pytest
 import requests_mock
 import requests
 
 from pyoozie import exceptions
+from pyoozie import history
 from pyoozie import model
 from pyoozie import client
 from pyoozie import xml
+from tests import fake_oozie
 
 
 # TODO: share these with test_model.py?
@@ -221,6 +227,16 @@ class TestOozieClientCore(object):
                 api._request('GET', 'endpoint', None, None)
             assert 'Invalid response from Oozie server' in str(err)
 
+    def test_request_json_decoder(self, oozie_config):
+        decode = mock.Mock(return_value={'result': 'pass'})
+        with mock.patch('pyoozie.client.OozieClient._test_connection'), requests_mock.mock() as m:
+            api = client.OozieClient(json_decoder=decode, **oozie_config)
+            m.get('http://localhost:11000/oozie/v2/endpoint', content='{"result": "ǝɯɐu"}'.encode('utf-8'))
+            assert api._request('GET', 'endpoint', None, None) == {'result': 'pass'}
+        decode.assert_called_once_with('{"result": "ǝɯɐu"}'.encode('utf-8'))
+        # Bytes received are counted as UTF-8 bytes, rather than as decoded characters
+        assert api._stats.bytes_received == 21
+
     def test_request_uses_session_params(self, api_with_session):
         with requests_mock.mock() as m:
             m.get('http://localhost:11000/oozie/v2/endpoint', text='{"result": "pass"}')
@@ -248,6 +264,44 @@ class TestOozieClientCore(object):
             result = api._post('endpoint', content='<xml/>')
             assert result['result'] == 'pass'
 
+    def test_profile(self, api):
+        coordinator = {
+            'coordJobId': SAMPLE_COORD_ID,
+            'status': 'RUNNING',
+            'conf': '<configuration><property><name>a</name><value>b</value></property></configuration>',
+            'startTime': 'Mon, 01 Jan 2018 00:00:00 GMT',
+            'actions': [{'id': SAMPLE_COORD_ACTION, 'nominalTime': 'Mon, 01 Jan 2018 00:00:00 GMT'}],
+        }
+        with requests_mock.mock() as m:
+            m.get('http://localhost:11000/oozie/v2/job/' + SAMPLE_COORD_ID, json=coordinator)
+            with api.profile() as profile:
+                api._get('job/{}?offset=1&len=1'.format(SAMPLE_COORD_ID))
+                model.Coordinator(api, coordinator)
+            # Only the client being profiled is
+            model.Coordinator(None, coordinator)
+
+        assert {key: count for key, (count, _) in profile.totals().items()} == {
+            ('network', 'GET job'): 1,
+            ('json', 'GET job'): 1,
+            ('model', 'Coordinator'): 1,
+            ('model', 'CoordinatorAction'): 1,
+            ('conf', 'Coordinator.conf'): 1,
+            ('time', 'Coordinator.endTime'): 1,
+            ('time', 'Coordinator.lastAction'): 1,
+            ('time', 'Coordinator.nextMaterializedTime'): 1,
+            ('time', 'Coordinator.startTime'): 1,
+            ('time', 'CoordinatorAction.createdTime'): 1,
+            ('time', 'CoordinatorAction.lastModifiedTime'): 1,
+            ('time', 'CoordinatorAction.nominalTime'): 1,
+        }
+        assert list(profile.phases()) == ['network', 'json', 'model', 'conf', 'time', 'other']
+        wall = profile.wall
+        assert profile.wall == wall
+
+        logger = mock.Mock()
+        profile.report(logger)
+        assert logger.info.call_count == 13
+
     def test_headers(self, api):
         headers = api._headers()
         assert headers == {}
@@ -255,6 +309,80 @@ class TestOozieClientCore(object):
         headers = api._headers(content_type='foo/bar')
         assert headers == {'Content-Type': 'foo/bar'}
 
+    def test_headers_compression(self, oozie_config):
+        api = client.OozieClient(compression=True, **oozie_config)
+        assert api._headers() == {'Accept-Encoding': 'gzip, deflate'}
+        assert api._headers(content_type='foo/bar', content_encoding='gzip') == {
+            'Content-Type': 'foo/bar',
+            'Content-Encoding': 'gzip',
+            'Accept-Encoding': 'gzip, deflate',
+        }
+
+    def test_request_compressed_reply(self, oozie_config):
+        reply = json.dumps({'result': ['pass'] * 1000}).encode('utf-8')
+        with mock.patch('pyoozie.client.OozieClient._test_connection'), requests_mock.mock() as m:
+            api = client.OozieClient(compression=True, **oozie_config)
+            m.get('http://localhost:11000/oozie/v2/endpoint', content=client._gzip(reply),
+                  headers={'Content-Encoding': 'gzip'})
+            assert api._request('GET', 'endpoint', None, None) == {'result': ['pass'] * 1000}
+            assert m.last_request.headers['Accept-Encoding'] == 'gzip, deflate'
+        assert api._stats.bytes_received == len(reply)
+        assert api._stats.wire_bytes_received == len(client._gzip(reply))
+        assert api._stats.wire_bytes_received < api._stats.bytes_received / 10
+
+    def test_request_compressed_submission(self, oozie_config):
+        small = b'<configuration/>'
+        large = b'<configuration>' + b'<property/>' * client.COMPRESSION_THRESHOLD + b'</configuration>'
+        with mock.patch('pyoozie.client.OozieClient._test_connection'), requests_mock.mock() as m:
+            m.post('http://localhost:11000/oozie/v2/endpoint', text='{"id": "pass"}')
+
+            # Compressed replies don't imply compressed submissions
+            api = client.OozieClient(compression=True, **oozie_config)
+            api._post('endpoint', large)
+            assert 'Content-Encoding' not in m.last_request.headers
+            assert m.last_request.body == large
+
+            api = client.OozieClient(compress_submissions=True, **oozie_config)
+            api._post('endpoint', small)
+            assert 'Content-Encoding' not in m.last_request.headers
+            assert m.last_request.body == small
+
+            api._post('endpoint', large)
+            assert m.last_request.headers['Content-Encoding'] == 'gzip'
+            assert zlib.decompress(m.last_request.body, 16 + zlib.MAX_WBITS) == large
+
+    @pytest.mark.parametrize('status_code', [400, 415])
+    def test_request_compressed_submission_unsupported(self, status_code, oozie_config):
+        large = b'<configuration>' + b'<property/>' * client.COMPRESSION_THRESHOLD + b'</configuration>'
+        with mock.patch('pyoozie.client.OozieClient._test_connection'), requests_mock.mock() as m:
+            api = client.OozieClient(compress_submissions=True, **oozie_config)
+            m.post('http://localhost:11000/oozie/v2/endpoint', [
+                {'status_code': status_code},
+                {'text': '{"id": "pass"}'},
+                {'text': '{"id": "pass"}'},
+            ])
+            assert api._post('endpoint', large) == {'id': 'pass'}
+            assert [request.headers.get('Content-Encoding') for request in m.request_history] == ['gzip', None]
+            assert m.last_request.body == large
+
+            # The server's refusal is remembered
+            api._post('endpoint', large)
+            assert m.call_count == 3
+            assert m.last_request.body == large
+            assert api._stats.errors == 1
+
+    def test_request_compressed_submission_invalid(self, oozie_config):
+        large = b'<configuration>' + b'<property/>' * client.COMPRESSION_THRESHOLD + b'</configuration>'
+        with mock.patch('pyoozie.client.OozieClient._test_connection'), requests_mock.mock() as m:
+            api = client.OozieClient(compress_submissions=True, **oozie_config)
+            m.post('http://localhost:11000/oozie/v2/endpoint', status_code=400)
+            with pytest.raises(exceptions.OozieException):
+                api._post('endpoint', large)
+            assert [request.headers.get('Content-Encoding') for request in m.request_history] == ['gzip', None]
+
+            # A submission that's refused uncompressed too says nothing about whether the server takes compressed ones
+            assert api._compress_requests
+
 
 class TestOozieClientAdmin(object):
 
@@ -309,6 +437,25 @@ class TestOozieClientAdmin(object):
                 result = api.admin_list_all_sharelib()
                 assert result == expected
 
+                # Not cached by default
+                mock_get.reset_mock()
+                assert api.admin_list_all_sharelib(max_workers=1) == expected
+                assert mock_get.call_count == 2
+
+    def test_admin_list_all_sharelib_cached(self, oozie_config):
+        with mock.patch('pyoozie.client.OozieClient._test_connection'):
+            api = client.OozieClient(sharelib_cache_ttl=600, **oozie_config)
+        with mock.patch.object(api, 'admin_list_sharelib', return_value=['oozie']) as mock_list:
+            with mock.patch.object(api, '_get') as mock_get:
+                mock_get.return_value = {'sharelib': [{'files': ['oozie1'], 'name': 'oozie'}]}
+                result = api.admin_list_all_sharelib()
+                assert result == {'oozie': ['oozie1']}
+                result['hive'] = []
+
+                assert api.admin_list_all_sharelib() == {'oozie': ['oozie1']}
+                assert mock_list.call_count == 1
+                assert mock_get.call_count == 1
+
 
 class TestOozieClientJobsQuery(object):
 
@@ -677,9 +824,204 @@ class TestOozieClientJobsQuery(object):
             api.jobs_coordinator_names(user='john_doe')
             mock_query.assert_called_with(model.ArtifactType.Coordinator, user='john_doe', details=False)
 
+    def test_last_job_id(self, api):
+        with mock.patch.object(api, '_jobs_query') as mock_query:
+            mock_query.return_value = [model.Coordinator(api, {'coordJobId': SAMPLE_COORD_ID})]
+            assert api._last_job_id(model.ArtifactType.Coordinator, 'my_coordinator') == SAMPLE_COORD_ID
+            mock_query.assert_called_with(
+                model.ArtifactType.Coordinator, name='my_coordinator', user=None, limit=1, details=False)
+
+            mock_query.return_value = [model.Workflow(api, {'id': SAMPLE_WF_ID})]
+            assert api._last_job_id(model.ArtifactType.Workflow, 'my_workflow', user='john_doe') == SAMPLE_WF_ID
+            mock_query.assert_called_with(
+                model.ArtifactType.Workflow, name='my_workflow', user='john_doe', limit=1, details=False)
+
+            # Caching is disabled by default
+            mock_query.reset_mock()
+            api._last_job_id(model.ArtifactType.Workflow, 'my_workflow', user='john_doe')
+            assert mock_query.called
+
+            mock_query.return_value = []
+            assert api._last_job_id(model.ArtifactType.Workflow, 'my_workflow') is None
+
+    def test_last_job_id_cached(self, oozie_config):
+        with mock.patch('pyoozie.client.OozieClient._test_connection'):
+            api = client.OozieClient(name_cache_ttl=60, **oozie_config)
+        with mock.patch.object(api, '_jobs_query') as mock_query:
+            mock_query.return_value = [model.Coordinator(api, {'coordJobId': SAMPLE_COORD_ID})]
+            assert api._last_job_id(model.ArtifactType.Coordinator, 'my_coordinator') == SAMPLE_COORD_ID
+            assert api._last_job_id(model.ArtifactType.Coordinator, 'my_coordinator') == SAMPLE_COORD_ID
+            assert mock_query.call_count == 1
+
+            # Other job types are unaffected by invalidation
+            api._forget_job_names(model.ArtifactType.Workflow)
+            api._last_job_id(model.ArtifactType.Coordinator, 'my_coordinator')
+            assert mock_query.call_count == 1
+
+            api._forget_job_names(model.ArtifactType.Coordinator, job_id='other-C')
+            api._last_job_id(model.ArtifactType.Coordinator, 'my_coordinator')
+            assert mock_query.call_count == 1
+
+            api._forget_job_names(model.ArtifactType.Coordinator, job_id=SAMPLE_COORD_ID)
+            api._last_job_id(model.ArtifactType.Coordinator, 'my_coordinator')
+            assert mock_query.call_count == 2
+
+    def test_last_job_id_invalidated_by_kill_and_submit(self, api, sample_workflow_running):
+        with mock.patch.object(api, '_forget_job_names') as mock_forget:
+            with mock.patch.object(api, '_put'):
+                with mock.patch.object(api, 'job_workflow_info') as mock_info:
+                    mock_info.return_value = sample_workflow_running
+                    api.job_workflow_kill(SAMPLE_WF_ID)
+                    mock_forget.assert_called_with(model.ArtifactType.Workflow, SAMPLE_WF_ID)
+
+                    with mock.patch.object(api, '_post') as mock_post:
+                        mock_post.return_value = {'id': SAMPLE_WF_ID}
+                        api.jobs_submit_workflow('/dummy/wf-path')
+                        mock_forget.assert_called_with(model.ArtifactType.Workflow)
+
+
+class TestExpiringCache(object):
+
+    def test_expiry(self):
+        now = [0]
+        cache = client._ExpiringCache(10, clock=lambda: now[0])
+        cache.set('key', 'value')
+        assert cache.get('key') == 'value'
+        now[0] = 9
+        assert cache.get('key') == 'value'
+        now[0] = 10
+        assert cache.get('key') is None
+        assert cache.get('missing') is None
+
+    def test_disabled(self):
+        cache = client._ExpiringCache()
+        cache.set('key', 'value')
+        assert cache.get('key') is None
+
+    def test_invalidate(self):
+        cache = client._ExpiringCache(10)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.invalidate(lambda key, value: value == 1)
+        assert cache.get('a') is None
+        assert cache.get('b') == 2
+        cache.invalidate()
+        assert cache.get('b') is None
+
 
 class TestOozieClientJobCoordinatorQuery(object):
 
+    def test_coordinator_query_streamed(self, oozie_config):
+        coordinator = {
+            'coordJobId': SAMPLE_COORD_ID,
+            'status': 'RUNNING',
+            'total': 3,
+            'actions': [{'id': '{}@{}'.format(SAMPLE_COORD_ID, number), 'status': 'SUCCEEDED'} for number in (1, 2, 3)],
+        }
+        reply = json.dumps(coordinator).encode('utf-8')
+        with mock.patch('pyoozie.client.OozieClient._test_connection'), requests_mock.mock() as m, \
+                mock.patch('pyoozie.client.STREAM_CHUNK_SIZE', 10):
+            api = client.OozieClient(stream_actions=True, **oozie_config)
+            m.get('http://localhost:11000/oozie/v2/job/{}?offset=1&len=3'.format(SAMPLE_COORD_ID), content=reply)
+            coord = api._coordinator_query(SAMPLE_COORD_ID, limit=3, start=1)
+            assert sorted(coord.actions) == [1, 2, 3]
+            assert all(action.coordinator() is coord for action in coord.actions.values())
+            assert coord.actions[2].status == model.CoordinatorActionStatus.SUCCEEDED
+            assert api._stats.requests == 1
+            assert api._stats.bytes_received == len(reply)
+
+            m.get('http://localhost:11000/oozie/v2/job/{}?offset=1&len=3'.format(SAMPLE_COORD_ID),
+                  content=reply[:-20])
+            with pytest.raises(exceptions.OozieException) as err:
+                api._coordinator_query(SAMPLE_COORD_ID, limit=3, start=1)
+            assert 'Invalid response from Oozie server' in str(err.value.caused_by)
+
+    def test_coordinator_query_history(self, oozie_config, tmpdir):
+        def actions(numbers, status='SUCCEEDED'):
+            return [{'id': '{}@{}'.format(SAMPLE_COORD_ID, number), 'status': status} for number in numbers]
+
+        def coordinator(numbers, status='SUCCEEDED'):
+            return {'coordJobId': SAMPLE_COORD_ID, 'status': 'RUNNING', 'total': 4, 'actions': actions(numbers, status)}
+
+        url = 'http://localhost:11000/oozie/v2/job/{}?offset={}&len={}'
+        with mock.patch('pyoozie.client.OozieClient._test_connection'), requests_mock.mock() as m:
+            api = client.OozieClient(job_history=str(tmpdir.join('history.db')), **oozie_config)
+            m.get(url.format(SAMPLE_COORD_ID, 1, 1), json=coordinator([1]))
+            m.get(url.format(SAMPLE_COORD_ID, 1, 4), json=dict(coordinator([1, 2]), actions=(
+                actions([1, 2]) + actions([3], 'RUNNING') + actions([4]))))
+            coord = api._coordinator_query(SAMPLE_COORD_ID)
+            assert sorted(coord.actions) == [1, 2, 3, 4]
+            assert m.call_count == 2
+
+            # Only actions from the first one that was still running are fetched again, along with the last one
+            # before it, which is where it's expected to be
+            m.get(url.format(SAMPLE_COORD_ID, 2, 2), json=coordinator([2, 3]))
+            m.get(url.format(SAMPLE_COORD_ID, 4, 1), json=coordinator([4]))
+            coord = api._coordinator_query(SAMPLE_COORD_ID)
+            assert sorted(coord.actions) == [1, 2, 3, 4]
+            assert all(action.coordinator() is coord for action in coord.actions.values())
+            assert coord.actions[3].status == model.CoordinatorActionStatus.SUCCEEDED
+            assert [request.qs['offset'] for request in m.request_history[2:]] == [['2'], ['4']]
+
+            # Everything has finished, but the coordinator itself is still fetched
+            m.get(url.format(SAMPLE_COORD_ID, 4, 2), json=coordinator([4]))
+            coord = api._coordinator_query(SAMPLE_COORD_ID)
+            assert sorted(coord.actions) == [1, 2, 3, 4]
+            assert m.call_count == 5
+
+            # Filtered queries aren't served from the history
+            m.get(url.format(SAMPLE_COORD_ID, 1, 1) + '&filter=status=RUNNING', json=dict(coordinator([]), total=0))
+            api._coordinator_query(SAMPLE_COORD_ID, status=model.CoordinatorActionStatus.RUNNING)
+            assert m.call_count == 6
+
+            # Nor are coordinator actions once they've been rerun
+            action = api._coordinator_action_query(SAMPLE_COORD_ID, 2)
+            assert action.status == model.CoordinatorActionStatus.SUCCEEDED
+            assert m.call_count == 6
+            with mock.patch.object(api, '_fetch_coordinator_or_action', return_value=action), \
+                    mock.patch.object(action, 'coordinator', return_value=coord), \
+                    mock.patch.object(api, '_coordinator_perform_simple_action'):
+                assert api.job_coordinator_rerun(action.id)
+            m.get('http://localhost:11000/oozie/v2/job/{}@2'.format(SAMPLE_COORD_ID), json=actions([2], 'RUNNING')[0])
+            assert api._coordinator_action_query(SAMPLE_COORD_ID, 2).status == model.CoordinatorActionStatus.RUNNING
+            assert m.call_count == 7
+
+    @pytest.mark.parametrize('stream_actions', [False, True])
+    def test_coordinator_query_history_gaps(self, stream_actions, oozie_config, tmpdir):
+        def actions(numbers, status='SUCCEEDED'):
+            return [{'id': '{}@{}'.format(SAMPLE_COORD_ID, number), 'actionNumber': number, 'status': status}
+                    for number in numbers]
+
+        def coordinator(numbers, total):
+            return {'coordJobId': SAMPLE_COORD_ID, 'status': 'RUNNING', 'total': total, 'actions': actions(numbers)}
+
+        job_history = history.JobHistory(str(tmpdir.join('history.db')))
+        job_history.put(actions([1, 2, 3]))
+        url = 'http://localhost:11000/oozie/v2/job/{}?offset={}&len={}'
+        with mock.patch('pyoozie.client.OozieClient._test_connection'), requests_mock.mock() as m:
+            api = client.OozieClient(stream_actions=stream_actions, job_history=job_history, **oozie_config)
+            # Action 1 was purged, so the actions at positions 1 to 4 are 2, 3, 5 and 6
+            m.get(url.format(SAMPLE_COORD_ID, 3, 2), json=coordinator([5, 6], 4))
+            m.get(url.format(SAMPLE_COORD_ID, 1, 4), json=coordinator([2, 3, 5, 6], 4))
+            coord = api._coordinator_query(SAMPLE_COORD_ID)
+            assert sorted(coord.actions) == [2, 3, 5, 6]
+            assert m.call_count == 2
+
+    def test_coordinator_query_history_streamed(self, oozie_config, tmpdir):
+        reply = {
+            'coordJobId': SAMPLE_COORD_ID,
+            'status': 'RUNNING',
+            'total': 2,
+            'actions': [{'id': '{}@1'.format(SAMPLE_COORD_ID), 'status': 'SUCCEEDED'},
+                        {'id': '{}@2'.format(SAMPLE_COORD_ID), 'status': 'RUNNING'}],
+        }
+        job_history = history.JobHistory(str(tmpdir.join('history.db')))
+        with mock.patch('pyoozie.client.OozieClient._test_connection'), requests_mock.mock() as m:
+            api = client.OozieClient(stream_actions=True, job_history=job_history, **oozie_config)
+            m.get('http://localhost:11000/oozie/v2/job/{}?offset=1&len=2'.format(SAMPLE_COORD_ID), json=reply)
+            api._coordinator_query(SAMPLE_COORD_ID, start=1, limit=2)
+        assert sorted(job_history.coordinator_actions(SAMPLE_COORD_ID)) == [1]
+
     def test_coordinator_query_parameters(self, api):
         mock_coord = {
             'total': 0,
@@ -799,8 +1141,8 @@ class TestOozieClientJobCoordinatorQuery(object):
             assert 'A bad thing' in str(err.value.caused_by)
 
     def test_decode_coord_id(self, api, sample_coordinator_running):
-        with mock.patch.object(api, 'jobs_last_coordinator') as mock_last:
-            mock_last.return_value = mock.Mock(coordJobId=SAMPLE_COORD_ID)
+        with mock.patch.object(api, '_last_job_id') as mock_last:
+            mock_last.return_value = SAMPLE_COORD_ID
 
             with pytest.raises(ValueError) as err:
                 api._decode_coord_id()
@@ -819,11 +1161,11 @@ class TestOozieClientJobCoordinatorQuery(object):
 
             result = api._decode_coord_id(name='my_coordinator')
             assert result == SAMPLE_COORD_ID
-            mock_last.assert_called_with(name='my_coordinator', user=None)
+            mock_last.assert_called_with(model.ArtifactType.Coordinator, 'my_coordinator', user=None)
 
             result = api._decode_coord_id(name='my_coordinator', user='john_doe')
             assert result == SAMPLE_COORD_ID
-            mock_last.assert_called_with(name='my_coordinator', user='john_doe')
+            mock_last.assert_called_with(model.ArtifactType.Coordinator, 'my_coordinator', user='john_doe')
 
             mock_last.return_value = None
             with pytest.raises(exceptions.OozieException) as err:
@@ -961,6 +1303,22 @@ class TestOozieClientJobWorkflowQuery(object):
             api._workflow_query(SAMPLE_WF_ACTION)
             mock_get.assert_called_with('job/' + SAMPLE_WF_ID)
 
+    def test_workflow_query_history(self, oozie_config, tmpdir):
+        workflow = {'id': SAMPLE_WF_ID, 'status': 'RUNNING', 'actions': [{'id': SAMPLE_WF_ACTION, 'name': 'foo'}]}
+        with mock.patch('pyoozie.client.OozieClient._test_connection'), requests_mock.mock() as m:
+            api = client.OozieClient(job_history=str(tmpdir.join('history.db')), **oozie_config)
+            m.get('http://localhost:11000/oozie/v2/job/' + SAMPLE_WF_ID, [
+                {'json': workflow},
+                {'json': dict(workflow, status='SUCCEEDED')},
+            ])
+            assert api._workflow_query(SAMPLE_WF_ID).status == model.WorkflowStatus.RUNNING
+            assert api._workflow_query(SAMPLE_WF_ID).status == model.WorkflowStatus.SUCCEEDED
+            # Finished, so it won't change
+            workflow = api._workflow_query(SAMPLE_WF_ACTION)
+            assert workflow.status == model.WorkflowStatus.SUCCEEDED
+            assert workflow.action('foo').id == SAMPLE_WF_ACTION
+            assert m.call_count == 2
+
     def test_workflow_query_exception(self, api):
         with mock.patch.object(api, '_get') as mock_get:
             mock_get.side_effect = exceptions.OozieException.communication_error('A bad thing')
@@ -971,8 +1329,8 @@ class TestOozieClientJobWorkflowQuery(object):
             assert 'A bad thing' in str(err.value.caused_by)
 
     def test_decode_wf_id(self, api):
-        with mock.patch.object(api, 'jobs_last_workflow') as mock_last:
-            mock_last.return_value = mock.Mock(id=SAMPLE_WF_ID)
+        with mock.patch.object(api, '_last_job_id') as mock_last:
+            mock_last.return_value = SAMPLE_WF_ID
 
             with pytest.raises(ValueError) as err:
                 api._decode_wf_id()
@@ -991,11 +1349,11 @@ class TestOozieClientJobWorkflowQuery(object):
 
             result = api._decode_wf_id(name='my_workflow')
             assert result == SAMPLE_WF_ID
-            mock_last.assert_called_with(name='my_workflow', user=None)
+            mock_last.assert_called_with(model.ArtifactType.Workflow, 'my_workflow', user=None)
 
             result = api._decode_wf_id(name='my_workflow', user='john_doe')
             assert result == SAMPLE_WF_ID
-            mock_last.assert_called_with(name='my_workflow', user='john_doe')
+            mock_last.assert_called_with(model.ArtifactType.Workflow, 'my_workflow', user='john_doe')
 
             mock_last.return_value = None
             with pytest.raises(exceptions.OozieException) as err:
@@ -1051,20 +1409,22 @@ class TestOozieClientJobQuery(object):
                 assert not mock_coord_info.called
                 assert not mock_workflow_info.called
 
-    def test_job_action_info(self, api):
+    @mock.patch('pyoozie.client.OozieClient._coordinator_action_query')
+    def test_job_action_info(self, mock_action_query, api):
         with mock.patch.object(api, 'job_coordinator_info') as mock_coord_info:
             with mock.patch.object(api, 'job_workflow_info') as mock_workflow_info:
                 api.job_action_info(SAMPLE_COORD_ID)
                 mock_coord_info.assert_called_with(coordinator_id=SAMPLE_COORD_ID)
                 assert not mock_coord_info.action.called
+                assert not mock_action_query.called
                 assert not mock_workflow_info.called
                 mock_coord_info.reset_mock()
 
                 api.job_action_info(SAMPLE_COORD_ACTION)
-                mock_coord_info.assert_called_with(coordinator_id=SAMPLE_COORD_ACTION)
-                mock_coord_info().action.assert_called_with(12)
+                mock_action_query.assert_called_with(SAMPLE_COORD_ID, 12)
+                assert not mock_coord_info.called
                 assert not mock_workflow_info.called
-                mock_coord_info.reset_mock()
+                mock_action_query.reset_mock()
 
                 api.job_action_info(SAMPLE_WF_ID)
                 mock_workflow_info.assert_called_with(workflow_id=SAMPLE_WF_ID)
@@ -1084,6 +1444,98 @@ class TestOozieClientJobQuery(object):
                 assert not mock_coord_info.called
                 assert not mock_workflow_info.called
 
+    def test_job_action_info_single_request(self, api):
+        with mock.patch.object(api, '_get') as mock_get:
+            mock_get.return_value = {'id': SAMPLE_COORD_ACTION, 'status': 'RUNNING'}
+            action = api.job_action_info(SAMPLE_COORD_ACTION)
+            mock_get.assert_called_once_with('job/' + SAMPLE_COORD_ACTION)
+            assert action.id == SAMPLE_COORD_ACTION
+            assert action._parent is None
+
+
+class TestOozieClientExpandTree(object):
+
+    @pytest.fixture
+    def replies(self):
+        return {
+            'job/' + SAMPLE_COORD_ID: {
+                'coordJobId': SAMPLE_COORD_ID,
+                'total': 2,
+                'actions': [
+                    {'id': SAMPLE_COORD_ID + '@1', 'externalId': '0000001-oozie-oozi-W'},
+                    {'id': SAMPLE_COORD_ID + '@2', 'externalId': None},
+                ],
+            },
+            'job/0000001-oozie-oozi-W': {
+                'id': '0000001-oozie-oozi-W',
+                'actions': [
+                    {'id': '0000001-oozie-oozi-W@shell', 'type': 'shell', 'externalId': 'job_123'},
+                    {'id': '0000001-oozie-oozi-W@sub', 'type': 'sub-workflow', 'externalId': '0000002-oozie-oozi-W'},
+                ],
+            },
+            'job/0000002-oozie-oozi-W': {
+                'id': '0000002-oozie-oozi-W',
+                'actions': [],
+            },
+        }
+
+    def test_map(self, api):
+        assert api._map(lambda x: x * 2, []) == []
+        assert api._map(lambda x: x * 2, [1]) == [2]
+        assert api._map(lambda x: x * 2, range(20), max_workers=4) == [x * 2 for x in range(20)]
+
+        def fail(_):
+            raise exceptions.OozieException.communication_error('A bad thing')
+        with pytest.raises(exceptions.OozieException) as err:
+            api._map(fail, range(5))
+        assert 'A bad thing' in str(err)
+
+    def test_expand_tree(self, api, replies):
+        with mock.patch.object(api, '_get') as mock_get:
+            mock_get.side_effect = lambda url: replies[url.split('?')[0]]
+            coord, = api.expand_tree([SAMPLE_COORD_ID, SAMPLE_COORD_ID])
+
+            workflow = coord.actions[1]._workflow
+            assert workflow.id == '0000001-oozie-oozi-W'
+            assert workflow.parent() is coord.actions[1]
+            assert coord.actions[2]._workflow is None
+
+            subworkflow = workflow.action('sub')._subworkflow
+            assert subworkflow.id == '0000002-oozie-oozi-W'
+            assert subworkflow.parent() is workflow.action('sub')
+            assert workflow.action('shell')._subworkflow is None
+
+            # Lazy accessors are now served without further requests
+            mock_get.reset_mock()
+            assert coord.actions[1].workflow() is workflow
+            assert workflow.action('sub').subworkflow() is subworkflow
+            assert not mock_get.called
+
+    def test_expand_tree_depth(self, api, replies):
+        with mock.patch.object(api, '_get') as mock_get:
+            mock_get.side_effect = lambda url: replies[url.split('?')[0]]
+            coord, workflow = api.expand_tree([SAMPLE_COORD_ID, '0000001-oozie-oozi-W'], depth=0)
+            assert coord.actions[1]._workflow is None
+            assert workflow.action('sub')._subworkflow is None
+
+            coord, = api.expand_tree([SAMPLE_COORD_ID], depth=1)
+            assert coord.actions[1]._workflow.id == '0000001-oozie-oozi-W'
+            assert coord.actions[1]._workflow.action('sub')._subworkflow is None
+
+    def test_expand_tree_fetches_each_job_once(self, api, replies):
+        with mock.patch.object(api, '_get') as mock_get:
+            mock_get.side_effect = lambda url: replies[url.split('?')[0]]
+            coord, workflow = api.expand_tree([SAMPLE_COORD_ID, '0000001-oozie-oozi-W'])
+            assert coord.actions[1]._workflow is workflow
+            fetched = [call[0][0] for call in mock_get.call_args_list]
+            assert fetched.count('job/0000001-oozie-oozi-W') == 1
+            assert fetched.count('job/0000002-oozie-oozi-W') == 1
+
+    def test_expand_tree_bad_id(self, api):
+        with pytest.raises(exceptions.OozieException) as err:
+            api.expand_tree(['wat?'])
+        assert "'wat?' does not match any known job" in str(err)
+
 
 class TestOozieClientJobCoordinatorManage(object):
 
@@ -1098,13 +1550,15 @@ class TestOozieClientJobCoordinatorManage(object):
                 assert mock_info.called
 
         with mock.patch.object(api, '_decode_coord_id') as mock_decode:
-            with mock.patch.object(api, 'job_coordinator_info') as mock_info:
-                mock_decode.return_value = SAMPLE_COORD_ACTION
-                mock_info.return_value = sample_coordinator_action_running.coordinator()
-                result = api._fetch_coordinator_or_action(SAMPLE_COORD_ACTION)
-                assert result == sample_coordinator_action_running
-                assert mock_decode.called
-                assert mock_info.called
+            with mock.patch.object(api, '_coordinator_action_query') as mock_query:
+                with mock.patch.object(api, 'job_coordinator_info') as mock_info:
+                    mock_decode.return_value = SAMPLE_COORD_ACTION
+                    mock_query.return_value = sample_coordinator_action_running
+                    result = api._fetch_coordinator_or_action(SAMPLE_COORD_ACTION)
+                    assert result == sample_coordinator_action_running
+                    assert mock_decode.called
+                    mock_query.assert_called_with(SAMPLE_COORD_ID, 12)
+                    assert not mock_info.called
 
     def test_job_coordinator_suspend_coordinator(self, api, sample_coordinator_running, sample_coordinator_suspended):
         with mock.patch.object(api, '_put') as mock_put:
@@ -1208,6 +1662,15 @@ class TestOozieClientJobCoordinatorManage(object):
                 assert not mock_put.called
                 mock_put.reset_mock()
 
+    def test_job_coordinator_rerun_requests(self):
+        # Only the action and its coordinator's own details are fetched, however many actions the coordinator has
+        with fake_oozie.FakeOozieServer(coordinators=1, coordinator_actions=5000) as server:
+            api = client.OozieClient(url=server.url)
+            assert api.job_coordinator_rerun(server.coordinator_id(0) + '@1')
+            assert server.requests[('GET', 'v2/job')] == 2
+            assert server.requests[('PUT', 'v2/job')] == 1
+            assert api._stats.bytes_received < 10 * 1024
+
     def test_job_coordinator_rerun_only_supports_actions(self, api, sample_coordinator_running):
         with mock.patch.object(api, 'job_action_info') as mock_info:
             mock_info.return_value = sample_coordinator_running
@@ -1420,3 +1883,100 @@ class TestOozieClientJobSubmit(object):
                 conf = mock_post.call_args[0][1].decode('utf-8')
                 assert '<name>test.prop</name><value>this is a test</value>' in conf
                 mock_post.reset_mock()
+
+    def test_jobs_submit_coordinator_without_details(self, api):
+        with mock.patch.object(api, '_post') as mock_post:
+            with mock.patch.object(api, 'job_coordinator_info') as mock_info:
+                mock_post.return_value = {'id': SAMPLE_COORD_ID}
+                coord = api.jobs_submit_coordinator('/dummy/coord-path', details=False)
+                assert not mock_info.called
+                assert coord.coordJobId == SAMPLE_COORD_ID
+                assert coord.status == model.CoordinatorStatus.UNKNOWN
+
+                with mock.patch.object(api, 'job_last_coordinator_info') as mock_last:
+                    assert coord.fill_in_details() is mock_last.return_value
+                    mock_last.assert_called_with(coordinator_id=SAMPLE_COORD_ID)
+
+    def test_jobs_submit_workflow_without_details(self, api):
+        with mock.patch.object(api, '_post') as mock_post:
+            with mock.patch.object(api, 'job_workflow_info') as mock_info:
+                mock_post.return_value = {'id': SAMPLE_WF_ID}
+                workflow = api.jobs_submit_workflow('/dummy/wf-path', details=False)
+                assert not mock_info.called
+                assert workflow.id == SAMPLE_WF_ID
+
+                assert workflow.fill_in_details() is mock_info.return_value
+                mock_info.assert_called_with(workflow_id=SAMPLE_WF_ID)
+
+    def test_jobs_submit_workflows(self, api):
+        submissions = [('/dummy/wf-path', {'date': '2017-01-01'}), ('/dummy/wf-path', {'date': '2017-01-02'})]
+        confs = list(xml._workflow_submission_xmls('oozie', submissions, configuration={'queue': 'backfill'}))
+        replies = {confs[0]: {'id': SAMPLE_WF_ID}, confs[1]: {}}
+        with mock.patch.object(api, '_post') as mock_post:
+            mock_post.side_effect = lambda endpoint, conf: replies[conf]
+            (workflow, no_error), (no_workflow, error) = api.jobs_submit_workflows(
+                submissions, configuration={'queue': 'backfill'}, start=True, max_workers=2)
+            mock_post.assert_any_call('jobs?action=start', confs[0])
+            mock_post.assert_any_call('jobs?action=start', confs[1])
+        assert workflow.id == SAMPLE_WF_ID
+        assert no_error is None
+        assert no_workflow is None
+        assert str(error) == 'Operation failed: submit workflow'
+
+    def test_jobs_submit_coordinators(self, api):
+        submissions = [('/dummy/coord-path', None), ('/dummy/coord-path', {'shard': 2})]
+        confs = list(xml._coordinator_submission_xmls('oozie', submissions))
+        failure = exceptions.OozieException.communication_error('Bad request')
+
+        def post(endpoint, conf):
+            assert endpoint == 'jobs'
+            if conf == confs[1]:
+                raise failure
+            return {'id': SAMPLE_COORD_ID}
+
+        api._job_ids_by_name = mock.Mock()
+        with mock.patch.object(api, '_post', side_effect=post):
+            assert [(job and job.coordJobId, err) for job, err in api.jobs_submit_coordinators(submissions)] == [
+                (SAMPLE_COORD_ID, None),
+                (None, failure),
+            ]
+        assert api._job_ids_by_name.invalidate.called
+
+    def test_jobs_submit_many(self, api):
+        submissions = [
+            xml._coordinator_submission_xml('oozie', '/dummy/coord-path'),
+            xml._workflow_submission_xml('oozie', '/dummy/wf-path'),
+        ]
+        replies = {
+            submissions[0]: {'id': SAMPLE_COORD_ID},
+            submissions[1]: {'id': SAMPLE_WF_ID},
+        }
+        with mock.patch.object(api, '_post') as mock_post:
+            mock_post.side_effect = lambda endpoint, conf: replies[conf]
+            (coord, coord_err), (workflow, workflow_err) = api.jobs_submit_many(submissions)
+            mock_post.assert_any_call('jobs', submissions[0])
+            mock_post.assert_any_call('jobs', submissions[1])
+            assert coord.coordJobId == SAMPLE_COORD_ID
+            assert workflow.id == SAMPLE_WF_ID
+            assert coord_err is None and workflow_err is None
+
+            api.jobs_submit_many(submissions[1:], start=True)
+            mock_post.assert_called_with('jobs?action=start', submissions[1])
+
+        # Jobs that were submitted are still returned when others fail
+        failure = exceptions.OozieException.communication_error('Boom')
+
+        def post(endpoint, conf):
+            if conf == submissions[1]:
+                raise failure
+            return replies[conf]
+
+        with mock.patch.object(api, '_post', side_effect=post):
+            (coord, coord_err), (workflow, workflow_err) = api.jobs_submit_many(submissions)
+            assert coord.coordJobId == SAMPLE_COORD_ID and coord_err is None
+            assert workflow is None and workflow_err is failure
+
+        with mock.patch.object(api, '_post', return_value=None):
+            (job, err), _ = api.jobs_submit_many(submissions)
+            assert job is None
+            assert 'Operation failed: submit job' in str(err)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+from __future__ import unicode_literals
+
+import json
+
+import pytest
+
+from pyoozie import decoder
+
+
+@pytest.mark.parametrize('name', sorted(decoder.DECODERS))
+def test_decoders(name):
+    reply = {'total': 2, 'workflows': [{'appName': 'ǝɯɐu', 'run': 0, 'conf': None}, {'toString': 'a "quote"'}]}
+    decode = decoder.get_decoder(name)
+    assert decode(json.dumps(reply).encode('utf-8')) == reply
+    assert decode(json.dumps(reply, ensure_ascii=False).encode('utf-8')) == reply
+    with pytest.raises(ValueError):
+        decode(b'>>> fail <<<')
+
+
+def test_get_decoder():
+    assert decoder.DEFAULT_DECODER in decoder.DECODERS
+    assert decoder.get_decoder() is decoder.DECODERS[decoder.DEFAULT_DECODER]
+    assert decoder.get_decoder('json') is decoder.DECODERS['json']
+    assert decoder.get_decoder(len) is len
+    with pytest.raises(KeyError):
+        decoder.get_decoder('unknown')
+
+
+def _chunks(data, size):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('name', sorted(decoder.DECODERS))
+@pytest.mark.parametrize('size', [1, 7, 64, 100000])
+def test_stream_object(name, size):
+    reply = {
+        'coordJobId': '0123456-123456789012345-oozie-oozi-C',
+        'actions': [
+            {'id': 'a', 'missingDependencies': 'hdfs://x/{a}, [b]', 'errorMessage': 'a "quoted" \\ message'},
+            {'id': 'ǝɯɐu', 'nested': {'list': [1, 2, {'x': None}], 'empty': {}}, 'number': -1.5e3},
+            {'id': 'c', 'flag': True, 'none': None, 'unicode': '☃'},
+        ],
+        'total': 3,
+        'empty': [],
+        'conf': '<configuration>{}</configuration>',
+    }
+    data = json.dumps(reply, indent=1, ensure_ascii=False).encode('utf-8')
+    decode = decoder.get_decoder(name)
+
+    seen = []
+
+    def on_item(item):
+        seen.append(item)
+        return item['id']
+
+    result = decoder.stream_object(_chunks(data, size), 'actions', decode, on_item)
+    assert seen == reply['actions']
+    assert result == dict(reply, actions=['a', 'ǝɯɐu', 'c'])
+
+    # Arrays other than `key` are decoded as a whole
+    assert decoder.stream_object(_chunks(data, size), 'empty', decode, on_item)['actions'] == reply['actions']
+
+
+@pytest.mark.parametrize('separators', [(',', ':'), (', ', ': ')])
+def test_stream_object_brackets_in_strings(separators):
+    actions = [{
+        'id': number,
+        'runConf': '<property><name>time</name><value>${coord:nominalTime()}</value></property>' * 10,
+        'errorMessage': 'java.lang.Exception: bad {"json"},{' if number % 2 else 'missing ${YEAR}},{',
+    } for number in range(200)]
+    data = json.dumps({'actions': actions, 'total': len(actions)}, separators=separators).encode('utf-8')
+    chunks = _chunks(data, 16 * 1024)
+    calls = []
+
+    def decode(content):
+        calls.append(content)
+        return json.loads(content.decode('utf-8'))
+
+    assert decoder.stream_object(chunks, 'actions', decode, lambda item: item) == {'actions': actions, 'total': 200}
+    # Elements are decoded a chunk at a time, however often a string in them ends with a bracket
+    assert len(calls) <= 3 * len(chunks) + 3
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'[]',
+    b'{"actions": [{"id": 1}',
+    b'{"actions": [{"id": 1}]',
+    b'{"actions" [{"id": 1}]}',
+    b'{"actions": [{"id": 1} {"id": 2}]}',
+    b'{"total": 1 "actions": []}',
+])
+def test_stream_object_invalid(data):
+    with pytest.raises(ValueError):
+        decoder.stream_object(_chunks(data, 4), 'actions', decoder.get_decoder(), lambda item: item)
@@ -0,0 +1,116 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+from __future__ import unicode_literals
+
+import datetime
+
+import pytest
+
+from pyoozie import diff
+from pyoozie import tags
+
+
+def _workflow_app(error_message='A bad thing happened', parallel_order=('a', 'b'), extra_step=False,
+                  configuration=None, queue='default'):
+    def build(name):
+        return tags.Action(name=name, action=tags.Shell(exec_command='echo', arguments=[name],
+                                                        configuration={'queue': queue}))
+    steps = [tags.Parallel(*[build(name) for name in parallel_order], name='builders'), build('publish')]
+    if extra_step:
+        steps.append(build('notify'))
+    return tags.WorkflowApp(
+        name='descriptive-name',
+        configuration=configuration or {'key': 'value'},
+        job_tracker='job-tracker',
+        entities=tags.Serial(*steps, on_error=tags.Kill(error_message, name='error')),
+    )
+
+
+def _coordinator_app(**kwargs):
+    options = {
+        'name': 'coordinator-name',
+        'workflow_app_path': '/user/oozie/workflows/descriptive-name',
+        'frequency': 60,
+        'start': datetime.datetime(2015, 1, 1, 10, 56),
+        'concurrency': 1,
+        'workflow_configuration': {'queue': 'default'},
+    }
+    options.update(kwargs)
+    return tags.CoordinatorApp(**options)
+
+
+def test_diff_unchanged():
+    assert diff.diff_apps(_workflow_app(), _workflow_app()) == []
+    # Unordered collections don't produce changes
+    assert diff.diff_apps(_workflow_app(parallel_order=('a', 'b')), _workflow_app(parallel_order=('b', 'a'))) == []
+    assert diff.diff_apps(_coordinator_app(), _coordinator_app()) == []
+
+
+def test_diff_workflow_apps():
+    changes = diff.diff_apps(
+        _workflow_app(),
+        _workflow_app(error_message='Something else', extra_step=True,
+                      configuration={'key': 'changed', 'new': 'value'}, queue='urgent'),
+    )
+    assert [(change.change, change.category, change.path) for change in changes] == [
+        (diff.CHANGED, diff.PROPERTY, 'action-a/shell/configuration/queue'),
+        (diff.CHANGED, diff.PROPERTY, 'action-b/shell/configuration/queue'),
+        (diff.ADDED, diff.NODE, 'action-notify'),
+        (diff.ADDED, diff.TRANSITION, 'action-notify/error'),
+        (diff.ADDED, diff.TRANSITION, 'action-notify/ok'),
+        (diff.ADDED, diff.PROPERTY, 'action-notify/shell/configuration/queue'),
+        (diff.CHANGED, diff.TRANSITION, 'action-publish/ok'),
+        (diff.CHANGED, diff.PROPERTY, 'action-publish/shell/configuration/queue'),
+        (diff.CHANGED, diff.PROPERTY, 'global/configuration/key'),
+        (diff.ADDED, diff.PROPERTY, 'global/configuration/new'),
+        (diff.CHANGED, diff.NODE, 'kill-error'),
+    ]
+    ok_transition = [change for change in changes if change.path == 'action-publish/ok'][0]
+    assert (ok_transition.old, ok_transition.new) == ('end', 'action-notify')
+    queue = [change for change in changes if change.path == 'global/configuration/key'][0]
+    assert (queue.old, queue.new) == ('value', 'changed')
+
+    # Removals are the reverse of additions
+    reverse_changes = diff.diff_apps(_workflow_app(extra_step=True), _workflow_app())
+    assert [(change.change, change.path) for change in reverse_changes] == [
+        (diff.REMOVED, 'action-notify'),
+        (diff.REMOVED, 'action-notify/error'),
+        (diff.REMOVED, 'action-notify/ok'),
+        (diff.REMOVED, 'action-notify/shell/configuration/queue'),
+        (diff.CHANGED, 'action-publish/ok'),
+    ]
+
+
+def test_diff_fork_and_decision_transitions():
+    def build(choice, paths):
+        return tags.WorkflowApp(name='descriptive-name', entities=tags.Decision(
+            default=tags.Parallel(*[tags.Kill(path, name=path) for path in paths], name='fork'),
+            choices={choice: tags.Kill('choice', name='choice')},
+            name='decide',
+        ))
+
+    changes = diff.diff_apps(build('${a}', ['a', 'b']), build('${b}', ['b', 'c']))
+    assert [(change.change, change.category, change.path) for change in changes] == [
+        (diff.REMOVED, diff.TRANSITION, 'decision-decide/case/${a}'),
+        (diff.ADDED, diff.TRANSITION, 'decision-decide/case/${b}'),
+        (diff.REMOVED, diff.TRANSITION, 'fork-fork/path/kill-a'),
+        (diff.ADDED, diff.TRANSITION, 'fork-fork/path/kill-c'),
+        (diff.REMOVED, diff.NODE, 'kill-a'),
+        (diff.ADDED, diff.NODE, 'kill-c'),
+    ]
+
+
+def test_diff_coordinator_apps():
+    changes = diff.diff_apps(_coordinator_app(), _coordinator_app(
+        frequency=120, concurrency=2, timeout=10, workflow_configuration={'queue': 'urgent'}))
+    assert changes == [
+        diff.Change(diff.CHANGED, diff.ATTRIBUTE, '@frequency', '60', '120'),
+        diff.Change(diff.CHANGED, diff.PROPERTY, 'action/workflow/configuration/queue', 'default', 'urgent'),
+        diff.Change(diff.CHANGED, diff.CONTROL, 'controls/concurrency', '1', '2'),
+        diff.Change(diff.ADDED, diff.CONTROL, 'controls/timeout', None, '10'),
+    ]
+
+
+def test_diff_different_types():
+    with pytest.raises(AssertionError):
+        diff.diff_apps(_workflow_app(), _coordinator_app())
@@ -0,0 +1,59 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+from __future__ import unicode_literals
+
+import datetime
+
+import pytest
+
+from pyoozie import fleet
+from pyoozie import tags
+
+
+def _coordinator_app(name='orders-{shard}-{region}', workflow_app_path='/apps/{region}/orders', parameters=None):
+    return tags.CoordinatorApp(
+        name=name,
+        workflow_app_path=workflow_app_path,
+        frequency=60,
+        start=datetime.datetime(2015, 1, 1, 10, 56),
+        timeout=10,
+        concurrency=1,
+        execution_order=tags.EXEC_LAST_ONLY,
+        parameters=parameters,
+        workflow_configuration={'shard': '${shard}', 'queue': 'x & <y>'},
+    )
+
+
+def _expected(base_parameters, combination):
+    parameters = dict(base_parameters or {})
+    parameters.update(combination)
+    values = {key: '{}'.format(value) for key, value in combination.items()}
+    return _coordinator_app(
+        name='orders-{shard}-{region}'.format(**values),
+        workflow_app_path='/apps/{region}/orders'.format(**values),
+        parameters=parameters,
+    ).xml()
+
+
+@pytest.mark.parametrize('processes', [None, 2])
+@pytest.mark.parametrize('base_parameters', [None, {'region': 'replaced', 'a': 1, 'z': '"quoted" & <escaped>'}])
+def test_generate_coordinators(processes, base_parameters):
+    matrix = {'shard': range(3), 'region': ['us-east', 'eu<west>']}
+    documents = list(fleet.generate_coordinators(_coordinator_app(parameters=base_parameters), matrix,
+                                                 processes=processes, chunksize=2))
+    assert [combination for combination, _ in documents] == [
+        {'region': region, 'shard': shard} for region in ['us-east', 'eu<west>'] for shard in range(3)
+    ]
+    for combination, document in documents:
+        assert document == _expected(base_parameters, combination)
+
+
+def test_generate_coordinators_without_parameters():
+    base = _coordinator_app(name='single', workflow_app_path='/apps/single')
+    assert list(fleet.generate_coordinators(base, {})) == [({}, base.xml())]
+
+
+def test_generate_coordinators_invalid_name():
+    with pytest.raises(AssertionError) as assertion_info:
+        list(fleet.generate_coordinators(_coordinator_app(), {'shard': ['é'], 'region': ['us']}))
+    assert 'Name must be comprised of printable ASCII characters' in str(assertion_info.value)
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+from __future__ import unicode_literals
+
+import pytest
+
+from pyoozie import history
+
+SAMPLE_COORD_ID = '0123456-123456789012345-oozie-oozi-C'
+SAMPLE_WF_ID = '0123456-123456789012345-oozie-oozi-W'
+
+
+def _action(number, status='SUCCEEDED'):
+    return {'id': '{}@{}'.format(SAMPLE_COORD_ID, number), 'status': status, 'externalId': None}
+
+
+@pytest.fixture
+def store(tmpdir):
+    job_history = history.JobHistory(str(tmpdir.join('history.db')))
+    yield job_history
+    job_history.close()
+
+
+@pytest.mark.parametrize('details, expected', [
+    (_action(1), True),
+    (_action(1, 'KILLED'), False),
+    (_action(1, 'FAILED'), False),
+    (_action(1, 'IGNORED'), False),
+    (_action(1, 'RUNNING'), False),
+    (_action(1, 'WAITING'), False),
+    (_action(1, 'NONSENSE'), False),
+    ({'id': SAMPLE_WF_ID, 'status': 'SUCCEEDED'}, True),
+    ({'id': SAMPLE_WF_ID, 'status': 'PREP'}, False),
+    ({'id': SAMPLE_WF_ID, 'status': 'FAILED'}, False),
+    ({'id': SAMPLE_WF_ID + '@foo', 'status': 'OK'}, False),
+    ({'coordJobId': SAMPLE_COORD_ID, 'status': 'SUCCEEDED'}, False),
+    ({'id': SAMPLE_COORD_ID, 'status': 'SUCCEEDED'}, False),
+])
+def test_is_final(details, expected):
+    assert history.is_final(details) is expected
+
+
+def test_put_and_get(store):
+    workflow = {'id': SAMPLE_WF_ID, 'status': 'SUCCEEDED', 'actions': [{'id': SAMPLE_WF_ID + '@ǝɯɐu'}]}
+    assert store.put([workflow, _action(1), _action(2, 'RUNNING')]) == 2
+    assert store.get(SAMPLE_WF_ID) == workflow
+    assert store.get(_action(1)['id']) == _action(1)
+    assert store.get(_action(2)['id']) is None
+
+    # Jobs that failed may be rerun outside of pyoozie, so aren't kept
+    assert store.put([_action(3, 'KILLED'), {'id': SAMPLE_WF_ID, 'status': 'FAILED'}]) == 0
+    assert store.get(_action(3)['id']) is None
+
+    changed = dict(_action(1), externalId='replaced')
+    assert store.put([changed]) == 1
+    assert store.get(_action(1)['id']) == changed
+
+    store.forget(_action(1)['id'])
+    assert store.get(_action(1)['id']) is None
+
+
+def test_coordinator_actions(store):
+    store.put(_action(number) for number in (1, 2, 3, 5))
+    store.put([_action(1).copy(), {'id': '0123457-123456789012345-oozie-oozi-C@4', 'status': 'SUCCEEDED'}])
+    assert sorted(store.coordinator_actions(SAMPLE_COORD_ID)) == [1, 2, 3, 5]
+    assert store.coordinator_actions(SAMPLE_COORD_ID, start=3) == {3: _action(3), 5: _action(5)}
+    assert store.coordinator_actions('0123458-123456789012345-oozie-oozi-C') == {}
+
+
+def test_persistent(tmpdir):
+    path = str(tmpdir.join('history.db'))
+    first = history.JobHistory(path)
+    first.put([_action(1)])
+    first.close()
+
+    second = history.JobHistory(path)
+    assert second.get(_action(1)['id']) == _action(1)
+    second.close()
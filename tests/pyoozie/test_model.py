@@ -798,7 +798,8 @@ def test_coordinator_action_coordinator(sample_coordinator_action, sample_coordi
 
     sample_coordinator_action._parent = None
     coord = sample_coordinator_action.coordinator()
-    mock_client.job_coordinator_info.assert_called_with(coordinator_id=SAMPLE_COORD_ID)
+    mock_client.job_last_coordinator_info.assert_called_with(coordinator_id=SAMPLE_COORD_ID)
+    assert not mock_client.job_coordinator_info.called
 
 
 def test_coordinator_action_parent(sample_coordinator_action, sample_coordinator):
@@ -811,7 +812,8 @@ def test_coordinator_action_parent(sample_coordinator_action, sample_coordinator
 
     sample_coordinator_action._parent = None
     coord = sample_coordinator_action.coordinator()
-    mock_client.job_coordinator_info.assert_called_with(coordinator_id=SAMPLE_COORD_ID)
+    mock_client.job_last_coordinator_info.assert_called_with(coordinator_id=SAMPLE_COORD_ID)
+    assert not mock_client.job_coordinator_info.called
 
 
 def test_workflow_coordinator(sample_workflow):
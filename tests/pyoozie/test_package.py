@@ -1,7 +1,39 @@
 # Copyright (c) 2017 "Shopify inc." All rights reserved.
 # Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+import importlib
+import subprocess
+import sys
+
+import pytest
+
 import pyoozie
 
 
 def test_version():
     assert pyoozie.__version__
+
+
+def test_exports():
+    for name, module in pyoozie._EXPORTS.items():
+        assert getattr(pyoozie, name) is getattr(importlib.import_module(module), name)
+    assert set(pyoozie.__all__) == set(pyoozie._EXPORTS) | {'__version__'}
+    assert set(pyoozie.__all__) <= set(dir(pyoozie))
+    with pytest.raises(AttributeError):
+        getattr(pyoozie, 'Nonsense')
+
+
+def _imported(statement):
+    modules = ('requests', 'sqlite3', 'untangle', 'yattag')
+    code = '{}; import sys; print(" ".join(name for name in {!r} if name in sys.modules))'.format(statement, modules)
+    return set(subprocess.check_output([sys.executable, '-c', code]).decode('utf-8').split())
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='Exports are imported up front before Python 3.7')
+def test_lazy_imports():
+    assert _imported('import pyoozie') == set()
+    assert _imported('from pyoozie import WorkflowApp') == {'yattag'}
+    assert _imported('from pyoozie import OozieClient') == {'requests'}
+    assert _imported('from pyoozie import client') == {'requests'}
+    # sqlite3 is only needed to keep a job history
+    statement = 'from pyoozie import client; client.OozieClient(job_history=":memory:")'
+    assert _imported(statement) == {'requests', 'sqlite3'}
@@ -0,0 +1,58 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+from __future__ import unicode_literals
+
+import mock
+import pytest
+
+from pyoozie import profiling
+
+
+@pytest.fixture
+def clock():
+    # Each reading of the clock is a second after the last
+    return mock.Mock(side_effect=[float(second) for second in range(100)])
+
+
+def test_profile_call(clock):
+    profile = profiling.Profile(clock=clock)
+
+    def parse(value):
+        return profile.call(profiling.TIME, 'Workflow.startTime', lambda: value)
+
+    assert profile.call(profiling.MODEL, 'Workflow', lambda: [parse(1), parse(2)]) == [1, 2]
+    with pytest.raises(ValueError):
+        profile.call(profiling.NETWORK, 'GET jobs', mock.Mock(side_effect=ValueError))
+    profile.stop()
+
+    # Model construction took 5 seconds, of which 2 were spent parsing times
+    assert profile.totals() == {
+        (profiling.MODEL, 'Workflow'): (1, 3.0),
+        (profiling.TIME, 'Workflow.startTime'): (2, 2.0),
+        (profiling.NETWORK, 'GET jobs'): (1, 1.0),
+    }
+    assert profile.wall == 9.0
+    assert profile.phases() == {
+        profiling.NETWORK: 1.0,
+        profiling.JSON: 0.0,
+        profiling.MODEL: 3.0,
+        profiling.CONF: 0.0,
+        profiling.TIME: 2.0,
+        profiling.OTHER: 3.0,
+    }
+
+
+def test_recording():
+    client, other_client = object(), object()
+    assert profiling.active(client) is None
+    with profiling.recording(client) as profile:
+        assert profiling.active(client) is profile
+        assert profiling.active(other_client) is None
+        with profiling.recording(client) as inner_profile:
+            assert profiling.active(client) is inner_profile
+        assert profiling.active(client) is profile
+    assert profiling.active(client) is None
+
+    assert profiling.call(None, profiling.MODEL, 'Workflow', lambda value: value, 1) == 1
+    assert profiling.call(profile, profiling.MODEL, 'Workflow', lambda value: value, 2) == 2
+    assert profile.totals()[(profiling.MODEL, 'Workflow')][0] == 1
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+from __future__ import unicode_literals
+
+import io
+import xml.etree.ElementTree as et
+
+import pytest
+
+import tests.utils
+from pyoozie import exceptions
+from pyoozie import reader
+from pyoozie import tags
+
+
+def _nodes(xml):
+    # Nodes may come out in a different order, which doesn't change the workflow
+    return sorted(et.tostring(element) for element in et.fromstring(xml))
+
+
+@pytest.fixture
+def workflow_app():
+    return tags.WorkflowApp(
+        name='descriptive-name',
+        parameters={'escaped': 'x & <y>', 'blank': ' ', 'int': 5},
+        configuration={'config_key': 'ǝnlɐʌ'},
+        credentials=[tags.Credential({'cred_name': 'cred"value'}, credential_name='my-hcat-creds',
+                                     credential_type='hcat')],
+        job_tracker='job-tracker',
+        name_node='name-node',
+        job_xml_files=['/user/${wf:user()}/job.xml'],
+        entities=tags.Serial(
+            tags.Parallel(
+                tags.Action(name='build_a', action=tags.Shell(exec_command='echo', arguments=['build_a'],
+                                                              env_vars={'A': 'b=c'}, capture_output=True)),
+                tags.Action(name='build_b', action=tags.Email(to=['a@b.c', 'd@e.f'], subject='s', body='b'),
+                            on_error=tags.Kill('Email failed', name='email')),
+                tags.Serial(
+                    tags.Action(name='build_c', action=tags.Shell(exec_command='echo', files=['f'], archives=['a'])),
+                    tags.Action(name='build_d', action=tags.Shell(exec_command='echo')),
+                    on_error=tags.Action(name='cleanup', action=tags.Shell(exec_command='rm')),
+                ),
+                name='builders'
+            ),
+            tags.Decision(
+                default=tags.Action(name='sub', action=tags.SubWorkflow(app_path='/p', configuration={'k': 'v'})),
+                choices={
+                    '${a gt b}': tags.Action(name='choice', action=tags.Shell(exec_command='echo'),
+                                             credential='my-hcat-creds', retry_max=0, retry_interval=3),
+                    '${a lt b}': tags.Kill('Too small', name='small'),
+                },
+                name='decide'
+            ),
+            tags.Action(name='publish', action=tags.SubWorkflow(app_path='/q', propagate_configuration=False)),
+            on_error=tags.Serial(
+                tags.Action(name='error', action=tags.Shell(exec_command='echo', arguments=['error'])),
+                tags.Kill(name='error', message='A bad thing <happened>')
+            )
+        )
+    )
+
+
+@pytest.mark.parametrize('indent', [False, True])
+def test_parse_workflow_app(indent, workflow_app):
+    expected_xml = workflow_app.xml(indent=indent)
+    parsed = reader.parse_workflow_app(expected_xml)
+    assert isinstance(parsed, tags.WorkflowApp)
+    assert _nodes(parsed.xml(indent=indent)) == _nodes(expected_xml)
+
+    # Parsing is repeatable
+    assert reader.parse_workflow_app(io.BytesIO(parsed.xml())).xml() == parsed.xml()
+
+    # Documents can also be passed as text
+    assert reader.parse_workflow_app(expected_xml.decode('utf-8')).xml() == parsed.xml()
+
+
+def test_parse_workflow_app_file(tmpdir, workflow_app):
+    path = tmpdir.join('workflow.xml')
+    path.write_binary(workflow_app.xml())
+    assert _nodes(reader.parse_workflow_app(str(path)).xml()) == _nodes(workflow_app.xml())
+
+    with open(str(path), 'rb') as stream:
+        assert _nodes(reader.parse_workflow_app(stream).xml()) == _nodes(workflow_app.xml())
+
+
+def test_parse_minimal_workflow_app():
+    workflow_app = reader.parse_workflow_app(b'''<workflow-app name="minimal" xmlns="uri:oozie:workflow:0.5">
+        <start to="end" />
+        <end name="end" />
+    </workflow-app>''')
+    assert workflow_app.xml() == tags.WorkflowApp(name='minimal').xml()
+
+
+def test_parse_workflow_app_unsupported_elements():
+    with pytest.raises(exceptions.OozieParsingException) as exception_info:
+        reader.parse_workflow_app(b'''<workflow-app name="unsupported" xmlns="uri:oozie:workflow:0.5">
+            <start to="action-pig" />
+            <action name="action-pig">
+                <pig><script>script.pig</script></pig>
+                <ok to="end" />
+                <error to="end" />
+            </action>
+            <action name="action-shell">
+                <shell><exec>echo</exec><prepare /></shell>
+                <ok to="end" />
+                <error to="end" />
+            </action>
+            <sla />
+            <end name="end" />
+        </workflow-app>''')
+    assert str(exception_info.value) == (
+        'Unsupported element(s): action-pig/pig, action-shell/shell/prepare, workflow-app/sla')
+
+
+@pytest.mark.parametrize('xml, message', [
+    (b'<coordinator-app />', "Expected a 'workflow-app' document, got 'coordinator-app'"),
+    (b'<workflow-app name="w"><end name="end" /></workflow-app>', "Workflow has no 'start' node"),
+    (b'''<workflow-app name="w">
+        <start to="action-missing" />
+        <end name="end" />
+    </workflow-app>''', "Transition to unknown node 'action-missing'"),
+    (b'''<workflow-app name="w">
+        <start to="end" />
+        <kill name="kill-orphan"><message>orphan</message></kill>
+        <end name="end" />
+    </workflow-app>''', 'Unreachable node(s): kill-orphan'),
+    (b'''<workflow-app name="w">
+        <start to="action-a" />
+        <action name="action-a"><shell><exec>a</exec></shell><ok to="action-b" /><error to="action-b" /></action>
+        <action name="action-b"><shell><exec>b</exec></shell><ok to="action-a" /><error to="end" /></action>
+        <end name="end" />
+    </workflow-app>''', "Transition to 'action-a' can't be represented"),
+    (b'''<workflow-app name="w">
+        <start to="action-a" />
+        <action name="action-a"><shell><exec>a</exec></shell><ok to="action-b" /><error to="end" /></action>
+        <action name="action-b"><shell><exec>b</exec></shell><ok to="end" /><error to="action-a" /></action>
+        <end name="end" />
+    </workflow-app>''', "Transition to 'action-a' can't be represented"),
+])
+def test_parse_workflow_app_errors(xml, message):
+    with pytest.raises(exceptions.OozieParsingException) as exception_info:
+        reader.parse_workflow_app(xml)
+    assert str(exception_info.value) == message
+
+
+def test_parse_coordinator_app():
+    with open('tests/data/full_coordinator.xml', 'rb') as stream:
+        expected_dict = tests.utils.xml_to_comparable_dict(stream.read())
+
+    coordinator_app = reader.parse_coordinator_app('tests/data/full_coordinator.xml')
+    assert isinstance(coordinator_app, tags.CoordinatorApp)
+    assert coordinator_app.execution_order == tags.EXEC_LAST_ONLY
+    assert tests.utils.xml_to_comparable_dict(coordinator_app.xml(indent=True)) == expected_dict
+
+    with open('tests/data/minimal_coordinator.xml', 'rb') as stream:
+        minimal_xml = stream.read()
+    assert tests.utils.xml_to_comparable_dict(reader.parse_coordinator_app(minimal_xml).xml()) == \
+        tests.utils.xml_to_comparable_dict(minimal_xml)
+
+
+def test_parse_coordinator_app_unsupported():
+    with pytest.raises(exceptions.OozieParsingException) as exception_info:
+        reader.parse_coordinator_app(b'''<coordinator-app name="c" frequency="${coord:days(1)}"
+                start="2015-01-01T10:56Z" end="2115-01-01T10:56Z" timezone="UTC" xmlns="uri:oozie:coordinator:0.4">
+            <datasets />
+            <action><workflow><app-path>/path</app-path></workflow></action>
+        </coordinator-app>''')
+    assert str(exception_info.value) == 'Unsupported element(s): coordinator-app/datasets'
+
+    with pytest.raises(exceptions.OozieParsingException) as exception_info:
+        reader.parse_coordinator_app(b'''<coordinator-app name="c" frequency="${coord:days(1)}"
+                start="2015-01-01T10:56Z" end="2115-01-01T10:56Z" timezone="UTC" xmlns="uri:oozie:coordinator:0.4">
+            <action><workflow><app-path>/path</app-path></workflow></action>
+        </coordinator-app>''')
+    assert str(exception_info.value) == "Frequency '${coord:days(1)}' is not a number of minutes"
@@ -0,0 +1,124 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+from __future__ import unicode_literals
+
+import io
+import json
+import pickle
+
+import mock
+import pytest
+
+from pyoozie import client
+from pyoozie import snapshot
+from tests import fake_oozie
+
+
+@pytest.fixture(scope='module')
+def server():
+    with fake_oozie.FakeOozieServer(coordinators=2, coordinator_actions=20, workflows=3, workflow_actions=3) as fake:
+        yield fake
+
+
+@pytest.fixture
+def api(server):
+    return client.OozieClient(url=server.url, verbose=False)
+
+
+def _fields(artifact):
+    return {key: getattr(artifact, key) for key in list(artifact.REQUIRED_KEYS) + list(artifact.SUPPORTED_KEYS)
+            if key != 'actions'}
+
+
+def _assert_same(loaded, job):
+    assert type(loaded) is type(job)
+    assert _fields(loaded) == _fields(job)
+    assert loaded._details == job._details
+    for key, action in (getattr(job, 'actions', None) or {}).items():
+        assert loaded.actions[key]._parent is loaded
+        _assert_same(loaded.actions[key], action)
+
+
+def test_round_trip(server, api):
+    coordinator, workflow = api.expand_tree([server.coordinator_id(1), server.workflow_id(2)], depth=1)
+    assert coordinator.actions[3]._workflow
+
+    loaded = snapshot.loads(snapshot.dumps([coordinator, workflow]))
+    assert len(loaded) == 2
+    assert loaded.ids == [server.coordinator_id(1), server.workflow_id(2)]
+    assert loaded.types == ['Coordinator', 'Workflow']
+
+    loaded_coordinator, loaded_workflow = loaded
+    _assert_same(loaded_coordinator, coordinator)
+    _assert_same(loaded_workflow, workflow)
+    assert loaded_coordinator.startTime == coordinator.startTime
+    assert loaded_coordinator.conf == coordinator.conf
+    assert loaded_coordinator.status == coordinator.status
+
+    # Workflows loaded for actions come along
+    action = loaded_coordinator.actions[3]
+    assert action.workflow()._parent is action
+    _assert_same(action.workflow(), coordinator.actions[3].workflow())
+    assert action.coordinator() is loaded_coordinator
+
+
+def test_lazy_without_client(server, api):
+    coordinator = api.job_coordinator_info(coordinator_id=server.coordinator_id(0))
+    stream = io.BytesIO()
+    snapshot.dump(coordinator, stream)
+    stream.seek(0)
+
+    with mock.patch('pyoozie.snapshot._decode', wraps=snapshot._decode) as decode:
+        loaded = snapshot.load(stream)
+        assert not decode.called
+        job = loaded.get(server.coordinator_id(0))
+        assert decode.call_count == 21
+        assert loaded[0] is job
+        assert decode.call_count == 21
+    assert loaded.get(server.coordinator_id(1)) is None
+
+    assert job._client is None
+    assert job.actions[1]._client is None
+    with pytest.raises(AttributeError):
+        job.actions[1].workflow()
+
+    loaded.rehydrate(api)
+    assert job.actions[1]._client is api
+    assert job.actions[1].workflow().id == coordinator.actions[1].externalId
+
+
+def test_rehydrate(server, api):
+    workflow = api.job_workflow_info(workflow_id=server.workflow_id(0))
+    loaded = snapshot.loads(snapshot.dumps(workflow), client=api)[0]
+    assert all(action._client is api for action in loaded.actions.values())
+
+    other = client.OozieClient(url=server.url, verbose=False)
+    assert snapshot.rehydrate(loaded, other) is loaded
+    assert loaded._client is other
+    assert all(action._client is other for action in loaded.actions.values())
+
+
+def test_compact(server, api):
+    coordinator = api.job_coordinator_info(coordinator_id=server.coordinator_id(0))
+    reply = server.handle('GET', '/oozie/v2/job/{}?offset=1&len=20'.format(server.coordinator_id(0)))[1]
+    assert len(snapshot.dumps(coordinator)) < len(json.dumps(reply)) / 2
+
+
+def test_invalid():
+    with pytest.raises(ValueError) as err:
+        snapshot.loads(b'not a snapshot')
+    assert 'Not a pyoozie snapshot' in str(err.value)
+
+    data = snapshot.dumps([])
+    with pytest.raises(ValueError) as err:
+        snapshot.loads(data[:len(snapshot.MAGIC)] + b'\xff' + data[len(snapshot.MAGIC) + 1:])
+    assert 'Unsupported pyoozie snapshot version' in str(err.value)
+    assert len(snapshot.loads(data)) == 0
+
+
+def test_pickle(server, api):
+    coordinator = api.job_coordinator_info(coordinator_id=server.coordinator_id(0))
+    loaded = pickle.loads(pickle.dumps(coordinator, protocol=2))
+    assert loaded._client is None
+    _assert_same(loaded, coordinator)
+    assert coordinator._client is api
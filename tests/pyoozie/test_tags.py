@@ -7,6 +7,7 @@ from __future__ import print_function
 import datetime
 import decimal
 
+import mock
 import pytest
 import six
 import tests.utils
@@ -667,10 +668,66 @@ def test_workflow_with_reused_identifier():
     assert str(assertion_info.value) == 'Name(s) reused: action-build'
 
 
+def test_workflow_entities_are_shared_and_frozen_on_composition():
+    action = tags.Action(name='build', action=tags.Shell(exec_command='echo', arguments=['build']))
+    kill = tags.Kill('A bad thing happened')
+    kill.message = 'Entities can be modified until they are composed'
+
+    entities = tags.Serial(action, on_error=kill)
+    assert [entity for entity in entities if entity is action or entity is kill] == [action, kill]
+
+    with pytest.raises(AttributeError) as assertion_info:
+        kill.message = 'Too late'
+    assert 'Kill has been composed into another entity' in str(assertion_info.value)
+    assert kill.message == 'Entities can be modified until they are composed'
+
+    workflow_app = tags.WorkflowApp(name='descriptive-name', entities=entities)
+    assert b'Entities can be modified until they are composed' in workflow_app.xml()
+    with pytest.raises(AttributeError):
+        entities.extra = True
+
+
+def test_workflow_with_shared_entity_reused():
+    action = tags.Action(name='build', action=tags.Shell(exec_command='echo', arguments=['build']))
+    with pytest.raises(AssertionError) as assertion_info:
+        tags.WorkflowApp(name='descriptive-name', entities=tags.Serial(action, action))
+    assert str(assertion_info.value) == 'Name(s) reused: action-build'
+
+
 def test_workflow_app_empty_serial_entities():
     # Empty collections should act empty
     assert len(set(tags.Serial())) == 0
     assert not bool(tags.Serial())
+    assert not bool(tags.Serial(on_error=tags.Serial()))
+    assert bool(tags.Serial(on_error=tags.Kill('A bad thing happened')))
+
+
+def test_workflow_validates_nested_entities():
+    def build(name, credential=None):
+        return tags.Action(name=name, action=tags.Shell(exec_command='echo'), credential=credential)
+
+    with pytest.raises(AssertionError) as assertion_info:
+        tags.WorkflowApp(name='descriptive-name', entities=tags.Serial(
+            build('build'),
+            tags.Parallel(build('a'), tags.Serial(build('b'), build('build')), name='builders'),
+            tags.Decision(default=build('a'), choices={'${a gt b}': build('c')}, name='decide'),
+        ))
+    assert str(assertion_info.value) == 'Name(s) reused: action-a, action-build'
+
+    with pytest.raises(AssertionError) as assertion_info:
+        tags.WorkflowApp(name='descriptive-name', entities=tags.Parallel(
+            build('a', credential='my-hcat-creds'),
+            tags.Serial(build('b'), on_error=build('error', credential='my-hive-creds')),
+        ))
+    assert str(assertion_info.value) == 'Missing credentials: my-hcat-creds, my-hive-creds'
+
+
+def test_workflow_validates_deep_workflows():
+    entities = tags.Action(name='step-0', action=tags.Shell(exec_command='echo'))
+    for index in range(1, 5000):
+        entities = tags.Serial(tags.Action(name='step-%d' % index, action=tags.Shell(exec_command='echo')),
+                               on_error=entities)
+    assert tags.WorkflowApp(name='descriptive-name', entities=entities)
 
 
 def test_workflow_app_serial_entities(request):
@@ -924,3 +981,113 @@ def test_workflow_app_decision_entities(request):
     <end name="end" />
 </workflow-app>
 """)
+
+
+def test_structural_hash():
+    def build(**kwargs):
+        entities = tags.Serial(
+            tags.Parallel(
+                tags.Action(name='a', action=tags.Shell(exec_command='echo', arguments=['a'], env_vars={'A': 'b'})),
+                tags.Action(name='b', action=tags.SubWorkflow(app_path='/b', configuration={'k': 'v', 'l': None})),
+                name='builders'
+            ),
+            tags.Decision(default=tags.Kill('default', name='default'),
+                          choices={'${a}': tags.Kill('a', name='a'), '${b}': tags.Kill('b', name='b')}, name='pick'),
+        )
+        return tags.WorkflowApp(name=kwargs.get('name', 'descriptive-name'), parameters={'x': 1, 'y': 'z'},
+                                entities=entities)
+
+    assert build().structural_hash() == build().structural_hash()
+    assert build().structural_hash() != build(name='other-name').structural_hash()
+    assert len(build().structural_hash()) == 64
+
+    # Unchanged apart from order or identity
+    assert tags.Configuration({'a': 1, 'b': 2}).structural_hash() == \
+        tags.Configuration({'b': 2, 'a': 1}).structural_hash()
+    assert tags.Configuration({'a': 1}).structural_hash() != tags.Parameters({'a': 1}).structural_hash()
+    assert tags.Configuration({'a': 1}).structural_hash() != tags.Configuration({'a': 2}).structural_hash()
+
+    # Coordinators
+    def coordinator(**kwargs):
+        return tags.CoordinatorApp(name='coord', workflow_app_path='/path', frequency=5,
+                                   start=datetime.datetime(2015, 1, 1), execution_order=tags.EXEC_LIFO, **kwargs)
+    assert coordinator().structural_hash() == coordinator().structural_hash()
+    assert coordinator().structural_hash() != coordinator(timeout=10).structural_hash()
+
+    # Entities are immutable once composed, so their hash is only computed once
+    kill = tags.Kill('message', name='kill')
+    assert kill.structural_hash() != tags.Kill('other', name='kill').structural_hash()
+    kill.message = 'other'
+    assert kill.structural_hash() == tags.Kill('other', name='kill').structural_hash()
+    expected_hash = kill.structural_hash()
+    tags.Serial(kill)
+    assert kill.structural_hash() == expected_hash
+    with mock.patch.object(tags, '_structural_hash') as mock_hash:
+        assert kill.structural_hash() == expected_hash
+    assert not mock_hash.called
+
+
+def test_xml_cache(tmpdir):
+    configuration = tags.Configuration({'key': 'value'})
+    expected_xml, expected_indented_xml = configuration.xml(), configuration.xml(indent=True)
+    cache = tags.XMLCache(directory=str(tmpdir))
+    with mock.patch.object(tags.Configuration, 'xml', wraps=configuration.xml) as mock_xml:
+        assert cache.xml(configuration) == expected_xml
+        assert cache.xml(tags.Configuration({'key': 'value'})) == expected_xml
+        assert cache.xml(configuration, indent=True) == expected_indented_xml
+        assert cache.xml(configuration, indent=True) == expected_indented_xml
+    assert mock_xml.call_count == 2
+    assert sorted(path.basename for path in tmpdir.listdir()) == [
+        '{}-v{}-indented.xml'.format(configuration.structural_hash(), tags.XML_FORMAT_VERSION),
+        '{}-v{}.xml'.format(configuration.structural_hash(), tags.XML_FORMAT_VERSION),
+    ]
+
+    # Documents stored on disk are reused by other caches
+    with mock.patch.object(tags.Configuration, 'xml') as mock_xml:
+        assert tags.XMLCache(directory=str(tmpdir)).xml(configuration) == expected_xml
+    assert not mock_xml.called
+
+    # But not once the XML format changes
+    with mock.patch.object(tags, 'XML_FORMAT_VERSION', tags.XML_FORMAT_VERSION + 1):
+        with mock.patch.object(tags.Configuration, 'xml', return_value=b'<configuration/>') as mock_xml:
+            assert tags.XMLCache(directory=str(tmpdir)).xml(configuration) == b'<configuration/>'
+        assert mock_xml.called
+
+    # Changed objects are serialized again
+    assert tags.XMLCache().xml(tags.Configuration({'key': 'changed'})) == \
+        tags.Configuration({'key': 'changed'}).xml()
+
+
+def test_deterministic_names():
+    def build(message='A bad thing happened'):
+        return tags.WorkflowApp(name='descriptive-name', entities=tags.Serial(
+            tags.Action(tags.Shell(exec_command='echo', arguments=['build']),
+                        on_error=tags.Kill(message)),
+            tags.Parallel(
+                tags.Action(tags.Shell(exec_command='echo', arguments=['a'])),
+                tags.Action(tags.Shell(exec_command='echo', arguments=['b'])),
+            ),
+            on_error=tags.Kill(message),
+        ))
+
+    with tags.deterministic_names():
+        workflow_app = build()
+    with tags.deterministic_names():
+        assert build().xml() == workflow_app.xml()
+        assert build().xml() != workflow_app.xml()  # Names are unique within a context
+    assert build().xml() != workflow_app.xml()
+
+    # Names follow content, and identical entities are numbered in order of creation
+    with tags.deterministic_names():
+        first_kill = tags.Kill('A bad thing happened')
+        second_kill = tags.Kill('A bad thing happened')
+        other_kill = tags.Kill('Another bad thing happened')
+    assert second_kill.identifier() == first_kill.identifier() + '-2'
+    assert first_kill.identifier() not in other_kill.identifier()
+    with tags.deterministic_names():
+        assert tags.Kill('A bad thing happened').identifier() == first_kill.identifier()
+        assert tags.Kill('A bad thing happened', name='named').identifier() == 'kill-named'
+    with tags.deterministic_names():
+        changed_app = build(message='Something changed')
+    assert changed_app.xml().count(b'kill-') == workflow_app.xml().count(b'kill-')
+    assert changed_app.structural_hash() != workflow_app.structural_hash()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+from __future__ import unicode_literals
+
+import datetime
+import io
+
+import pytest
+
+from pyoozie import tags
+from pyoozie import writer
+
+
+@pytest.fixture
+def workflow_app():
+    return tags.WorkflowApp(
+        name='descriptive-name',
+        parameters={'escaped': 'x & <y>', 'none': None, 'blank': ' ', 'multiline': 'line\nnext', 'int': 5},
+        configuration={'config_key': 'ǝnlɐʌ'},
+        credentials=[tags.Credential({'cred_name': 'cred"value'}, credential_name='my-hcat-creds',
+                                     credential_type='hcat')],
+        job_tracker='job-tracker',
+        name_node='name-node',
+        job_xml_files=['/user/${wf:user()}/job.xml'],
+        entities=tags.Serial(
+            tags.Parallel(
+                tags.Action(name='build_a', action=tags.Shell(exec_command='echo', arguments=['build_a'],
+                                                              env_vars={'A': 'b'}, capture_output=True)),
+                tags.Action(name='build_b', action=tags.Email(to=['a@b.c', 'd@e.f'], subject='s', body='b')),
+                name='builders'
+            ),
+            tags.Decision(
+                default=tags.Action(name='sub', action=tags.SubWorkflow(app_path='/p', configuration={'k': 'v'})),
+                choices={'${a gt b}': tags.Action(name='choice', action=tags.Shell(exec_command='echo'),
+                                                  credential='my-hcat-creds', retry_max=0, retry_interval=3)},
+                name='decide'
+            ),
+            on_error=tags.Serial(
+                tags.Action(name='error', action=tags.Shell(exec_command='echo', arguments=['error'])),
+                tags.Kill(name='error', message='A bad thing <happened>')
+            )
+        )
+    )
+
+
+@pytest.fixture
+def coordinator_app():
+    return tags.CoordinatorApp(
+        name='descriptive-name',
+        workflow_app_path='/user/oozie/workflows/descriptive-name',
+        frequency=10,
+        start=datetime.datetime(2015, 1, 1, 10, 56),
+        concurrency=1,
+        timeout=5,
+        execution_order=tags.EXEC_LAST_ONLY,
+        throttle='${throttle}',
+        parameters={'throttle': 1},
+        workflow_configuration={'mapred.job.queue.name': ''},
+    )
+
+
+@pytest.mark.parametrize('indent', [False, True])
+def test_backends_are_byte_identical(indent, workflow_app, coordinator_app):
+    serializables = [
+        workflow_app,
+        tags.WorkflowApp(name='empty'),
+        coordinator_app,
+        tags.Configuration(),
+        tags.Configuration({'key': 'value'}),
+    ]
+    for serializable in serializables:
+        expected = serializable.xml(indent=indent, backend='yattag')
+        assert serializable.xml(indent=indent, backend='streaming') == expected
+        assert serializable.xml(indent=indent) == expected
+
+
+def test_streaming_indentation():
+    assert tags.Configuration({'key': 'value', 'empty': ''}).xml(indent=True, backend='streaming') == (
+        "<?xml version='1.0' encoding='UTF-8'?>\r\n"
+        "<configuration>\r\n"
+        "    <property>\r\n"
+        "        <name>empty</name>\r\n"
+        "        <value></value>\r\n"
+        "    </property>\r\n"
+        "    <property>\r\n"
+        "        <name>key</name>\r\n"
+        "        <value>value</value>\r\n"
+        "    </property>\r\n"
+        "</configuration>"
+    ).encode('utf-8')
+
+
+def test_write_xml(workflow_app, monkeypatch):
+    monkeypatch.setattr(writer, '_FLUSH_THRESHOLD', 2)
+    stream = io.BytesIO()
+    workflow_app.write_xml(stream, indent=True)
+    assert stream.getvalue() == workflow_app.xml(indent=True, backend='yattag')
+
+
+def test_custom_backend():
+    created = []
+
+    class RecordingWriter(writer.YattagWriter):
+
+        def __init__(self, stream, indent=False):
+            super(RecordingWriter, self).__init__(stream, indent=indent)
+            created.append(indent)
+
+    xml = tags.Configuration({'key': 'value'}).xml(indent=True, backend=RecordingWriter)
+    assert created == [True]
+    assert xml == tags.Configuration({'key': 'value'}).xml(indent=True, backend='yattag')
+
+    with pytest.raises(KeyError):
+        tags.Configuration().xml(backend='unknown')
+
+
+def test_unclosed_tag():
+    document = writer.StreamingWriter(io.BytesIO())
+    document._start('tag', {})
+    with pytest.raises(AssertionError):
+        document.close()
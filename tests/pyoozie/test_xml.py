@@ -6,6 +6,7 @@ from __future__ import unicode_literals
 import pytest
 import tests.utils
 
+from pyoozie import tags
 from pyoozie import xml
 
 
@@ -113,3 +114,45 @@ def test_coordinator_submission_xml_with_configuration(username, coord_app_path)
             <value>test</value>
         </property>
     </configuration>''') == tests.utils.xml_to_comparable_dict(actual)
+
+
+def test_submission_xmls_share_base_configuration(username, workflow_app_path, coord_app_path):
+    base = {'queue': 'default', 'escaped': 'x & <y>', 'none': None, 'z.last': 'ǝnlɐʌ'}
+    submissions = [
+        (workflow_app_path, None),
+        (workflow_app_path + '-2', {'queue': 'urgent', 'date': 5}),
+        (workflow_app_path + '-3', {'user.name': 'ignored', 'a.first': 'value'}),
+    ]
+
+    def expected(xml_path, configuration):
+        merged = dict(base)
+        merged.update(configuration or {})
+        return xml._workflow_submission_xml(username, xml_path, configuration=merged)
+
+    assert list(xml._workflow_submission_xmls(username, submissions, configuration=base)) == [
+        expected(xml_path, configuration) for xml_path, configuration in submissions
+    ]
+    assert list(xml._coordinator_submission_xmls(username, [(coord_app_path, {'k': 'v'})])) == [
+        xml._coordinator_submission_xml(username, coord_app_path, configuration={'k': 'v'})
+    ]
+
+
+@pytest.mark.parametrize('configuration', [
+    None,
+    {},
+    {'queue': 'urgent'},
+    {'a.first': 'value', 'zz.last': 'value', 'none': None, 'number': 5},
+    {'user.name': 'ignored', 'oozie.wf.application.path': 'ignored', 'escaped': '</value> & more'},
+])
+def test_submission_template(username, workflow_app_path, configuration):
+    shared = {'queue': 'default', 'escaped': 'x & <y>', 'oozie.wf.application.path': 'replaced', 'unicode': 'ǝnlɐʌ'}
+    template = xml.SubmissionTemplate.workflow(username, configuration=shared)
+
+    expected = tags.Configuration(shared)
+    expected.update(configuration or {})
+    expected.update({'user.name': username, 'oozie.wf.application.path': workflow_app_path})
+    assert template.render(workflow_app_path, configuration) == expected.xml()
+
+    expected = tags.Configuration(configuration)
+    expected.update({'user.name': username, 'oozie.coord.application.path': workflow_app_path})
+    assert xml.SubmissionTemplate.coordinator(username).render(workflow_app_path, configuration) == expected.xml()
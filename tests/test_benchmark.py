@@ -0,0 +1,68 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+from __future__ import unicode_literals
+
+import json
+
+import pytest
+
+from tests import benchmark
+
+
+def test_run():
+    results = benchmark.run(scale=0.001, repeat=2)
+    assert [(result['name'], result['size']) for result in results] == [
+        ('jobs_query.workflows', 10),
+        ('jobs_query.workflows', 50),
+        ('jobs_query.coordinators_with_details', 1),
+        ('jobs_query.coordinators_with_details', 1),
+        ('model.coordinator', 10),
+        ('model.coordinator', 100),
+        ('model.workflow', 1),
+        ('model.workflow', 10),
+        ('xml.deep', 1),
+        ('xml.deep', 5),
+        ('xml.wide', 1),
+        ('xml.wide', 5),
+        ('xml.nested', 1),
+        ('xml.nested', 1),
+    ]
+    for result in results:
+        assert result['repeat'] == 2
+        assert 0 <= result['min'] <= result['median'] <= result['mean'] * 2
+
+
+def test_compare():
+    baseline = [
+        {'name': 'xml.deep', 'size': 1000, 'median': 1.0},
+        {'name': 'xml.wide', 'size': 1000, 'median': 1.0},
+    ]
+    results = [
+        {'name': 'xml.deep', 'size': 1000, 'median': 1.2},
+        {'name': 'xml.wide', 'size': 1000, 'median': 1.5},
+        {'name': 'xml.nested', 'size': 100, 'median': 9.0},
+    ]
+    assert benchmark.compare(results, baseline) == ['xml.wide[1000]: 1.0000s -> 1.5000s']
+    assert benchmark.compare(results, baseline, threshold=0.1) == [
+        'xml.deep[1000]: 1.0000s -> 1.2000s',
+        'xml.wide[1000]: 1.0000s -> 1.5000s',
+    ]
+
+
+def test_main(tmpdir, capsys):
+    output = str(tmpdir.join('results.json'))
+    assert benchmark.main(['xml.deep', '--scale', '0.001', '--repeat', '1', '--output', output]) == 0
+    with open(output) as stream:
+        document = json.load(stream)
+    assert [result['name'] for result in document['results']] == ['xml.deep', 'xml.deep']
+    assert 'xml.deep' in capsys.readouterr().err
+
+    # Anything is a regression against an impossibly fast baseline
+    for result in document['results']:
+        result['median'] = 0.0
+    with open(output, 'w') as stream:
+        json.dump(document, stream)
+    assert benchmark.main(['xml.deep', '--scale', '0.001', '--repeat', '1', '--compare', output]) == 1
+
+    with pytest.raises(SystemExit):
+        benchmark.main(['nonsense'])
@@ -0,0 +1,118 @@
+# Copyright (c) 2017 "Shopify inc." All rights reserved.
+# Use of this source code is governed by a MIT-style license that can be found in the LICENSE file.
+from __future__ import unicode_literals
+
+import pytest
+
+from pyoozie import client
+from pyoozie import exceptions
+from pyoozie import model
+from tests import fake_oozie
+
+
+@pytest.fixture(scope='module')
+def server():
+    with fake_oozie.FakeOozieServer(coordinators=3, coordinator_actions=250, workflows=120, workflow_actions=4) as fake:
+        yield fake
+
+
+@pytest.fixture
+def api(server):
+    return client.OozieClient(url=server.url, verbose=False)
+
+
+def test_admin(api):
+    assert api.admin_build_version() == {'buildVersion': '4.1.0'}
+    assert api.admin_list_sharelib() == ['distcp', 'hive', 'oozie', 'pig']
+    assert api.admin_list_all_sharelib()['oozie'] == ['oozie-sharelib-oozie.jar']
+
+
+def test_jobs_query(server, api):
+    workflows = api._jobs_query(model.ArtifactType.Workflow, details=False)
+    assert len(workflows) == 120
+    # Newest first
+    assert workflows[0].id == server.workflow_id(119)
+    assert len(api._jobs_query(model.ArtifactType.Workflow, limit=10, details=False)) == 10
+
+    coordinators = api.jobs_all_coordinators(name='coordinator-1')
+    assert [coordinator.coordJobId for coordinator in coordinators] == [server.coordinator_id(1)]
+    assert coordinators[0].conf['oozie.coord.application.path'].endswith('/coordinator-1')
+
+
+def test_coordinator(server, api):
+    coordinator = api.job_coordinator_info(coordinator_id=server.coordinator_id(2))
+    assert sorted(coordinator.actions) == list(range(1, 251))
+    assert coordinator.actions[250].status == model.CoordinatorActionStatus.RUNNING
+
+    recent = api.job_coordinator_info(coordinator_id=server.coordinator_id(2), limit=5)
+    assert sorted(recent.actions) == list(range(246, 251))
+
+    active = api.job_coordinator_all_active_actions(coordinator_id=server.coordinator_id(2))
+    assert [action.actionNumber for action in active] == [250]
+
+    workflow = coordinator.actions[7].workflow()
+    assert workflow.parentId == coordinator.actions[7].id
+    assert sorted(workflow.actions) == ['action-0', 'action-1', 'action-2', 'action-3']
+
+
+def test_generated_jobs_are_stable(server):
+    with fake_oozie.FakeOozieServer(coordinators=3, coordinator_actions=250, workflows=120) as other:
+        path = '/oozie/v2/job/{}?offset=1&len=250'.format(server.coordinator_id(0))
+        first, second = server.handle('GET', path), other.handle('GET', path)
+    assert [action['status'] for action in first[1]['actions']] == \
+        [action['status'] for action in second[1]['actions']]
+
+
+def test_manage_jobs():
+    with fake_oozie.FakeOozieServer(coordinators=1, workflows=1) as server:
+        api = client.OozieClient(url=server.url, verbose=False)
+        workflow = api.jobs_submit_workflow('/user/oozie/workflows/submitted')
+        assert workflow.appName == 'submitted'
+        assert workflow.status == model.WorkflowStatus.PREP
+        assert api.job_workflow_start(workflow.id)
+        assert api.job_workflow_info(workflow.id).status == model.WorkflowStatus.RUNNING
+        assert api.job_workflow_kill(workflow.id)
+        assert api.job_workflow_info(workflow.id).status == model.WorkflowStatus.KILLED
+
+        action_id = '{}@100'.format(server.coordinator_id(0))
+        assert api.job_coordinator_kill(action_id)
+        assert api.job_coordinator_action(server.coordinator_id(0), action_number=100).status == \
+            model.CoordinatorActionStatus.KILLED
+        assert server.requests[('PUT', 'v2/job')] == 3
+
+
+def test_unknown_job(server, api):
+    with pytest.raises(exceptions.OozieException):
+        api.job_workflow_info('0000999-000000000000000-oozie-oozi-W')
+    assert server.handle('GET', '/oozie/v2/job/nonsense')[0] == 400
+
+
+def test_error_injection():
+    with fake_oozie.FakeOozieServer(error_rate=1.0) as server:
+        api = client.OozieClient(url=server.url, verbose=False)
+        with pytest.raises(exceptions.OozieException):
+            api.admin_status()
+        assert server.requests[('GET', 'versions')] == 1
+        assert server.requests[('GET', 'v2/admin')] == 1
+
+    with fake_oozie.FakeOozieServer(error_rate=0.5, seed=1) as server:
+        statuses = [server.handle('GET', '/oozie/v2/admin/status')[0] for _ in range(200)]
+        assert 50 < statuses.count(500) < 150
+
+
+def test_compression():
+    with fake_oozie.FakeOozieServer(workflows=200, compression=True) as server:
+        api = client.OozieClient(url=server.url, verbose=False, compression=True, compress_submissions=True)
+        assert len(api._jobs_query(model.ArtifactType.Workflow, details=False)) == 200
+        assert api._stats.wire_bytes_received < api._stats.bytes_received / 5
+
+        workflow = api.jobs_submit_workflow('/user/oozie/workflows/submitted',
+                                            configuration={'property.{}'.format(i): 'x' * 100 for i in range(100)})
+        assert workflow.appName == 'submitted'
+
+    with fake_oozie.FakeOozieServer(workflows=1) as server:
+        api = client.OozieClient(url=server.url, verbose=False, compression=True, compress_submissions=True)
+        workflow = api.jobs_submit_workflow('/user/oozie/workflows/submitted',
+                                            configuration={'property.{}'.format(i): 'x' * 100 for i in range(100)})
+        assert workflow.appName == 'submitted'
+        assert not api._compress_requests